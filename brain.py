@@ -3,8 +3,16 @@
 import base64
 import os
 import random
+import time
 
-from openai import OpenAI
+from character_registry import build_personality_modifier
+from metrics import LATENCY_BUCKETS, TOKEN_BUCKETS, metrics
+
+_llm_calls = metrics.counter("llm_calls", "Completed LLM calls")
+_llm_seconds = metrics.histogram("llm_seconds", LATENCY_BUCKETS, "LLM request time (non-streaming)")
+_llm_input_tokens = metrics.histogram("llm_input_tokens", TOKEN_BUCKETS, "Input tokens per call")
+_llm_output_tokens = metrics.histogram("llm_output_tokens", TOKEN_BUCKETS, "Output tokens per call")
+_llm_silences = metrics.counter("llm_silences", "Replies that were [SILENCE]")
 
 # Random style nudges injected each call to force variety
 STYLE_NUDGES = [
@@ -36,14 +44,8 @@ class Brain:
         self.max_tokens = int(os.getenv("MAX_RESPONSE_TOKENS", "150"))
         self.max_history = 10
 
-        # Dashscope client (OpenAI-compatible)
-        self._dashscope_client = OpenAI(
-            api_key=os.getenv("DASHSCOPE_API_KEY"),
-            base_url=os.getenv(
-                "VISION_BASE_URL",
-                "https://dashscope-intl.aliyuncs.com/compatible-mode/v1",
-            ),
-        )
+        # Dashscope client (OpenAI-compatible, lazy-loaded)
+        self._dashscope_client = None
 
         # Anthropic client (lazy-loaded)
         self._anthropic_client = None
@@ -57,6 +59,21 @@ class Brain:
         self.total_output_tokens = 0
         self.total_calls = 0
 
+        # Optional callback(dict) after each call, e.g. session recording
+        self.chat_tap = None
+
+    def _get_dashscope_client(self):
+        if self._dashscope_client is None:
+            from openai import OpenAI
+            self._dashscope_client = OpenAI(
+                api_key=os.getenv("DASHSCOPE_API_KEY"),
+                base_url=os.getenv(
+                    "VISION_BASE_URL",
+                    "https://dashscope-intl.aliyuncs.com/compatible-mode/v1",
+                ),
+            )
+        return self._dashscope_client
+
     def _get_anthropic_client(self):
         if self._anthropic_client is None:
             from anthropic import Anthropic
@@ -71,33 +88,6 @@ class Brain:
             self._histories[char_name] = []
         return self._histories[char_name]
 
-    def _build_personality_modifier(self, personality: dict | None) -> str:
-        """Build a personality modifier string from trait values. Only includes non-neutral traits."""
-        if not personality:
-            return ""
-        labels = {
-            "energy": ("very calm and low-energy", "very high-energy and hyped up"),
-            "positivity": ("cynical and pessimistic", "optimistic and upbeat"),
-            "formality": ("very casual and informal", "very formal and proper"),
-            "talkativeness": ("terse and brief", "chatty and verbose"),
-            "attitude": ("hostile and aggressive", "friendly and warm"),
-            "humor": ("dead serious", "silly and goofy"),
-        }
-        parts = []
-        for trait, (low_desc, high_desc) in labels.items():
-            val = personality.get(trait, 50)
-            if val < 30:
-                parts.append(f"Be {low_desc}")
-            elif val < 45:
-                parts.append(f"Be somewhat {low_desc}")
-            elif val > 70:
-                parts.append(f"Be {high_desc}")
-            elif val > 55:
-                parts.append(f"Be somewhat {high_desc}")
-        if not parts:
-            return ""
-        return "\n[Personality adjustment: " + ". ".join(parts) + ".]"
-
     def clear_history(self, char_name: str):
         """Clear history for a specific character."""
         self._histories.pop(char_name, None)
@@ -158,7 +148,7 @@ class Brain:
         messages.extend(history)
         messages.append({"role": "user", "content": user_content})
 
-        response = self._dashscope_client.chat.completions.create(
+        response = self._get_dashscope_client().chat.completions.create(
             model=self.model,
             messages=messages,
             max_tokens=self.max_tokens,
@@ -234,21 +224,38 @@ class Brain:
             return None
 
         char_name = character["name"]
-        system_prompt = character["system_prompt"]
-        system_prompt += self._build_personality_modifier(character.get("personality"))
+        # Precomputed by CharacterRegistry; built here for dicts that didn't come from it
+        system_prompt = character.get("full_system_prompt") or (
+            character["system_prompt"] + build_personality_modifier(character.get("personality"))
+        )
         history = self._get_history(char_name)
 
         user_content = self._build_user_content(frame_b64, player_text, react_to, game_hint)
 
+        start = time.perf_counter()
         if self.provider == "anthropic":
             reply, inp, out = self._chat_anthropic(system_prompt, history, user_content, frame_b64)
         else:
             reply, inp, out = self._chat_dashscope(system_prompt, history, user_content)
+        if self.chat_tap:
+            self.chat_tap({
+                "character": char_name,
+                "player_text": player_text,
+                "react_to": react_to,
+                "reply": reply,
+                "latency": round(time.perf_counter() - start, 3),
+                "input_tokens": inp,
+                "output_tokens": out,
+            })
 
         # Track usage
         self.total_input_tokens += inp
         self.total_output_tokens += out
         self.total_calls += 1
+        _llm_calls.inc()
+        _llm_seconds.observe(time.perf_counter() - start)
+        _llm_input_tokens.observe(inp)
+        _llm_output_tokens.observe(out)
 
         # Update rolling history (text-only summary to save tokens)
         if react_to:
@@ -265,6 +272,7 @@ class Brain:
 
         # Handle silence
         if "[SILENCE]" in reply.upper():
+            _llm_silences.inc()
             return None
 
         return reply
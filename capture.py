@@ -5,10 +5,26 @@ import base64
 import ctypes
 import io
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 
-import mss
 import numpy as np
-from PIL import Image
+
+from log import get_logger
+from metrics import RATIO_BUCKETS, metrics
+from tracing import tracer
+
+# mss and PIL are imported where they're used: neither is needed before the first grab
+if TYPE_CHECKING:
+    from PIL import Image
+
+log = get_logger("capture")
+
+_frames_grabbed = metrics.counter("capture_frames_grabbed", "Screen grabs that returned a frame")
+_frames_forwarded = metrics.counter("capture_frames_forwarded", "Frames encoded and handed to the LLM pipeline")
+_change_score = metrics.histogram("capture_change_score", RATIO_BUCKETS, "Fraction of pixels changed since the last sent frame")
+_capture_errors = metrics.counter("capture_errors", "Failed capture ticks")
 
 
 class ScreenCapture:
@@ -26,6 +42,15 @@ class ScreenCapture:
         self._last_sent_array = None
         self._sct = None
         self._thread_id = None
+        # All grabs run on one worker thread: keeps mss on a single thread and the
+        # resize / diff / JPEG encode off the event loop
+        self._grab_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture")
+
+        # Most recent frame sent to the LLM (base64 JPEG) and when it was grabbed
+        self.last_frame: str | None = None
+        self.last_frame_at = 0.0
+        # Optional callback(b64) for every encoded frame, e.g. session recording
+        self.frame_tap = None
 
     def set_source(self, source_type, source_id, source_name):
         """Set the capture source and reset change detection."""
@@ -33,11 +58,14 @@ class ScreenCapture:
         self.source_id = source_id
         self.source_name = source_name
         self._last_sent_array = None
-        print(f"[capture] Source set: {source_type} / {source_name} (id={source_id})", flush=True)
+        log.info(f"Source set: {source_type} / {source_name} (id={source_id})")
 
     def _ensure_mss(self):
         """Ensure mss instance exists for the current thread."""
         import threading
+
+        import mss
+
         current = threading.current_thread().ident
         if self._sct is None or self._thread_id != current:
             if self._sct is not None:
@@ -48,6 +76,9 @@ class ScreenCapture:
     @staticmethod
     def list_monitors() -> list[dict]:
         """Enumerate monitors with base64 thumbnails (160x90)."""
+        import mss
+        from PIL import Image
+
         results = []
         try:
             with mss.mss() as sct:
@@ -70,12 +101,14 @@ class ScreenCapture:
                         "thumbnail": thumb,
                     })
         except Exception as e:
-            print(f"[capture] Error listing monitors: {e}", flush=True)
+            log.error(f"Error listing monitors: {e}")
         return results
 
     @staticmethod
     def list_windows() -> list[dict]:
         """Enumerate visible, non-minimized windows with thumbnails."""
+        from PIL import Image
+
         results = []
         try:
             import win32gui
@@ -137,11 +170,13 @@ class ScreenCapture:
 
             win32gui.EnumWindows(_enum_callback, None)
         except Exception as e:
-            print(f"[capture] Error listing windows: {e}", flush=True)
+            log.error(f"Error listing windows: {e}")
         return results
 
-    def _grab_monitor(self) -> tuple[Image.Image, np.ndarray] | None:
+    def _grab_monitor(self) -> "tuple[Image.Image, np.ndarray] | None":
         """Grab a specific monitor by index."""
+        from PIL import Image
+
         self._ensure_mss()
         monitors = self._sct.monitors
         idx = self.source_id
@@ -156,10 +191,11 @@ class ScreenCapture:
         arr = np.array(img, dtype=np.float32)
         return img, arr
 
-    def _grab_window(self) -> tuple[Image.Image, np.ndarray] | None:
+    def _grab_window(self) -> "tuple[Image.Image, np.ndarray] | None":
         """Grab a specific window by HWND using PrintWindow."""
         import win32gui
         import win32ui
+        from PIL import Image
 
         hwnd = self.source_id
         if not win32gui.IsWindow(hwnd):
@@ -200,10 +236,10 @@ class ScreenCapture:
             arr = np.array(img, dtype=np.float32)
             return img, arr
         except Exception as e:
-            print(f"[capture] Window grab error: {e}", flush=True)
+            log.error(f"Window grab error: {e}")
             return None
 
-    def grab_frame(self) -> tuple[Image.Image | None, np.ndarray | None]:
+    def grab_frame(self) -> "tuple[Image.Image | None, np.ndarray | None]":
         """Grab a screenshot based on source_type."""
         if self.source_type == "monitor":
             return self._grab_monitor()
@@ -219,50 +255,86 @@ class ScreenCapture:
             return True
         diff = np.abs(current_array - self._last_sent_array)
         changed_pixels = np.mean(diff > 30)
+        _change_score.observe(float(changed_pixels))
         return changed_pixels >= self.change_threshold
 
     def mark_sent(self, array: np.ndarray):
         """Record this frame as the last one sent to the API."""
         self._last_sent_array = array.copy()
 
-    def frame_to_base64(self, img: Image.Image) -> str:
+    def frame_to_base64(self, img: "Image.Image") -> str:
         """Compress image to JPEG and return base64 string."""
         buf = io.BytesIO()
         img.save(buf, format="JPEG", quality=self.quality)
         return base64.b64encode(buf.getvalue()).decode("utf-8")
 
-    async def run(self, frame_queue: asyncio.Queue, force_event: asyncio.Event):
-        """Capture loop: grab frames, check for changes, queue them."""
+    def _grab_encoded(self, force: bool):
+        """Grab a frame; returns (base64, trace) if it changed (or force), else (None, None).
+
+        Runs on the grab thread.
+        """
+        trace = tracer.new_trace("frame")
+        with trace.span("grab"):
+            img, arr = self.grab_frame()
+        if img is None or arr is None:
+            return None, None
+        _frames_grabbed.inc()
+        if not force:
+            with trace.span("diff"):
+                changed = self.has_changed(arr)
+            if not changed:
+                return None, None
+        with trace.span("encode"):
+            b64 = self.frame_to_base64(img)
+        self.mark_sent(arr)
+        _frames_forwarded.inc()
+        self.last_frame = b64
+        self.last_frame_at = time.monotonic()
+        if self.frame_tap:
+            self.frame_tap(b64)
+        return b64, trace
+
+    async def latest(self, max_age: float = 0.0) -> str | None:
+        """The freshest frame: the last one if it is at most max_age seconds old, else a new grab.
+
+        Falls back to the last frame if the grab fails (e.g. the window is minimized).
+        """
+        if self.last_frame is not None and time.monotonic() - self.last_frame_at <= max_age:
+            return self.last_frame
+        loop = asyncio.get_running_loop()
+        try:
+            b64, _ = await loop.run_in_executor(self._grab_pool, self._grab_encoded, True)
+        except Exception as e:
+            log.error(f"Error: {e}")
+            b64 = None
+        return b64 or self.last_frame
+
+    async def run(self, on_frame):
+        """Capture loop: grab a frame every interval and call on_frame(b64, trace) when the scene changed."""
+        loop = asyncio.get_running_loop()
         while True:
             try:
-                img, arr = self.grab_frame()
-
-                if img is None or arr is None:
-                    await asyncio.sleep(self.interval)
-                    continue
-
-                force = force_event.is_set()
-
-                if force or self.has_changed(arr):
-                    b64 = self.frame_to_base64(img)
-                    self.mark_sent(arr)
-                    force_event.clear()
-
-                    if frame_queue.full():
-                        try:
-                            frame_queue.get_nowait()
-                        except asyncio.QueueEmpty:
-                            pass
-                    await frame_queue.put(b64)
+                b64, trace = await loop.run_in_executor(self._grab_pool, self._grab_encoded, False)
+                if b64 is not None:
+                    on_frame(b64, trace)
             except Exception as e:
-                print(f"[capture] Error: {e}", flush=True)
+                _capture_errors.inc()
+                log.error(f"Error: {e}")
 
             await asyncio.sleep(self.interval)
 
-    def close(self):
+    def _close_mss(self):
         if self._sct:
             try:
                 self._sct.close()
             except (AttributeError, OSError):
                 pass
             self._sct = None
+
+    def close(self):
+        # mss handles are per-thread, so close on the grab thread that opened it
+        try:
+            self._grab_pool.submit(self._close_mss).result(timeout=2.0)
+        except Exception:
+            pass
+        self._grab_pool.shutdown(wait=False)
@@ -0,0 +1,241 @@
+"""Character registry — characters/*.json indexed by name, hot-reloaded from disk.
+
+Character dicts are shared by reference (app_state["characters"], the active
+party, Brain), so a reload updates them in place instead of replacing them.
+Each dict carries a derived "full_system_prompt" (system prompt plus the
+personality modifier), rebuilt whenever the personality changes, so Brain
+doesn't rebuild it on every call. Personality edits are written back to the
+character's own file, debounced and atomically (persistence.atomic_write_json),
+unless the registry was made with persist=False (server sessions share the folder).
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+from log import get_logger
+from persistence import atomic_write_json
+
+CHARACTERS_DIR = Path(__file__).parent / "characters"
+
+log = get_logger("characters")
+
+# Keys computed here and never written back to the character file
+DERIVED_KEYS = {"full_system_prompt"}
+
+_PERSONALITY_LABELS = {
+    "energy": ("very calm and low-energy", "very high-energy and hyped up"),
+    "positivity": ("cynical and pessimistic", "optimistic and upbeat"),
+    "formality": ("very casual and informal", "very formal and proper"),
+    "talkativeness": ("terse and brief", "chatty and verbose"),
+    "attitude": ("hostile and aggressive", "friendly and warm"),
+    "humor": ("dead serious", "silly and goofy"),
+}
+
+
+def build_personality_modifier(personality: dict | None) -> str:
+    """Build a personality modifier string from trait values. Only includes non-neutral traits."""
+    if not personality:
+        return ""
+    parts = []
+    for trait, (low_desc, high_desc) in _PERSONALITY_LABELS.items():
+        val = personality.get(trait, 50)
+        if val < 30:
+            parts.append(f"Be {low_desc}")
+        elif val < 45:
+            parts.append(f"Be somewhat {low_desc}")
+        elif val > 70:
+            parts.append(f"Be {high_desc}")
+        elif val > 55:
+            parts.append(f"Be somewhat {high_desc}")
+    if not parts:
+        return ""
+    return "\n[Personality adjustment: " + ". ".join(parts) + ".]"
+
+
+class CharacterRegistry:
+    def __init__(
+        self,
+        directory: Path = CHARACTERS_DIR,
+        poll_interval: float = 1.0,
+        write_delay: float = 0.5,
+        persist: bool = True,
+        max_write_delay: float = 2.0,
+    ):
+        """
+        Args:
+            directory: Folder of character JSON files.
+            poll_interval: Seconds between mtime checks once watch() is running.
+            write_delay: Quiet period after the last personality edit before the file is written.
+            persist: False keeps personality edits in memory instead of writing the files.
+            max_write_delay: Longest an edit waits while more keep arriving (a slider being dragged).
+        """
+        self.directory = Path(directory)
+        self.poll_interval = poll_interval
+        self.write_delay = write_delay
+        self.max_write_delay = max_write_delay
+        self.persist = persist
+        self.characters: list[dict] = []  # file order; the list itself is shared, never replaced
+        self.on_change = None  # callback(added, changed, removed) after a hot reload
+
+        self._lock = threading.RLock()
+        self._by_name: dict[str, dict] = {}
+        self._paths: dict[str, Path] = {}  # name -> file
+        self._mtimes: dict[Path, float] = {}
+        self._dirty: set[str] = set()
+        self._write_timer: threading.Timer | None = None
+        self._dirty_since: float | None = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+        self.reload()
+
+    # ── Lookup ──
+
+    def get(self, name: str) -> dict | None:
+        return self._by_name.get(name)
+
+    def path_of(self, name: str) -> Path | None:
+        return self._paths.get(name)
+
+    def names(self) -> list[str]:
+        return [c["name"] for c in self.characters]
+
+    def __len__(self) -> int:
+        return len(self.characters)
+
+    def __iter__(self):
+        return iter(list(self.characters))
+
+    # ── Loading ──
+
+    @staticmethod
+    def _prepare(data: dict) -> dict:
+        data["full_system_prompt"] = data.get("system_prompt", "") + build_personality_modifier(data.get("personality"))
+        return data
+
+    def _read(self, path: Path) -> dict | None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or "name" not in data:
+                raise ValueError("missing name")
+            return data
+        except Exception as e:
+            log.error(f"Failed to load {path.name}: {e}")
+            return None
+
+    def reload(self) -> tuple[list[str], list[str], list[str]]:
+        """Re-read files whose mtime changed. Returns (added, changed, removed) names."""
+        added, changed, removed = [], [], []
+        files = sorted(self.directory.glob("*.json")) if self.directory.exists() else []
+        with self._lock:
+            seen = set()
+            for path in files:
+                seen.add(path)
+                try:
+                    mtime = path.stat().st_mtime
+                except OSError:
+                    continue
+                if self._mtimes.get(path) == mtime:
+                    continue
+                data = self._read(path)
+                if data is None:
+                    continue  # keep the last good version (e.g. caught mid-save by an editor)
+                self._mtimes[path] = mtime
+                old_name = next((n for n, p in self._paths.items() if p == path), None)
+                if old_name is not None:
+                    char = self._by_name.pop(old_name)
+                    self._paths.pop(old_name)
+                    # In place (party lists and Brain hold this dict) and never empty,
+                    # since readers don't take the lock: overwrite, then drop stale keys
+                    new = self._prepare(data)
+                    char.update(new)
+                    for key in [k for k in char if k not in new]:
+                        del char[key]
+                    changed.append(char["name"])
+                else:
+                    char = self._prepare(data)
+                    self.characters.append(char)
+                    added.append(char["name"])
+                if char["name"] in self._by_name and self._paths[char["name"]] != path:
+                    log.warning(f"Duplicate name '{char['name']}' in {path.name}")
+                self._by_name[char["name"]] = char
+                self._paths[char["name"]] = path
+            for name, path in list(self._paths.items()):
+                if path not in seen:
+                    char = self._by_name.pop(name)
+                    self._paths.pop(name)
+                    self._mtimes.pop(path, None)
+                    self.characters.remove(char)
+                    removed.append(name)
+            if added:
+                order = {p: i for i, p in enumerate(files)}
+                self.characters.sort(key=lambda c: order.get(self._paths.get(c["name"]), len(order)))
+        return added, changed, removed
+
+    # ── Hot reload ──
+
+    def watch(self):
+        """Poll the folder for edits on a daemon thread."""
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch_loop, daemon=True, name="characters")
+            self._watcher.start()
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            added, changed, removed = self.reload()
+            if added or changed or removed:
+                log.info(f"Reloaded: +{added} ~{changed} -{removed}")
+                if self.on_change:
+                    self.on_change(added, changed, removed)
+
+    # ── Edits ──
+
+    def set_personality(self, name: str, personality: dict | None, save: bool = True) -> dict | None:
+        """Apply a personality and rebuild the prompt. With save (and persist), the file is rewritten shortly after."""
+        with self._lock:
+            char = self._by_name.get(name)
+            if char is None:
+                return None
+            char["personality"] = personality
+            self._prepare(char)
+            if save and self.persist:
+                self._dirty.add(name)
+                # Restart the quiet period on every edit, like persistence.JsonDocument
+                now = time.monotonic()
+                if self._dirty_since is None:
+                    self._dirty_since = now
+                if self._write_timer is not None:
+                    self._write_timer.cancel()
+                delay = max(0.0, min(self.write_delay, self._dirty_since + self.max_write_delay - now))
+                self._write_timer = threading.Timer(delay, self.flush)
+                self._write_timer.daemon = True
+                self._write_timer.start()
+        return char
+
+    def flush(self):
+        """Write pending edits now."""
+        with self._lock:
+            if self._write_timer is not None:
+                self._write_timer.cancel()
+                self._write_timer = None
+            self._dirty_since = None
+            dirty, self._dirty = self._dirty, set()
+            for name in dirty:
+                char, path = self._by_name.get(name), self._paths.get(name)
+                if char is None or path is None:
+                    continue
+                # Start from the file so keys this process doesn't know about survive
+                data = self._read(path) or {}
+                data.update({k: v for k, v in char.items() if k not in DERIVED_KEYS})
+                try:
+                    atomic_write_json(path, data)
+                    self._mtimes[path] = path.stat().st_mtime  # our own write isn't a reload
+                except OSError as e:
+                    log.error(f"Failed to save {path.name}: {e}")
+
+    def close(self):
+        self._stop.set()
+        self.flush()
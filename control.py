@@ -0,0 +1,111 @@
+"""Text control interface for headless runs — drives the same UiBridge methods the UI calls.
+
+One command per line, over stdin or a local TCP socket. A line is either JSON
+
+    {"cmd": "set_capture_source", "args": ["monitor", 1, "Monitor 1"]}
+
+or shell-style words, where each argument is parsed as JSON if it can be:
+
+    set_capture_source monitor 1 "Monitor 1"
+    update_settings {"min_gap": 10}
+
+Each command gets one JSON line back: {"ok": true, "result": ...} or
+{"ok": false, "error": "..."}. `help` lists the available commands.
+"""
+
+import inspect
+import json
+import shlex
+import socketserver
+import sys
+import threading
+
+from log import get_logger
+
+log = get_logger("control")
+
+
+# Bridge methods that only make sense with a desktop session
+_EXCLUDED = {"register_hotkeys"}
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ControlInterface:
+    def __init__(self, bridge, exclude: set[str] = frozenset()):
+        self._bridge = bridge
+        self._excluded = _EXCLUDED | set(exclude)
+
+    def commands(self) -> list[str]:
+        return sorted(
+            name for name, _ in inspect.getmembers(self._bridge, inspect.ismethod)
+            if not name.startswith("_") and name not in self._excluded
+        )
+
+    @staticmethod
+    def _parse(line: str) -> tuple[str, list, dict]:
+        line = line.strip()
+        if line.startswith("{"):
+            msg = json.loads(line)
+            return msg["cmd"], list(msg.get("args", [])), dict(msg.get("kwargs", {}))
+        cmd, _, rest = line.partition(" ")
+        rest = rest.strip()
+        if rest[:1] in ("{", "["):
+            try:
+                return cmd, [json.loads(rest)], {}  # a single JSON object / list argument
+            except json.JSONDecodeError:
+                pass
+        args = []
+        for word in shlex.split(rest):
+            try:
+                args.append(json.loads(word))
+            except json.JSONDecodeError:
+                args.append(word)
+        return cmd, args, {}
+
+    def dispatch(self, line: str) -> dict:
+        try:
+            cmd, args, kwargs = self._parse(line)
+        except (ValueError, KeyError) as e:
+            return {"ok": False, "error": f"bad command: {e}"}
+        if cmd == "help":
+            return {"ok": True, "result": self.commands()}
+        if cmd not in self.commands():
+            return {"ok": False, "error": f"unknown command: {cmd}"}
+        try:
+            result = getattr(self._bridge, cmd)(*args, **kwargs)
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "result": result}
+
+    def serve_stdin(self):
+        """Read commands from stdin on a daemon thread. EOF stops reading but not the bot."""
+
+        def loop():
+            for line in sys.stdin:
+                if line.strip():
+                    print(json.dumps(self.dispatch(line), default=str), flush=True)
+            log.info("stdin closed")
+
+        threading.Thread(target=loop, daemon=True, name="control-stdin").start()
+
+    def serve_tcp(self, port: int, host: str = "127.0.0.1") -> socketserver.ThreadingTCPServer:
+        """Accept JSON-lines clients on host:port (localhost only by default)."""
+        control = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    line = raw.decode("utf-8", "replace")
+                    if not line.strip():
+                        continue
+                    reply = json.dumps(control.dispatch(line), default=str) + "\n"
+                    self.wfile.write(reply.encode("utf-8"))
+
+        server = _TCPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name="control-tcp").start()
+        log.info(f"Listening on {host}:{port}")
+        return server
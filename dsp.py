@@ -0,0 +1,171 @@
+"""Audio DSP helpers — resampling and acoustic echo cancellation."""
+
+import threading
+
+import numpy as np
+
+
+def resample(audio: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """Linear-interpolation resample. Cheap; fine for speech and echo references."""
+    if src_rate == dst_rate or len(audio) == 0:
+        return audio.astype(np.float32, copy=False)
+    n_out = int(round(len(audio) * dst_rate / src_rate))
+    src_t = np.arange(len(audio), dtype=np.float64) / src_rate
+    dst_t = np.arange(n_out, dtype=np.float64) / dst_rate
+    return np.interp(dst_t, src_t, audio).astype(np.float32)
+
+
+class EchoReference:
+    """Ring buffer of the samples sent to the speakers, resampled to the mic rate.
+
+    Voice writes what it plays; Mic reads one block per input callback, so the
+    read position advances in real time alongside the input stream.
+    """
+
+    def __init__(self, sample_rate: int = 16000, max_seconds: float = 60.0):
+        self.sample_rate = sample_rate
+        self._buf = np.zeros(int(sample_rate * max_seconds), dtype=np.float32)
+        self._start = 0  # read index
+        self._size = 0   # samples buffered
+        self._lock = threading.Lock()
+
+    def write(self, audio: np.ndarray, sample_rate: int):
+        audio = resample(np.asarray(audio, dtype=np.float32), sample_rate, self.sample_rate)
+        cap = len(self._buf)
+        if len(audio) > cap:
+            audio = audio[-cap:]
+        with self._lock:
+            overflow = self._size + len(audio) - cap
+            if overflow > 0:  # drop oldest
+                self._start = (self._start + overflow) % cap
+                self._size -= overflow
+            end = (self._start + self._size) % cap
+            first = min(len(audio), cap - end)
+            self._buf[end:end + first] = audio[:first]
+            self._buf[:len(audio) - first] = audio[first:]
+            self._size += len(audio)
+
+    def read(self, n: int) -> np.ndarray:
+        """Next n reference samples, zero-padded when nothing is playing."""
+        out = np.zeros(n, dtype=np.float32)
+        cap = len(self._buf)
+        with self._lock:
+            take = min(n, self._size)
+            first = min(take, cap - self._start)
+            out[:first] = self._buf[self._start:self._start + first]
+            out[first:take] = self._buf[:take - first]
+            self._start = (self._start + take) % cap
+            self._size -= take
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._start = 0
+            self._size = 0
+
+
+class EchoCanceller:
+    """Partitioned-block frequency-domain NLMS echo canceller (overlap-save).
+
+    Removes the speaker signal (reference) from the mic signal. Filter length is
+    block_size * partitions samples (default 512 * 4 = 128 ms at 16 kHz). A Geigel
+    double-talk detector, scaled by the learned speaker-to-mic gain, freezes
+    adaptation while the player is talking.
+    """
+
+    def __init__(
+        self,
+        block_size: int = 512,
+        partitions: int = 4,
+        step: float = 0.1,
+        delay: int = 0,
+        double_talk_ratio: float = 1.5,
+    ):
+        self.block_size = block_size
+        self.partitions = partitions
+        self.step = step
+        self.double_talk_ratio = double_talk_ratio
+
+        n = block_size
+        self._bins = n + 1
+        self._w = np.zeros((partitions, self._bins), dtype=np.complex128)
+        self._xf = np.zeros((partitions, self._bins), dtype=np.complex128)
+        self._x_prev = np.zeros(n, dtype=np.float32)
+        self._power = np.full(self._bins, 1e-6)
+        self._delay = np.zeros(delay, dtype=np.float32)
+        self._ref_peaks = np.zeros(partitions + 1, dtype=np.float32)
+        self._echo_gain = 0.0  # smoothed mic peak / reference peak while only the speaker plays
+
+        # Residual echo metric: smoothed energies over far-end-only blocks
+        self._near_energy = 0.0
+        self._residual_energy = 0.0
+        self.far_end_blocks = 0
+        self.double_talk_blocks = 0
+
+    def _delayed(self, x: np.ndarray) -> np.ndarray:
+        if len(self._delay) == 0:
+            return x
+        joined = np.concatenate([self._delay, x])
+        self._delay = joined[len(x):]
+        return joined[:len(x)]
+
+    def process(self, mic: np.ndarray, ref: np.ndarray) -> np.ndarray:
+        """Cancel echo from one block. Both arrays must be block_size long."""
+        n = self.block_size
+        x = self._delayed(ref)
+
+        xf = np.fft.rfft(np.concatenate([self._x_prev, x]))
+        self._x_prev = x
+        self._xf = np.roll(self._xf, 1, axis=0)
+        self._xf[0] = xf
+
+        y = np.fft.irfft(np.sum(self._w * self._xf, axis=0), 2 * n)[n:]
+        e = (mic - y).astype(np.float32)
+
+        self._ref_peaks = np.roll(self._ref_peaks, 1)
+        self._ref_peaks[0] = np.max(np.abs(x))
+        ref_peak = float(np.max(self._ref_peaks))
+        if ref_peak < 1e-4:
+            return e  # nothing playing: nothing to cancel or learn
+
+        mic_peak = float(np.max(np.abs(mic)))
+        learned = self.far_end_blocks >= 10
+        if learned and mic_peak > self.double_talk_ratio * self._echo_gain * ref_peak:
+            # Geigel: louder than any plausible echo — the player is talking
+            self.double_talk_blocks += 1
+            return e
+
+        self.far_end_blocks += 1
+        gain = mic_peak / ref_peak
+        self._echo_gain = gain if not learned else 0.95 * self._echo_gain + 0.05 * gain
+        self._near_energy = 0.95 * self._near_energy + 0.05 * float(np.mean(mic ** 2))
+        self._residual_energy = 0.95 * self._residual_energy + 0.05 * float(np.mean(e ** 2))
+
+        ef = np.fft.rfft(np.concatenate([np.zeros(n, dtype=np.float32), e]))
+        self._power = 0.9 * self._power + 0.1 * np.abs(xf) ** 2
+        grad = np.conj(self._xf) * (ef * self.step / (self._power + 1e-6))
+        # Gradient constraint: keep each partition's impulse response causal and n long
+        g = np.fft.irfft(grad, 2 * n, axis=1)
+        g[:, n:] = 0.0
+        self._w += np.fft.rfft(g, axis=1)
+        return e
+
+    def erle_db(self) -> float:
+        """Echo return loss enhancement in dB (higher is better; 0 = no cancellation)."""
+        if self._residual_energy <= 0 or self._near_energy <= 0:
+            return 0.0
+        return float(10 * np.log10(self._near_energy / self._residual_energy))
+
+    def stats(self) -> dict:
+        return {
+            "erle_db": round(self.erle_db(), 1),
+            "residual_echo_rms": round(float(np.sqrt(self._residual_energy)), 5),
+            "far_end_blocks": self.far_end_blocks,
+            "double_talk_blocks": self.double_talk_blocks,
+        }
+
+    def reset(self):
+        self._w[:] = 0
+        self._xf[:] = 0
+        self._x_prev[:] = 0
+        self._power[:] = 1e-6
@@ -0,0 +1,100 @@
+"""Orchestrator events — what the LLM loop wakes up for, in priority order.
+
+Player speech, forced comments, scene changes and pause toggles are posted here
+(from any thread via post_threadsafe) and the loop awaits `get()` instead of
+polling. At most one event per kind is pending: a newer one replaces the older
+(the newest frame, the newest pause state), and events that sat past their
+deadline are dropped rather than answered late.
+"""
+
+import asyncio
+import time
+
+# Lower number = handled first
+EVENT_PAUSE = 0   # pause toggled; payload is the new paused state
+EVENT_PLAYER = 1  # player finished an utterance (text is read from Mic)
+EVENT_FORCE = 2   # forced comment from the hotkey / UI
+EVENT_SCENE = 3   # capture saw the screen change; payload is the frame (base64 JPEG)
+
+EVENT_NAMES = {EVENT_PAUSE: "pause", EVENT_PLAYER: "player", EVENT_FORCE: "force", EVENT_SCENE: "scene"}
+
+# Seconds an event stays worth handling
+DEFAULT_DEADLINES = {EVENT_PAUSE: None, EVENT_PLAYER: 15.0, EVENT_FORCE: 10.0, EVENT_SCENE: 5.0}
+
+
+class BotEvent:
+    def __init__(self, kind: int, payload=None, deadline: float | None = None, trace=None):
+        self.kind = kind
+        self.payload = payload
+        self.trace = trace  # tracing.Trace carried through to playback, if any
+        self.created_at = time.perf_counter()
+        self.expires_at = self.created_at + deadline if deadline else None
+
+    @property
+    def name(self) -> str:
+        return EVENT_NAMES.get(self.kind, str(self.kind))
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.perf_counter() > self.expires_at
+
+    def age(self) -> float:
+        return time.perf_counter() - self.created_at
+
+
+class EventQueue:
+    """Prioritized, coalescing event queue. Not thread-safe: use post_threadsafe off the loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._pending: dict[int, BotEvent] = {}
+        self._wakeup = asyncio.Event()
+
+        self.posted = 0
+        self.coalesced = 0
+        self.expired = 0
+
+    def post(self, kind: int, payload=None, deadline: float | None = None, trace=None):
+        if deadline is None:
+            deadline = DEFAULT_DEADLINES.get(kind)
+        if kind in self._pending:
+            self.coalesced += 1
+        self._pending[kind] = BotEvent(kind, payload, deadline, trace)
+        self.posted += 1
+        self._wakeup.set()
+
+    def post_threadsafe(self, kind: int, payload=None, deadline: float | None = None, trace=None):
+        self._loop.call_soon_threadsafe(self.post, kind, payload, deadline, trace)
+
+    def discard(self, *kinds: int):
+        """Drop pending events of these kinds (all kinds if none given)."""
+        for kind in kinds or list(self._pending):
+            self._pending.pop(kind, None)
+
+    def _pop_ready(self) -> BotEvent | None:
+        for kind in sorted(self._pending):
+            event = self._pending.pop(kind)
+            if event.expired():
+                self.expired += 1
+                continue
+            return event
+        return None
+
+    async def get(self) -> BotEvent:
+        """Wait for the highest-priority live event."""
+        while True:
+            event = self._pop_ready()
+            if event is not None:
+                return event
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        return {
+            "pending": [EVENT_NAMES.get(k, str(k)) for k in sorted(self._pending)],
+            "posted": self.posted,
+            "coalesced": self.coalesced,
+            "expired": self.expired,
+        }
@@ -0,0 +1,203 @@
+"""Fake sounddevice streams for offline and headless runs.
+
+FakeInputStream plays WAV audio into an input callback; TimedOutputStream pulls
+from an output callback on a timer and discards the audio or writes it to a WAV.
+"""
+
+import queue
+import threading
+import time
+import wave
+
+import numpy as np
+
+from dsp import resample
+
+
+def read_wav(path, sample_rate: int = 16000) -> np.ndarray:
+    """Load a 16-bit PCM WAV (path or file object) as mono float32 at sample_rate."""
+    with wave.open(path if hasattr(path, "read") else str(path), "rb") as wf:
+        channels = wf.getnchannels()
+        rate = wf.getframerate()
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    audio = pcm.astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return resample(audio, rate, sample_rate)
+
+
+def write_wav(path, audio: np.ndarray, sample_rate: int):
+    """Save mono float32 audio as 16-bit PCM WAV (path or file object)."""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    with wave.open(path if hasattr(path, "write") else str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+
+
+class _Status:
+    """Stand-in for sounddevice.CallbackFlags."""
+
+    def __init__(self, input_overflow: bool = False):
+        self.input_overflow = input_overflow
+
+    def __bool__(self):
+        return self.input_overflow
+
+
+class FakeInputStream:
+    """Drop-in for sd.InputStream that feeds a prerecorded signal to the callback.
+
+    A producer thread emits one block per block period (divided by `speed`) into a
+    small bounded buffer, like a device driver; a consumer thread runs the callback.
+    If the callback falls behind and the buffer is full, the block is dropped and
+    the next callback sees status.input_overflow — the same failure mode a slow
+    callback has against real hardware. speed=0 feeds as fast as the callback runs
+    and never drops.
+    """
+
+    def __init__(
+        self,
+        audio: np.ndarray,
+        samplerate: int = 16000,
+        blocksize: int = 512,
+        callback=None,
+        speed: float = 1.0,
+        buffer_blocks: int = 4,
+        **_,
+    ):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.speed = speed
+        self._audio = audio.astype(np.float32)
+        self._callback = callback
+        self._blocks: queue.Queue = queue.Queue(maxsize=buffer_blocks)
+        self._overflow = False
+        self._threads: list[threading.Thread] = []
+        self._stopped = threading.Event()
+        self.finished = threading.Event()
+        self.time = 0.0  # stream position (seconds) at the end of the block being processed
+        self.dropped_blocks = 0
+        self.active = False
+
+    def _produce(self):
+        period = self.blocksize / self.samplerate / self.speed if self.speed > 0 else 0.0
+        next_t = time.perf_counter()
+        for start in range(0, len(self._audio), self.blocksize):
+            if self._stopped.is_set():
+                break
+            block = self._audio[start:start + self.blocksize]
+            if len(block) < self.blocksize:
+                block = np.pad(block, (0, self.blocksize - len(block)))
+            item = (start + self.blocksize, block.reshape(-1, 1))
+            if period:
+                try:
+                    self._blocks.put_nowait(item)
+                except queue.Full:
+                    self.dropped_blocks += 1
+                    self._overflow = True
+                next_t += period
+                time.sleep(max(0.0, next_t - time.perf_counter()))
+            else:
+                self._blocks.put(item)
+        self._blocks.put(None)
+
+    def _consume(self):
+        while True:
+            item = self._blocks.get()
+            if item is None or self._stopped.is_set():
+                break
+            end, block = item
+            self.time = end / self.samplerate
+            status = _Status(self._overflow)
+            self._overflow = False
+            self._callback(block, self.blocksize, None, status)
+        self.active = False
+        self.finished.set()
+
+    def start(self):
+        self.active = True
+        self._threads = [
+            threading.Thread(target=self._produce, daemon=True),
+            threading.Thread(target=self._consume, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self._stopped.set()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self.active = False
+
+    def close(self):
+        pass
+
+
+class TimedOutputStream:
+    """Drop-in for sd.OutputStream driven by a timer thread instead of a device.
+
+    Pulls one block per block period from the callback (divided by `speed`), so
+    playback takes as long as it would on real speakers and everything waiting on
+    it behaves the same.
+    If `path` is set, non-silent blocks are appended to a 16-bit WAV (silence
+    between lines is skipped to keep long runs small); otherwise audio is discarded.
+    """
+
+    def __init__(
+        self, samplerate: int = 24000, blocksize: int = 512, callback=None, path=None, speed: float = 1.0, **_
+    ):
+        self.samplerate = samplerate
+        self.speed = speed
+        self.blocksize = blocksize
+        self.path = path
+        self._callback = callback
+        self._stopped = threading.Event()
+        self._thread = None
+        self._wav = None
+        self.blocks = 0
+        self.late_blocks = 0  # timer fell more than one block behind (host overloaded)
+        self.active = False
+
+    def _run(self):
+        period = self.blocksize / self.samplerate / self.speed
+        out = np.zeros((self.blocksize, 1), dtype=np.float32)
+        next_t = time.perf_counter()
+        while not self._stopped.is_set():
+            self._callback(out, self.blocksize, None, _Status())
+            self.blocks += 1
+            if self._wav is not None and np.any(out):
+                pcm = (np.clip(out[:, 0], -1.0, 1.0) * 32767).astype(np.int16)
+                self._wav.writeframes(pcm.tobytes())
+            next_t += period
+            delay = next_t - time.perf_counter()
+            if delay < -period:
+                self.late_blocks += 1
+                next_t = time.perf_counter()  # don't try to catch up in a burst
+            elif delay > 0:
+                time.sleep(delay)
+
+    def start(self):
+        if self.path:
+            self._wav = wave.open(str(self.path), "wb")
+            self._wav.setnchannels(1)
+            self._wav.setsampwidth(2)
+            self._wav.setframerate(self.samplerate)
+        self._stopped.clear()
+        self.active = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="audio-sink")
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self.active = False
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
@@ -0,0 +1,210 @@
+"""Structured logging — a queue put on the hot path, formatting and I/O on a writer thread.
+
+    from log import get_logger
+    log = get_logger("mic")
+    log.info("Heard", text=text)          # console: [mic] Heard text='...'
+
+The audio callback, the grab thread and the event loop only pay for a level
+check and a SimpleQueue.put; a slow console never stalls them. Console lines
+keep the old "[module] message" look (non-ASCII replaced, so a cp1252 console
+can't raise). With LOG_FILE set, records are also written as JSON lines and
+the file rotates at LOG_FILE_MB. LOG_SAMPLE keeps only a fraction of a
+module's debug/info lines, e.g. LOG_SAMPLE=mic=0.1,capture=0.5; warnings and
+errors are never sampled.
+"""
+
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+_LEVEL_NAMES = {v: k for k, v in LEVELS.items()}
+
+
+def _parse_sampling(spec: str) -> dict[str, float]:
+    rates = {}
+    for part in spec.split(","):
+        module, _, rate = part.partition("=")
+        if module.strip() and rate.strip():
+            rates[module.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+class _RotatingFile:
+    def __init__(self, path: Path, max_bytes: int, backups: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._f = open(path, "a", encoding="utf-8")
+
+    def write(self, line: str):
+        self._f.write(line)
+        if self.max_bytes and self._f.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._f.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+        self._f = open(self.path, "a", encoding="utf-8")
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+class Logger:
+    def __init__(
+        self,
+        level: int = INFO,
+        path: str | None = None,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 3,
+        sampling: dict[str, float] | None = None,
+        console=None,
+    ):
+        """
+        Args:
+            level: Records below this are dropped at the call site.
+            path: Optional JSON-lines file, rotated at max_bytes with `backups` old files kept.
+            sampling: Module -> fraction of its debug/info records to keep.
+            console: Stream for console lines (default sys.stdout, looked up at write time).
+        """
+        self.level = level
+        self.path = Path(path) if path else None
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sampling = sampling or {}
+        self._console = console
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.dropped = 0  # sampled out
+
+    def log(self, level: int, module: str, msg: str, fields: dict):
+        if level < self.level:
+            return
+        if level < WARNING:
+            rate = self.sampling.get(module)
+            if rate is not None and random.random() >= rate:
+                self.dropped += 1
+                return
+        self._queue.put((time.time(), level, module, msg, fields))
+        if self._writer is None:
+            self._start_writer()
+
+    def _start_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True, name="log")
+                self._writer.start()
+
+    @staticmethod
+    def _console_line(module: str, msg: str, fields: dict) -> str:
+        prefix = f"[{module}] " if module else ""
+        extras = "".join(f" {k}={v!r}" for k, v in fields.items() if k != "traceback")
+        line = prefix + msg + extras
+        if "traceback" in fields:
+            line += "\n" + str(fields["traceback"]).rstrip()
+        return line + "\n"
+
+    def _write_loop(self):
+        out_file = _RotatingFile(self.path, self.max_bytes, self.backups) if self.path else None
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            if isinstance(record, threading.Event):  # flush marker
+                if out_file:
+                    out_file.flush()
+                record.set()
+                continue
+            t, level, module, msg, fields = record
+            stream = self._console or sys.stdout
+            line = self._console_line(module, msg, fields)
+            try:
+                stream.write(line)
+            except UnicodeEncodeError:
+                stream.write(line.encode("ascii", "replace").decode("ascii"))
+            except (OSError, ValueError):
+                pass  # console gone (closed pipe, pythonw); the file still gets it
+            if out_file:
+                row = {"t": round(t, 3), "level": _LEVEL_NAMES[level], "module": module, "msg": msg}
+                row.update(fields)
+                out_file.write(json.dumps(row, default=str) + "\n")
+            if self._queue.empty():
+                try:
+                    stream.flush()
+                except (OSError, ValueError):
+                    pass
+                if out_file:
+                    out_file.flush()
+        if out_file:
+            out_file.close()
+
+    def flush(self, timeout: float = 2.0):
+        """Block until everything logged so far is written."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        if self._writer is not None:
+            self.flush()
+            self._queue.put(None)
+            self._writer.join(timeout=2.0)
+            self._writer = None
+
+
+class ModuleLogger:
+    """Per-module front end; fields become key=value on the console and JSON keys in the file."""
+
+    def __init__(self, logger: Logger, module: str):
+        self._logger = logger
+        self.module = module
+
+    def debug(self, msg: str, **fields):
+        self._logger.log(DEBUG, self.module, msg, fields)
+
+    def info(self, msg: str, **fields):
+        self._logger.log(INFO, self.module, msg, fields)
+
+    def warning(self, msg: str, **fields):
+        self._logger.log(WARNING, self.module, msg, fields)
+
+    def error(self, msg: str, **fields):
+        self._logger.log(ERROR, self.module, msg, fields)
+
+    def enabled(self, level: int) -> bool:
+        """For skipping expensive message building (e.g. per-block VAD numbers)."""
+        return level >= self._logger.level
+
+
+# Process-wide logger; modules get front ends with get_logger(name)
+logger = Logger(
+    level=LEVELS.get(os.getenv("LOG_LEVEL", "info").lower(), INFO),
+    path=os.getenv("LOG_FILE") or None,
+    max_bytes=int(float(os.getenv("LOG_FILE_MB", "10")) * 1024 * 1024),
+    backups=int(os.getenv("LOG_FILE_BACKUPS", "3")),
+    sampling=_parse_sampling(os.getenv("LOG_SAMPLE", "")),
+)
+
+
+def get_logger(module: str) -> ModuleLogger:
+    return ModuleLogger(logger, module)
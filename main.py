@@ -1,51 +1,104 @@
 """Glaze Bot — AI Gaming Companion.
 
 Entry point and orchestrator. Runs capture, mic, and LLM loops concurrently.
+
+    python main.py                                      # desktop window + hotkeys
+    python main.py --tray                               # small tkinter window, no webview runtime
+    python main.py --headless --sink null               # no GUI, commands on stdin
+    python main.py --headless --control tcp:8765 --sink file:out.wav --duration 3600
+    python main.py --record session.zip                 # then: --replay session.zip --speed 2
+    python main.py --profile-startup                    # where the time to window goes
 """
 
+import argparse
 import asyncio
+import json
 import os
 import random
 import sys
 import threading
 
+from startup import profile
+
+# Before the imports below, so their cost shows up in the report
+if any(arg.startswith("--profile-startup") for arg in sys.argv):
+    profile.enable()
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from brain import Brain
-from capture import ScreenCapture
-from mic import Mic
-from ui_bridge import UiBridge, load_characters
-from voice import Voice
+from character_registry import CharacterRegistry
+from events import EVENT_FORCE, EVENT_PAUSE, EVENT_PLAYER, EVENT_SCENE, EventQueue
+from log import get_logger, logger
+from metrics import metrics
+from speech import PRIORITY_IDLE, PRIORITY_PLAYER, PRIORITY_REACTION, SpeechScheduler
+from state_store import StateStore
+from tracing import tracer
+from ui_bridge import UiBridge
+from warmup import ModelWarmup
+
+# capture, mic and voice (numpy, and mss/PIL on first grab) are imported in GlazeBot.__init__,
+# which replay can skip for capture and voice
+
+log = get_logger("main")
+llm_log = get_logger("llm")
 
 
 class GlazeBot:
-    def __init__(self):
-        self.characters = load_characters()
+    def __init__(self, capture=None, brain=None, voice=None, persist: bool = True):
+        """
+        Args:
+            capture, brain, voice: Optional replacements for the default components
+                (e.g. the replay versions from session.py).
+            persist: False leaves settings.json, parties.json and characters/ untouched
+                and starts from the defaults instead of the saved settings (server sessions).
+        """
+        with profile.phase("CharacterRegistry()"):
+            self.registry = CharacterRegistry(persist=persist)
+        self.characters = self.registry.characters
         if not self.characters:
-            print("No characters found in characters/ directory!")
+            log.error("No characters found in characters/ directory!")
+            logger.flush()
             sys.exit(1)
 
-        self.capture = ScreenCapture()
-        self.brain = Brain()
-        self.voice = Voice()
+        if capture is None:
+            with profile.phase("ScreenCapture()"):
+                from capture import ScreenCapture
+
+                capture = ScreenCapture()
+        if voice is None:
+            with profile.phase("Voice()"):
+                from voice import Voice
+
+                voice = Voice()
+        self.capture = capture
+        with profile.phase("Brain()"):
+            self.brain = brain or Brain()
+        self.voice = voice
+        self.speech = SpeechScheduler(self.voice)
+        # Unprompted lines older than this are dropped instead of played late
+        self.speech_ttl = float(os.getenv("SPEECH_TTL", "10"))
 
         self.running = True
         self._loop = None
         self.active_characters = list(self.characters)
 
-        self.app_state = {
+        self.app_state = StateStore({
             "paused": True,
             "characters": self.characters,
+            "registry": self.registry,
             "active_characters": self.active_characters,
             "mic_mode": os.getenv("MIC_MODE", "always_on"),
             "interval": self.capture.interval,
             "brain": self.brain,
             "voice": self.voice,
+            "speech": self.speech,
             "capture": self.capture,
             "on_quit": self._request_quit,
             "on_force_comment": self._force_comment,
+            "on_pause_changed": self._on_pause_changed,
             "interaction_mode": True,
             "interaction_chance": 0.25,
             "min_gap": float(os.getenv("MIN_GAP", "30")),
@@ -57,29 +110,66 @@ class GlazeBot:
             "capture_source_type": None,
             "capture_source_id": 0,
             "capture_source_name": "",
-        }
+        })
 
-        self.bridge = UiBridge(self.app_state)
+        with profile.phase("UiBridge()"):
+            self.bridge = UiBridge(self.app_state, persist=persist)
 
-        self.mic = Mic(
-            self.voice,
-            on_speech_done=self._force_comment,
-            on_transcript=lambda text: self.bridge.log_player(text),
-        )
+        with profile.phase("Mic()"):
+            from mic import Mic
+
+            self.mic = Mic(
+                self.voice,
+                on_speech_done=self._on_player_speech,
+                on_transcript=self._on_transcript,
+                on_barge_in=self._on_player_speech,
+            )
         self.app_state["mic"] = self.mic
         self.app_state["mic_mode"] = self.mic.mode
 
-        self.frame_queue = None
-        self.force_event = None
+        self.warmup = ModelWarmup(self.mic, self.voice)
+        self.app_state["warmup"] = self.warmup
+
+        self.events: EventQueue | None = None
+        self._stop_event = None
+        self._quit = threading.Event()
+        # _start runs on pywebview's worker thread in run(); _shutdown waits for it to finish
+        self._start_requested = False
+        self._start_done = threading.Event()
+        self.recorder = None  # session.SessionRecorder when --record is given
+        self.wait_for_models = False  # load models before starting streams (replay)
+        self.mic_stream_factory = None  # replaces the device input stream (replay)
+        self.llm_executor = None  # shared LLM thread pool (server.py); None = the loop's default
+        self.metrics_suffix = ""  # appended to this bot's gauge names, one per session (server.py)
+        self.exit_after_startup = False  # --profile-startup exit: quit once the front end is up
+        # A frame at most this old is reused when answering the player instead of grabbing a new one
+        self.frame_max_age = float(os.getenv("FRAME_MAX_AGE", "0.5"))
+
+    def _post(self, kind: int, payload=None, trace=None):
+        """Post an orchestrator event from any thread."""
+        if self.events:
+            self.events.post_threadsafe(kind, payload, trace=trace)
 
     def _request_quit(self):
         self.running = False
-        if self._loop:
-            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._quit.set()
+        if self._loop and self._stop_event:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
 
     def _force_comment(self):
-        if self.force_event:
-            self.force_event.set()
+        self._post(EVENT_FORCE, trace=tracer.new_trace("force"))
+
+    def _on_player_speech(self):
+        """Player finished talking (or talked over a character) — answer right away."""
+        self._post(EVENT_PLAYER, trace=self.mic.last_trace)
+
+    def _on_transcript(self, text: str):
+        self.bridge.log_player(text)
+        if self.recorder:
+            self.recorder.transcript(text)
+
+    def _on_pause_changed(self, paused: bool):
+        self._post(EVENT_PAUSE, paused)
 
     def _pick_character(self) -> dict | None:
         active = self.app_state["active_characters"]
@@ -89,57 +179,78 @@ class GlazeBot:
         others = [c for c in self.app_state["active_characters"] if c["name"] != exclude_name]
         return random.choice(others) if others else None
 
-    async def _drain_queue(self):
-        while not self.frame_queue.empty():
-            try:
-                self.frame_queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
+    def _queue_line(self, char: dict, text: str, priority: int, trace=None):
+        """Hand a line to the speech scheduler; the UI shows the speaker once it starts playing."""
+        name = char["name"]
+        self.speech.say(
+            text,
+            voice=char.get("voice"),
+            speaker=name,
+            priority=priority,
+            ttl=None if priority == PRIORITY_PLAYER else self.speech_ttl,
+            on_start=lambda u: self.bridge.set_last_message(name, text),
+            trace=trace,
+        )
+
+    async def _next_event(self):
+        """Wait for the next live event; pause events are handled here and never returned."""
+        while True:
+            event = await self.events.get()
+            if event.kind == EVENT_PAUSE:
+                if event.payload:
+                    self.events.discard()
+                    self.speech.clear()
+                continue
+            if self.app_state["paused"]:
+                continue
+            return event
 
     async def _llm_loop(self):
         import time
         last_spoke_time = 0
 
         while self.running:
-            if self.app_state["paused"]:
-                await self._drain_queue()
-                await asyncio.sleep(0.5)
-                continue
-
-            try:
-                frame_b64 = await asyncio.wait_for(self.frame_queue.get(), timeout=2.0)
-            except asyncio.TimeoutError:
-                continue
-
-            if self.app_state["paused"]:
-                continue
-
-            player_text = self.mic.get_transcript()
+            event = await self._next_event()
+            trace = event.trace or tracer.new_trace(event.name, start=event.created_at)
+            trace.record("queue_wait", event.created_at)
+            player_text = self.mic.get_transcript() if event.kind == EVENT_PLAYER else None
             min_gap = self.app_state.get("min_gap", 12)
 
             if player_text:
-                print(f"[llm] Player said: {player_text.encode('ascii','ignore').decode()}", flush=True)
-            else:
+                llm_log.info(f"Player said: {player_text}")
+            elif event.kind == EVENT_PLAYER:
+                continue  # already answered along with an earlier event
+            elif event.kind == EVENT_SCENE:
                 if time.time() - last_spoke_time < min_gap:
                     continue
+                if self.speech.pending() > 1:
+                    continue  # one line playing and one ready is enough lookahead
 
-            char = self._pick_character()
-            if not char:
-                await asyncio.sleep(1)
+            # Scene events carry their frame; the player and forced comments get the freshest one
+            if event.kind == EVENT_SCENE:
+                frame_b64 = event.payload
+            else:
+                with trace.span("frame_fetch"):
+                    frame_b64 = await self.capture.latest(max_age=self.frame_max_age)
+            if frame_b64 is None:
+                llm_log.info("No capture source selected, skipping")
                 continue
 
-            if self.app_state["paused"]:
+            char = self._pick_character()
+            if not char:
                 continue
 
             game_hint = self.app_state.get("game_hint", "")
 
             try:
-                reply = await asyncio.get_event_loop().run_in_executor(
-                    None, self.brain.chat, frame_b64, player_text, char, None, game_hint
-                )
+                # Non-streaming call, so this span is request -> full reply (= first token)
+                with trace.span("llm", character=char["name"]):
+                    reply = await asyncio.get_event_loop().run_in_executor(
+                        self.llm_executor, self.brain.chat, frame_b64, player_text, char, None, game_hint
+                    )
             except Exception as e:
-                err = str(e).encode("ascii", "ignore").decode()
-                print(f"[brain] API error: {err}", flush=True)
+                metrics.counter("llm_errors", "LLM calls that raised").inc()
+                llm_log.error(f"API error: {e}", character=char["name"])
                 await asyncio.sleep(2)
                 continue
 
@@ -151,15 +262,11 @@ class GlazeBot:
 
             last_spoke_time = time.time()
             char_name = char["name"]
-            safe_reply = reply.encode("ascii", "ignore").decode()
-            print(f"[{char_name}] {safe_reply}", flush=True)
-            self.bridge.set_last_message(char_name, reply)
+            llm_log.info(f"{char_name}: {reply}")
+            self._queue_line(char, reply, PRIORITY_PLAYER if player_text else PRIORITY_IDLE, trace)
 
-            await asyncio.get_event_loop().run_in_executor(
-                None, self.voice.speak, reply, char.get("voice")
-            )
-
-            # Character interaction
+            # Character interaction — generated while the first line plays. If the player
+            # cuts the first line off, the scheduler drops the queued reaction.
             if (
                 self.app_state.get("interaction_mode")
                 and len(self.app_state["active_characters"]) > 1
@@ -170,7 +277,7 @@ class GlazeBot:
                 if reactor:
                     try:
                         react_reply = await asyncio.get_event_loop().run_in_executor(
-                            None, self.brain.chat, frame_b64, None, reactor,
+                            self.llm_executor, self.brain.chat, frame_b64, None, reactor,
                             {"name": char_name, "text": reply}, game_hint,
                         )
                     except Exception:
@@ -178,34 +285,43 @@ class GlazeBot:
 
                     if react_reply and not self.app_state["paused"]:
                         reactor_name = reactor["name"]
-                        safe_react = react_reply.encode("ascii", "ignore").decode()
-                        print(f"[{reactor_name}] {safe_react}", flush=True)
-                        self.bridge.set_last_message(reactor_name, react_reply)
-                        await asyncio.get_event_loop().run_in_executor(
-                            None, self.voice.speak, react_reply, reactor.get("voice")
-                        )
+                        llm_log.info(f"{reactor_name}: {react_reply}")
+                        self._queue_line(reactor, react_reply, PRIORITY_REACTION)
                         last_spoke_time = time.time()
 
     async def _run_async(self):
-        self.frame_queue = asyncio.Queue(maxsize=2)
-        self.force_event = asyncio.Event()
-
-        capture_task = asyncio.create_task(self.capture.run(self.frame_queue, self.force_event))
-        llm_task = asyncio.create_task(self._llm_loop())
+        self.events = EventQueue(asyncio.get_running_loop())
+        self.app_state["events"] = self.events
+        self._stop_event = asyncio.Event()
+
+        tasks = {
+            asyncio.create_task(
+                self.capture.run(lambda b64, trace: self.events.post(EVENT_SCENE, b64, trace=trace)),
+                name="capture",
+            ),
+            asyncio.create_task(self._llm_loop(), name="llm"),
+        }
+        stop_task = asyncio.create_task(self._stop_event.wait())
 
+        # Sleep until quit or until a task dies, instead of polling task health
         while self.running:
-            for t in [capture_task, llm_task]:
-                if t.done() and not t.cancelled():
+            done, _ = await asyncio.wait(tasks | {stop_task}, return_when=asyncio.FIRST_COMPLETED)
+            for t in done - {stop_task}:
+                tasks.discard(t)
+                if not t.cancelled() and t.exception():
                     exc = t.exception()
-                    if exc:
-                        print(f"[async] Task crashed: {exc}", flush=True)
-                        import traceback
-                        traceback.print_exception(type(exc), exc, exc.__traceback__)
-            await asyncio.sleep(0.5)
-
-        capture_task.cancel()
-        llm_task.cancel()
-        for task in [capture_task, llm_task]:
+                    import traceback
+                    log.error(
+                        f"Task {t.get_name()} crashed: {exc}",
+                        traceback="".join(traceback.format_exception(type(exc), exc, exc.__traceback__)),
+                    )
+            if stop_task in done or not tasks:
+                break
+
+        stop_task.cancel()
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
             try:
                 await task
             except asyncio.CancelledError:
@@ -217,26 +333,88 @@ class GlazeBot:
         try:
             self._loop.run_until_complete(self._run_async())
         except Exception as e:
-            print(f"[async] Error: {e}", flush=True)
+            log.error(f"Async loop error: {e}")
         finally:
             self._loop.close()
 
-    def run(self):
-        import webview
-
-        print("Glaze Bot starting...", flush=True)
-        print(f"Characters: {len(self.characters)} loaded", flush=True)
-        print(f"Model: {self.brain.model}", flush=True)
-        print(f"Mic: {self.mic.mode}", flush=True)
-        print(f"Interval: {self.capture.interval}s | Min gap: {self.app_state['min_gap']}s", flush=True)
-        print(flush=True)
+    def _start(self):
+        """Start everything except the front end."""
+        self._start_requested = True
+        try:
+            if not self.running:
+                return  # quit before we got here (window closed right away)
+            self._start_components()
+        except Exception as e:
+            import traceback
+            log.error(f"Startup failed: {e}", traceback=traceback.format_exc())
+            raise
+        finally:
+            self._start_done.set()
+
+    def _start_components(self):
+        log.info(
+            "Glaze Bot starting",
+            characters=len(self.characters),
+            model=self.brain.model,
+            mic=self.mic.mode,
+            interval=self.capture.interval,
+            min_gap=self.app_state["min_gap"],
+        )
 
-        self.mic.start()
-        self.bridge.register_hotkeys()
+        self.registry.watch()
+        suffix = self.metrics_suffix
+        metrics.gauge(f"speech_queue_depth{suffix}", "Lines queued or synthesizing", fn=self.speech.pending)
+        metrics.gauge(f"events_pending{suffix}", "Orchestrator events waiting", fn=lambda: len(self.events or ()))
+        port = os.getenv("METRICS_PORT")
+        metrics.start_export(
+            os.getenv("METRICS_FILE") or None,
+            interval=float(os.getenv("METRICS_INTERVAL", "10")),
+            port=int(port) if port else None,
+        )
+        self.warmup.start()
+        if self.wait_for_models:
+            self.warmup.wait()
+        self.speech.start()
+        self.mic.start(load_models=False, stream_factory=self.mic_stream_factory)
 
         async_thread = threading.Thread(target=self._async_thread, daemon=True)
         async_thread.start()
 
+    def _shutdown(self, close_shared: bool = True):
+        """Stop this bot. close_shared=False leaves the process-wide tracer and metrics exporter running (server.py)."""
+        self.running = False
+        # Stopping streams that _start is still opening would leave them running
+        if self._start_requested and not self._start_done.wait(timeout=10.0):
+            log.warning("Startup still running after 10s; shutting down anyway")
+        self.mic.stop()
+        self.speech.stop()
+        self.voice.close()
+        self.capture.close()
+        self.registry.close()
+        self.bridge.flush()
+        if self.recorder:
+            self.recorder.close()
+        if close_shared:
+            tracer.close()
+            metrics.close()
+        log.info("Glaze Bot stopped")
+        if close_shared:
+            logger.flush()
+
+    def _on_ready(self, front_end: str):
+        """The front end is up; completes the --profile-startup report."""
+        logger.flush()
+        profile.ready(front_end)
+        if self.exit_after_startup:
+            self.bridge.persist = False  # a measuring run shouldn't rewrite settings.json
+            self.bridge.quit_app()
+
+    def run(self):
+        with profile.phase("import webview"):
+            import webview
+
+        self.bridge.register_hotkeys()
+
         dev_ui = os.getenv("DEV_UI")
         url = "http://localhost:5173" if dev_ui else os.path.join(
             os.path.dirname(__file__), "ui", "dist", "index.html"
@@ -248,16 +426,119 @@ class GlazeBot:
                 width=900, height=640, on_top=True, background_color="#1e1e2e",
             )
             self.bridge._window = window
-            webview.start()
+            window.events.shown += lambda: self._on_ready("window")
+            # Streams, warm-up and the LLM loop start on pywebview's worker thread once the
+            # GUI loop runs, so the window doesn't wait for them
+            self._start_requested = True
+            webview.start(self._start)
         except KeyboardInterrupt:
             pass
         finally:
-            self.running = False
-            self.mic.stop()
-            self.capture.close()
-            print("\nGlaze Bot stopped.", flush=True)
+            self._shutdown()
 
+    def run_tray(self):
+        """Run with the tkinter control window instead of the webview (much less memory)."""
+        from tray import TrayApp
+
+        with profile.phase("start"):
+            self._start()
+        self.bridge.register_hotkeys()
+        try:
+            TrayApp(self.bridge).run(on_ready=lambda: self._on_ready("tray"))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._shutdown()
+
+    def run_headless(self, control: str = "stdin", duration: float | None = None, unpause: bool = False):
+        """Run without a window or global hotkeys, driven by the control interface.
+
+        Args:
+            control: "stdin", "tcp:PORT" or "none".
+            duration: Quit after this many seconds (for unattended soak runs).
+            unpause: Start commenting right away instead of waiting for toggle_pause.
+        """
+        from control import ControlInterface
+
+        with profile.phase("start"):
+            self._start()
+        self._on_ready("headless")
+        ctl = ControlInterface(self.bridge)
+        server = None
+        if control == "stdin":
+            ctl.serve_stdin()
+        elif control.startswith("tcp:"):
+            server = ctl.serve_tcp(int(control[len("tcp:"):]))
+        if unpause:
+            self.bridge.toggle_pause()
+
+        try:
+            self._quit.wait(timeout=duration)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if server:
+                server.shutdown()
+            logger.flush()  # keep the summary after the last log lines
+            print(json.dumps({"latency_ms": tracer.summary()}, indent=2), flush=True)
+            self._shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Glaze Bot — AI gaming companion")
+    parser.add_argument("--headless", action="store_true", help="No window or hotkeys; control via stdin/TCP")
+    parser.add_argument("--tray", action="store_true", help="Small tkinter window instead of the web UI (UI_FRONTEND=tray)")
+    parser.add_argument("--control", default="stdin", help="Headless control: stdin | tcp:PORT | none")
+    parser.add_argument("--sink", default=None, help="Audio output: device | null | file:PATH (overrides AUDIO_SINK)")
+    parser.add_argument("--duration", type=float, default=None, help="Headless: quit after N seconds")
+    parser.add_argument("--unpause", action="store_true", help="Headless: start commenting immediately")
+    parser.add_argument("--record", default=None, metavar="PATH", help="Record the session to a zip archive")
+    parser.add_argument("--replay", default=None, metavar="PATH", help="Replay a recorded session headless")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay: input playback rate")
+    parser.add_argument("--replay-llm", choices=("recorded", "mock"), default="recorded")
+    parser.add_argument("--replay-tts", choices=("live", "recorded"), default="live")
+    parser.add_argument("--replay-stt", choices=("live", "recorded"), default=None)
+    parser.add_argument("--report", default=None, metavar="PATH", help="Replay: write a JSON report here")
+    parser.add_argument(
+        "--profile-startup", nargs="?", const="report", choices=("report", "exit"), default=None,
+        help="Report import and initializer times once the UI is up; 'exit' quits right after",
+    )
+    args = parser.parse_args()
+
+    if args.sink:
+        os.environ["AUDIO_SINK"] = args.sink
+
+    if args.replay:
+        from session import SessionReplay
+
+        replay = SessionReplay(
+            args.replay, speed=args.speed, llm=args.replay_llm,
+            tts=args.replay_tts, stt=args.replay_stt, sink=args.sink,
+        )
+        bot = GlazeBot(capture=replay.make_capture(), brain=replay.make_brain(), voice=replay.make_voice())
+        replay.prepare(bot)
+        bot.run_headless(control="none" if args.control == "stdin" else args.control, unpause=True)
+        report = replay.report(bot)
+        print(json.dumps(report, indent=2), flush=True)
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        return
 
-if __name__ == "__main__":
     bot = GlazeBot()
-    bot.run()
+    bot.exit_after_startup = args.profile_startup == "exit"
+    if args.record:
+        from session import SessionRecorder
+
+        bot.recorder = SessionRecorder(args.record)
+        bot.recorder.attach(bot)
+    if args.headless:
+        bot.run_headless(args.control, args.duration, args.unpause)
+    elif args.tray or os.getenv("UI_FRONTEND", "webview") == "tray":
+        bot.run_tray()
+    else:
+        bot.run()
+
+
+if __name__ == "__main__":
+    main()
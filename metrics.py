@@ -0,0 +1,225 @@
+"""Runtime metrics — counters, gauges and fixed-bucket histograms.
+
+Updates are a few attribute writes (no locks, no allocation), cheap enough
+for the audio callback and the grab thread. Readers get a snapshot through
+UiBridge.get_metrics. Set METRICS_FILE to export periodically: a name ending
+in .prom gets Prometheus text (rewritten in place, for node_exporter's
+textfile collector), anything else gets one JSON line per interval.
+METRICS_PORT serves the Prometheus text over HTTP at /metrics.
+"""
+
+import bisect
+import json
+import threading
+import time
+from pathlib import Path
+
+from log import get_logger
+from persistence import atomic_write_text
+
+log = get_logger("metrics")
+
+# Bucket upper bounds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)  # seconds
+RATIO_BUCKETS = (0.01, 0.02, 0.03, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0)
+TOKEN_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2000, 4000)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, n: float = 1):
+        self.value += n
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str = "", fn=None):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+        self._fn = fn  # read at snapshot time instead of set() by the code being measured
+
+    def set(self, value: float):
+        self.value = value
+
+    def snapshot(self):
+        if self._fn is not None:
+            try:
+                return self._fn()
+            except Exception:
+                return None
+        return self.value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, buckets: tuple, help: str = ""):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-th observation (the +Inf bucket reports the top bound)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.buckets[min(i, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "mean": round(self.sum / self.count, 4) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()  # registration only
+        self._started = time.time()
+        self._exporter = None
+        self._export_path: Path | None = None  # what start_export was given; close() writes there too
+        self._export_stop = threading.Event()
+        self._http = None
+
+    def _get(self, name: str, factory):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, factory())
+        return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(name, lambda: Counter(name, help))
+
+    def gauge(self, name: str, help: str = "", fn=None) -> Gauge:
+        """A gauge; with fn, its value is fn() at read time (re-registering replaces fn)."""
+        gauge = self._get(name, lambda: Gauge(name, help, fn))
+        if fn is not None:
+            gauge._fn = fn
+        return gauge
+
+    def histogram(self, name: str, buckets: tuple, help: str = "") -> Histogram:
+        return self._get(name, lambda: Histogram(name, buckets, help))
+
+    def snapshot(self) -> dict:
+        result = {"uptime_s": round(time.time() - self._started, 1), "counters": {}, "gauges": {}, "histograms": {}}
+        for name, metric in sorted(self._metrics.items()):
+            result[metric.kind + "s"][name] = metric.snapshot()
+        return result
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format; names get a glaze_ prefix."""
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            full = f"glaze_{name}"
+            if metric.help:
+                lines.append(f"# HELP {full} {metric.help}")
+            lines.append(f"# TYPE {full} {metric.kind}")
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, n in zip(list(metric.buckets) + ["+Inf"], metric.counts):
+                    cumulative += n
+                    lines.append(f'{full}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f"{full}_sum {metric.sum}")
+                lines.append(f"{full}_count {metric.count}")
+            else:
+                value = metric.snapshot()
+                if value is not None:
+                    lines.append(f"{full} {value}")
+        return "\n".join(lines) + "\n"
+
+    # ── Export ──
+
+    def start_export(self, path: str | None = None, interval: float = 10.0, port: int | None = None):
+        """Write snapshots to path every interval seconds and/or serve /metrics on localhost:port."""
+        if path and self._exporter is None:
+            self._export_path = Path(path)
+            self._export_stop.clear()
+            self._exporter = threading.Thread(
+                target=self._export_loop, args=(self._export_path, interval), daemon=True, name="metrics"
+            )
+            self._exporter.start()
+        if port and self._http is None:
+            # Imported here: http.server pulls in email and html, which nothing else at startup needs
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+            registry = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.rstrip("/") not in ("", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = registry.prometheus().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            self._http = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+            self._http.daemon_threads = True
+            threading.Thread(target=self._http.serve_forever, daemon=True, name="metrics-http").start()
+            log.info(f"Serving http://127.0.0.1:{port}/metrics")
+
+    def _export_loop(self, path: Path, interval: float):
+        while not self._export_stop.wait(interval):
+            try:
+                self.export_once(path)
+            except Exception as e:
+                log.error(f"Export failed: {e}")
+
+    def export_once(self, path: Path):
+        if path.suffix == ".prom":
+            atomic_write_text(path, self.prometheus())
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"t": round(time.time(), 3), **self.snapshot()}, default=str) + "\n")
+
+    def close(self):
+        if self._exporter is not None:
+            self._export_stop.set()
+            self._exporter.join(timeout=2.0)
+            self._exporter = None
+            self.export_once(self._export_path)  # final numbers
+        if self._http is not None:
+            self._http.shutdown()
+            self._http = None
+
+
+# Process-wide registry; components record into it
+metrics = Metrics()
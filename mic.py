@@ -1,29 +1,63 @@
 """Mic input with Silero VAD + faster-whisper STT."""
 
+import functools
 import os
 import queue
 import threading
+import time
 
 import numpy as np
-import sounddevice as sd
+
+from dsp import EchoCanceller
+from log import DEBUG, get_logger
+from metrics import LATENCY_BUCKETS, metrics
+from tracing import tracer
+
+log = get_logger("mic")
+_vad_onsets = metrics.counter("mic_vad_onsets", "Utterances opened by VAD")
+_dropped_blocks = metrics.counter("mic_dropped_blocks", "Input blocks lost to stream overflow")
+_transcripts = metrics.counter("mic_transcripts", "Non-empty transcripts")
+_stt_seconds = metrics.histogram("stt_seconds", LATENCY_BUCKETS, "Whisper transcription time")
 
 
 class Mic:
-    def __init__(self, voice_ref, on_speech_done=None, on_transcript=None):
+    def __init__(self, voice_ref, on_speech_done=None, on_transcript=None, on_barge_in=None, on_vad=None):
         """
         Args:
             voice_ref: Voice instance — checked to mute mic during TTS playback.
             on_speech_done: Optional callback when a transcript is ready (e.g. to force a frame send).
             on_transcript: Optional callback with the transcript text (e.g. to log to UI).
+            on_barge_in: Optional callback when a transcript that interrupted TTS is ready
+                (e.g. to answer it right away instead of waiting for the next frame).
+            on_vad: Optional callback with "onset" / "offset" when VAD opens or closes an utterance.
         """
         self.mode = os.getenv("MIC_MODE", "always_on")  # always_on | push_to_talk | off
+        self.device = os.getenv("MIC_DEVICE", "default")
         self.whisper_model_name = os.getenv("WHISPER_MODEL", "tiny.en")
         self.vad_sensitivity = float(os.getenv("VAD_SENSITIVITY", "0.5"))
         self.sample_rate = 16000
+        # Run whisper in a subprocess (model_host.py) instead of in-process
+        self.model_host = os.getenv("MODEL_HOST", "0") == "1"
+
+        # Barge-in: keep VAD running during TTS and cut playback when the player talks over it
+        self.barge_in = os.getenv("BARGE_IN", "0") == "1"
+        self.barge_in_sensitivity = float(os.getenv("BARGE_IN_SENSITIVITY", "0.8"))
+        self.barge_in_ms = int(os.getenv("BARGE_IN_MS", "250"))
+        # Echo guard: input must be this many times louder than the speaker bleed measured so far
+        self.barge_in_echo_ratio = float(os.getenv("BARGE_IN_ECHO_RATIO", "2.0"))
+
+        # Echo cancellation: subtract the TTS signal from the input so the mic can stay live
+        self.echo_cancel = os.getenv("ECHO_CANCEL", "0") == "1"
+        self._aec = EchoCanceller(
+            block_size=512,
+            delay=int(float(os.getenv("AEC_DELAY_MS", "0")) / 1000 * self.sample_rate),
+        ) if self.echo_cancel else None
 
         self._voice = voice_ref
         self._on_speech_done = on_speech_done
         self._on_transcript = on_transcript
+        self._on_barge_in = on_barge_in
+        self._on_vad = on_vad
         self._transcript_queue: queue.Queue[str] = queue.Queue()
         self._audio_buffer: list[np.ndarray] = []
         self._is_speaking = False  # user is speaking
@@ -31,43 +65,129 @@ class Mic:
         self._running = False
         self._thread = None
 
-        # Lazy-loaded models
+        # Lazy-loaded models (may be loaded early by ModelWarmup)
         self._vad_model = None
         self._whisper = None
+        self._vad_lock = threading.Lock()
+        self._whisper_lock = threading.Lock()
         self._ptt_held = False
         self._callback_count = 0
         self._speech_detect_count = 0
+        self.dropped_blocks = 0  # input overflows reported by the stream
+        self.last_trace = None  # trace of the most recent transcript, picked up by on_speech_done
+        # Optional callback(block) with every raw input block, e.g. session recording
+        self.input_tap = None
+
+        # Barge-in state (audio callback thread only)
+        self._echo_rms = 0.0
+        self._barge_in_chunks: list[np.ndarray] = []
+        self._barge_in_flush = False
+
+    def _load_vad(self, warm: bool = False):
+        with self._vad_lock:
+            if self._vad_model is None:
+                from silero_vad import load_silero_vad
+
+                model = load_silero_vad()
+                if warm:
+                    import torch
+
+                    model(torch.zeros(512), self.sample_rate)
+                    model.reset_states()
+                self._vad_model = model  # publish only once warm; the callback checks for None
+
+    def _load_whisper(self, warm: bool = False):
+        with self._whisper_lock:
+            if self._whisper is None and self.model_host:
+                from model_host import ModelHost
+
+                host = ModelHost("stt", {"model": self.whisper_model_name})
+                host.start()
+                if warm:
+                    host.transcribe(np.zeros(self.sample_rate, dtype=np.float32))
+                self._whisper = host
+            elif self._whisper is None:
+                from faster_whisper import WhisperModel
+
+                model = WhisperModel(
+                    self.whisper_model_name, device="cpu", compute_type="int8"
+                )
+                if warm:
+                    segments, _ = model.transcribe(
+                        np.zeros(self.sample_rate, dtype=np.float32), language="en"
+                    )
+                    list(segments)  # segments is a lazy generator
+                self._whisper = model
+
+    def warm_up_vad(self):
+        """Load Silero VAD and run one dummy chunk through it."""
+        self._load_vad(warm=True)
+
+    def warm_up_whisper(self):
+        """Load faster-whisper and transcribe a short silent clip to warm caches."""
+        self._load_whisper(warm=True)
+
+    def _vad_confidence(self, audio_chunk: np.ndarray) -> float:
+        """Run VAD on a chunk. Returns the speech probability."""
+        import torch
 
-    def _load_vad(self):
-        if self._vad_model is None:
-            from silero_vad import load_silero_vad
-
-            self._vad_model = load_silero_vad()
+        tensor = torch.from_numpy(audio_chunk).float()
+        confidence = self._vad_model(tensor, self.sample_rate).item()
 
-    def _load_whisper(self):
-        if self._whisper is None:
-            from faster_whisper import WhisperModel
+        if self._callback_count % 500 == 0 and log.enabled(DEBUG):
+            rms = np.sqrt(np.mean(audio_chunk ** 2))
+            log.debug("VAD", conf=round(confidence, 3), rms=round(float(rms), 4))
 
-            self._whisper = WhisperModel(
-                self.whisper_model_name, device="cpu", compute_type="int8"
-            )
+        return confidence
 
     def _vad_check(self, audio_chunk: np.ndarray) -> bool:
         """Run VAD on a chunk. Returns True if speech detected."""
-        import torch
+        return self._vad_confidence(audio_chunk) > self.vad_sensitivity
 
-        tensor = torch.from_numpy(audio_chunk).float()
-        confidence = self._vad_model(tensor, self.sample_rate).item()
+    def _barge_in_check(self, raw: np.ndarray, audio: np.ndarray):
+        """VAD during TTS playback. Stops the voice once player speech is confirmed.
 
-        if self._callback_count % 500 == 0:
-            rms = np.sqrt(np.mean(audio_chunk ** 2))
-            print(f"[mic] VAD conf={confidence:.3f}, rms={rms:.4f}", flush=True)
+        Args:
+            raw: Chunk before auto-gain, used for the speaker-echo energy guard.
+            audio: Gained chunk fed to VAD.
+        """
+        if self._vad_model is None:
+            return
+        try:
+            confidence = self._vad_confidence(audio)
+        except Exception:
+            return
+        rms = float(np.sqrt(np.mean(raw ** 2)))
+
+        is_speech = (
+            confidence > self.barge_in_sensitivity
+            and rms > self._echo_rms * self.barge_in_echo_ratio
+        )
+        if not is_speech:
+            # Track speaker bleed so the guard adapts to volume/room
+            self._echo_rms = 0.9 * self._echo_rms + 0.1 * rms
+            self._barge_in_chunks.clear()
+            return
 
-        return confidence > self.vad_sensitivity
+        self._barge_in_chunks.append(audio)
+        needed = max(1, int(self.barge_in_ms / 1000 * self.sample_rate / len(audio)))
+        if len(self._barge_in_chunks) < needed:
+            return
+
+        log.info("Barge-in", conf=round(confidence, 2), rms=round(rms, 4))
+        self._voice.stop()
+        # Hand the confirmed speech to the normal VAD path, which takes over once playback stops
+        self._audio_buffer.extend(self._barge_in_chunks)
+        self._barge_in_chunks.clear()
+        self._is_speaking = True
+        self._silence_frames = 0
+        self._barge_in_flush = True
 
     def _transcribe(self, audio: np.ndarray) -> str:
         """Transcribe audio buffer with faster-whisper."""
         self._load_whisper()
+        if self.model_host:
+            return self._whisper.transcribe(audio, language="en")
         segments, _ = self._whisper.transcribe(audio, language="en")
         text = " ".join(seg.text.strip() for seg in segments)
         return text.strip()
@@ -75,17 +195,28 @@ class Mic:
     def _audio_callback(self, indata, frames, time_info, status):
         """Called by sounddevice for each audio chunk."""
         self._callback_count += 1
+        if self.input_tap:
+            self.input_tap(indata[:, 0])
+        if status and getattr(status, "input_overflow", False):
+            self.dropped_blocks += 1
+            _dropped_blocks.inc()
         if self._callback_count == 100:
-            peak = np.max(np.abs(indata))
-            print(f"[mic] Callback alive, 100 chunks processed, peak={peak:.4f}", flush=True)
+            peak = float(np.max(np.abs(indata)))
+            log.info("Callback alive, 100 chunks processed", peak=round(peak, 4))
+
+        speaking = self._voice.is_speaking()
+        audio = indata[:, 0].copy()  # mono
 
-        if self._voice.is_speaking():
+        if self._aec and len(audio) == self._aec.block_size:
+            # Runs on every block (even silent or off) so the reference stays aligned with the input
+            ref = self._voice.echo_ref.read(len(audio))
+            audio = self._aec.process(audio, ref)
+        elif speaking and not (self.barge_in and self.mode == "always_on"):
             return  # mute while TTS is playing
 
         if self.mode == "off":
             return
-
-        audio = indata[:, 0].copy()  # mono
+        raw = audio
 
         # Auto-gain: boost quiet signals for VAD detection
         peak = np.max(np.abs(audio))
@@ -94,6 +225,14 @@ class Mic:
             audio = audio * gain
             audio = np.clip(audio, -1.0, 1.0)
 
+        if speaking and self.barge_in and self.mode == "always_on":
+            if self._barge_in_flush:
+                self._audio_buffer.append(audio)  # already barged in; playback is winding down
+            else:
+                self._barge_in_check(raw, audio)
+            return
+        self._barge_in_chunks.clear()
+
         if self.mode == "push_to_talk":
             if self._ptt_held:
                 self._audio_buffer.append(audio)
@@ -102,13 +241,19 @@ class Mic:
                 self._flush_buffer()
             return
 
-        # Always-on mode: use VAD
+        # Always-on mode: use VAD (skipped until the model finishes loading)
+        if self._vad_model is None:
+            return
         try:
             is_speech = self._vad_check(audio)
         except Exception:
             return
 
         if is_speech:
+            if not self._is_speaking:
+                _vad_onsets.inc()
+                if self._on_vad:
+                    self._on_vad("onset")
             self._is_speaking = True
             self._silence_frames = 0
             self._audio_buffer.append(audio)
@@ -116,12 +261,16 @@ class Mic:
             self._silence_frames += 1
             # ~300ms silence at 512 samples/chunk = ~9 chunks
             if self._silence_frames > int(0.3 * self.sample_rate / 512):
+                if self._on_vad:
+                    self._on_vad("offset")
                 self._flush_buffer()
                 self._is_speaking = False
                 self._silence_frames = 0
 
     def _flush_buffer(self):
         """Concatenate audio buffer, transcribe, queue result."""
+        barge_in = self._barge_in_flush
+        self._barge_in_flush = False
         if not self._audio_buffer:
             return
         audio = np.concatenate(self._audio_buffer)
@@ -131,18 +280,32 @@ class Mic:
             return
 
         try:
+            trace = tracer.new_trace("player")
+            start = time.perf_counter()
             text = self._transcribe(audio)
+            trace.record("stt", start, audio_s=round(len(audio) / self.sample_rate, 2))
+            _stt_seconds.observe(time.perf_counter() - start)
             if text:
-                safe = text.encode("ascii", "ignore").decode()
-                print(f"[mic] Heard: {safe}", flush=True)
-                self._transcript_queue.put(text)
-                if self._on_transcript:
-                    self._on_transcript(text)
-                if self._on_speech_done:
-                    self._on_speech_done()
+                _transcripts.inc()
+                self.last_trace = trace
+                self.deliver_transcript(text, barge_in)
         except Exception as e:
-            err = str(e).encode("ascii", "ignore").decode()
-            print(f"[mic] Transcription error: {err}", flush=True)
+            log.error(f"Transcription error: {e}")
+
+    def deliver_transcript(self, text: str, barge_in: bool = False):
+        """Queue a transcript and fire the callbacks. Also used to inject recorded transcripts on replay."""
+        log.info(f"Heard: {text}")
+        self._transcript_queue.put(text)
+        if self._on_transcript:
+            self._on_transcript(text)
+        if barge_in and self._on_barge_in:
+            self._on_barge_in()
+        elif self._on_speech_done:
+            self._on_speech_done()
+
+    def echo_stats(self) -> dict:
+        """Residual-echo metrics from the canceller (ERLE in dB, residual RMS), or {} if disabled."""
+        return self._aec.stats() if self._aec else {}
 
     def set_ptt(self, held: bool):
         """Set push-to-talk state."""
@@ -161,35 +324,44 @@ class Mic:
                 break
         return " ".join(texts) if texts else None
 
-    def start(self):
-        """Start the mic input stream."""
+    def start(self, load_models: bool = True, stream_factory=None):
+        """Start the mic input stream.
+
+        Args:
+            load_models: Load VAD synchronously first. Pass False when a ModelWarmup
+                is loading it in the background; VAD is skipped until it is ready.
+            stream_factory: Optional replacement for sd.InputStream (same keyword
+                arguments), e.g. a FakeInputStream replaying recorded audio.
+        """
         if self.mode == "off":
-            print("[mic] Mic mode is off, skipping", flush=True)
+            log.info("Mic mode is off, skipping")
             return
 
         try:
-            self._load_vad()
+            if load_models:
+                self._load_vad()
             self._running = True
 
-            device = os.getenv("MIC_DEVICE", "default")
-            device_idx = None if device == "default" else int(device)
+            if stream_factory is None:
+                import sounddevice as sd
+
+                device_idx = None if self.device == "default" else int(self.device)
 
-            dev_info = sd.query_devices(device_idx, 'input')
-            print(f"[mic] Using device: {dev_info['name']}", flush=True)
+                dev_info = sd.query_devices(device_idx, 'input')
+                log.info(f"Using device: {dev_info['name']}")
+                stream_factory = functools.partial(sd.InputStream, device=device_idx)
 
-            self._stream = sd.InputStream(
+            self._stream = stream_factory(
                 samplerate=self.sample_rate,
                 channels=1,
                 dtype="float32",
                 blocksize=512,
-                device=device_idx,
                 callback=self._audio_callback,
             )
             self._stream.start()
-            print(f"[mic] Stream started (VAD sensitivity={self.vad_sensitivity})", flush=True)
+            log.info("Stream started", vad_sensitivity=self.vad_sensitivity)
         except Exception as e:
-            err = str(e).encode("ascii", "ignore").decode()
-            print(f"[mic] FAILED to start: {err}", flush=True)
+            log.error(f"FAILED to start: {e}")
 
     def stop(self):
         """Stop the mic input stream."""
@@ -197,3 +369,5 @@ class Mic:
         if hasattr(self, "_stream") and self._stream:
             self._stream.stop()
             self._stream.close()
+        if self.model_host and self._whisper is not None:
+            self._whisper.close()
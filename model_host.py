@@ -0,0 +1,250 @@
+"""Out-of-process model host — runs faster-whisper or Kokoro in a subprocess.
+
+Keeps STT and TTS inference off the main process's GIL so the audio callbacks,
+frame diffing and UI bridge don't stall behind them. Audio crosses the process
+boundary through shared memory; requests and replies are small dicts over a
+multiprocessing Pipe. A crashed host is restarted on the next call.
+
+Enable with MODEL_HOST=1.
+"""
+
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from log import get_logger
+
+log = get_logger("host")
+
+
+class _SharedAudio:
+    """Growable float32 buffer in shared memory, owned (and unlinked) by one side of the host link.
+
+    The host inherits the client's resource tracker, so a segment left behind by a
+    crashed host is still cleaned up when the client exits.
+    """
+
+    def __init__(self, initial_samples: int = 24000 * 10):
+        self._shm = shared_memory.SharedMemory(create=True, size=initial_samples * 4)
+
+    def write(self, audio: np.ndarray) -> dict:
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        if audio.nbytes > self._shm.size:
+            self.close()
+            self._shm = shared_memory.SharedMemory(create=True, size=max(audio.nbytes, self._shm.size * 2))
+        np.ndarray(len(audio), dtype=np.float32, buffer=self._shm.buf)[:] = audio
+        return {"shm": self._shm.name, "n": len(audio)}
+
+    def close(self):
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class _SharedReader:
+    """Reads audio out of segments written by the other side, caching the attachment."""
+
+    def __init__(self):
+        self._shm = None
+
+    def read(self, ref: dict) -> np.ndarray:
+        if self._shm is None or self._shm.name != ref["shm"]:
+            if self._shm is not None:
+                self._shm.close()
+            self._shm = shared_memory.SharedMemory(name=ref["shm"])
+        return np.ndarray(ref["n"], dtype=np.float32, buffer=self._shm.buf).copy()
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+
+# ── Host process ──
+
+def _load_model(kind: str, config: dict):
+    if kind == "stt":
+        from faster_whisper import WhisperModel
+        return WhisperModel(config["model"], device="cpu", compute_type="int8")
+    if kind == "tts":
+        from kokoro_onnx import Kokoro
+        return Kokoro(config.get("model_path", "kokoro-v1.0.onnx"), config.get("voices_path", "voices-v1.0.bin"))
+    raise ValueError(f"unknown model kind: {kind}")
+
+
+def _serve(kind: str, config: dict, conn):
+    """Subprocess entry point: load the model, then answer requests until the pipe closes."""
+    model = _load_model(kind, config)
+    out = _SharedAudio()
+    reader = _SharedReader()
+    conn.send({"ok": True, "ready": True, "pid": os.getpid()})
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                break
+            op = msg.get("op")
+            cpu0 = time.process_time()
+            try:
+                if op == "transcribe":
+                    audio = reader.read(msg["audio"])
+                    segments, _ = model.transcribe(audio, language=msg.get("language", "en"))
+                    reply = {"ok": True, "text": " ".join(s.text.strip() for s in segments).strip()}
+                elif op == "synthesize":
+                    samples, sample_rate = model.create(msg["text"], voice=msg["voice"], speed=msg.get("speed", 1.0))
+                    reply = {"ok": True, "audio": out.write(np.asarray(samples)), "sample_rate": sample_rate}
+                elif op == "ping":
+                    reply = {"ok": True}
+                else:
+                    reply = {"ok": False, "error": f"unknown op {op}"}
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            reply["cpu"] = time.process_time() - cpu0
+            conn.send(reply)
+    finally:
+        reader.close()
+        out.close()
+
+
+# ── Client ──
+
+class ModelHostError(RuntimeError):
+    pass
+
+
+class ModelHost:
+    """Client for one model subprocess. Thread-safe; requests are serialized."""
+
+    def __init__(self, kind: str, config: dict, timeout: float = 120.0):
+        """
+        Args:
+            kind: "stt" (faster-whisper) or "tts" (Kokoro).
+            config: Model settings passed to the host, e.g. {"model": "tiny.en"}.
+            timeout: Seconds to wait for model load or a single request.
+        """
+        self.kind = kind
+        self.config = config
+        self.timeout = timeout
+        self._ctx = mp.get_context("spawn")
+        self._proc = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self._out = _SharedAudio(initial_samples=16000 * 30)  # request audio, read by the host
+        self._reader = None  # reply audio written by the host
+
+        self.restarts = 0
+        self.requests = 0
+        self.cpu_time = 0.0
+        self.wall_time = 0.0
+
+    def _start_locked(self):
+        parent, child = self._ctx.Pipe()
+        self._proc = self._ctx.Process(
+            target=_serve, args=(self.kind, self.config, child), daemon=True, name=f"model-host-{self.kind}"
+        )
+        self._proc.start()
+        child.close()
+        self._conn = parent
+        self._reader = _SharedReader()
+        try:
+            if not self._conn.poll(self.timeout):
+                raise ModelHostError(f"{self.kind} host did not come up in {self.timeout}s")
+            hello = self._conn.recv()
+        except (EOFError, ModelHostError) as e:
+            # Don't leave a half-started host behind: its late hello would be read as the next reply
+            if isinstance(e, EOFError):
+                self._proc.join(timeout=2.0)
+            exitcode = self._proc.exitcode
+            self._proc.kill()
+            self._stop_locked()
+            if isinstance(e, ModelHostError):
+                raise
+            raise ModelHostError(f"{self.kind} host exited while loading (exit {exitcode})") from e
+        log.info(f"{self.kind} model host ready (pid {hello.get('pid')})")
+
+    def _stop_locked(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._proc is not None:
+            self._proc.join(timeout=2.0)
+            if self._proc.is_alive():
+                self._proc.kill()
+            self._proc = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def start(self):
+        """Spawn the host and wait for its model to load."""
+        with self._lock:
+            if self._proc is None or not self._proc.is_alive():
+                self._start_locked()
+
+    def _call(self, msg: dict, audio: np.ndarray | None = None) -> dict:
+        """Send one request, restarting the host and retrying once if it has died."""
+        with self._lock:
+            if audio is not None:
+                msg["audio"] = self._out.write(audio)
+            for attempt in (1, 2):
+                try:
+                    if self._proc is None or not self._proc.is_alive():
+                        if self._proc is not None:
+                            self.restarts += 1
+                            log.warning(f"{self.kind} host died (exit {self._proc.exitcode}), restarting")
+                            self._stop_locked()
+                        self._start_locked()
+                    start = time.perf_counter()
+                    self._conn.send(msg)
+                    if not self._conn.poll(self.timeout):
+                        # Wedged: kill it so the next call gets a fresh host, but don't retry this one
+                        self._proc.kill()
+                        raise ModelHostError(f"{self.kind} host timed out after {self.timeout}s")
+                    reply = self._conn.recv()
+                    self.wall_time += time.perf_counter() - start
+                    self.cpu_time += reply.get("cpu", 0.0)
+                    self.requests += 1
+                except (EOFError, OSError) as e:
+                    # Host crashed mid-request: restart it and retry once
+                    if attempt == 2:
+                        raise ModelHostError(f"{self.kind} host crashed twice ({type(e).__name__})") from e
+                    if self._proc is not None:
+                        self._proc.kill()
+                        self._proc.join(timeout=2.0)
+                    continue
+                if not reply.get("ok"):
+                    raise ModelHostError(reply.get("error", "unknown error"))
+                if isinstance(reply.get("audio"), dict):
+                    reply["audio"] = self._reader.read(reply["audio"])
+                return reply
+
+    def transcribe(self, audio: np.ndarray, language: str = "en") -> str:
+        """STT host: transcribed text for a 16 kHz float32 clip."""
+        return self._call({"op": "transcribe", "language": language}, audio=audio)["text"]
+
+    def create(self, text: str, voice: str, speed: float = 1.0) -> tuple[np.ndarray, int]:
+        """TTS host: same signature and return value as Kokoro.create."""
+        reply = self._call({"op": "synthesize", "text": text, "voice": voice, "speed": speed})
+        return reply["audio"], reply["sample_rate"]
+
+    def stats(self) -> dict:
+        return {
+            "pid": self._proc.pid if self._proc is not None else None,
+            "alive": bool(self._proc is not None and self._proc.is_alive()),
+            "requests": self.requests,
+            "cpu_s": round(self.cpu_time, 2),
+            "wall_s": round(self.wall_time, 2),
+            "restarts": self.restarts,
+        }
+
+    def close(self):
+        with self._lock:
+            self._stop_locked()
+            self._out.close()
@@ -0,0 +1,135 @@
+"""Write-behind JSON documents — settings.json, parties.json.
+
+A JsonDocument keeps its file's contents in memory. save() only schedules a
+write: changes arriving within `delay` seconds of each other (a settings
+slider being dragged) become one write, done on a timer thread so the caller
+never waits on the disk. A steady stream of changes still gets written at
+least every `max_delay` seconds. Writes go to a temp file that is renamed over
+the original, so a crash mid-write never leaves a truncated file. flush()
+writes immediately; it runs on quit and at interpreter exit.
+
+`data` is never changed in place once published: callers pass save() a new
+dict, or change a copy inside `with doc.edit() as data:`. So the write-behind
+thread always serializes a whole version, never one that is half edited. A document
+without a path lives only in memory (server sessions).
+"""
+
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from log import get_logger
+
+log = get_logger("persist")
+
+
+def load_json(path: Path, default: dict) -> dict:
+    if path.exists():
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return default
+
+
+def atomic_write_text(path: Path, text: str):
+    """Replace path's contents all at once (temp file in the same folder + os.replace)."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        # mkstemp files are owner-only; keep the permissions the file had
+        os.chmod(tmp, path.stat().st_mode & 0o777 if path.exists() else 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path: Path, data: dict):
+    atomic_write_text(path, json.dumps(data, indent=2))
+
+
+class JsonDocument:
+    def __init__(self, path: Path | None, default: dict, delay: float = 0.5, max_delay: float = 2.0):
+        """
+        Args:
+            path: JSON file; read once here. None keeps the document in memory only.
+            default: Contents to start from if the file is missing or unreadable.
+            delay: Quiet period before a scheduled write happens.
+            max_delay: Longest a change waits while more keep arriving.
+        """
+        self.path = Path(path) if path is not None else None
+        self.delay = delay
+        self.max_delay = max_delay
+        self.data: dict = load_json(self.path, default) if self.path else default
+
+        self._lock = threading.Lock()
+        self._edit_lock = threading.Lock()  # one edit() at a time, so none is lost
+        self._write_lock = threading.Lock()  # keeps writes in order
+        self._timer: threading.Timer | None = None
+        self._dirty_since: float | None = None
+        self._version = 0
+        self._written = 0
+        self.writes = 0
+        if self.path:
+            atexit.register(self.flush)
+
+    @contextmanager
+    def edit(self):
+        """Yield a copy of the contents to change; on exit it replaces them and is saved."""
+        with self._edit_lock:
+            data = copy.deepcopy(self.data)
+            yield data
+            self.save(data)
+
+    def save(self, data: dict | None = None):
+        """Replace the contents with a new dict (don't edit the published one) and schedule a write."""
+        with self._lock:
+            if data is not None:
+                self.data = data
+            if self.path is None:
+                return
+            self._version += 1
+            now = time.monotonic()
+            if self._dirty_since is None:
+                self._dirty_since = now
+            if self._timer is not None:
+                self._timer.cancel()
+            delay = max(0.0, min(self.delay, self._dirty_since + self.max_delay - now))
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending changes now."""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if self._version == self._written:
+                    return
+                version = self._version
+                self._dirty_since = None
+                data = self.data  # a published version; nobody edits it in place
+            text = json.dumps(data, indent=2)
+            try:
+                atomic_write_text(self.path, text)
+                self._written = version
+                self.writes += 1
+            except OSError as e:
+                log.error(f"Failed to write {self.path.name}: {e}")
+
+    def pending(self) -> bool:
+        return self._version != self._written
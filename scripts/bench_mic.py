@@ -0,0 +1,403 @@
+"""Offline STT/VAD benchmark — replays WAV fixtures through Mic._audio_callback.
+
+Each fixture is a 16-bit PCM WAV plus a JSON sidecar with the reference
+transcript and the speech span(s) in seconds:
+
+    bench/fixtures/hello.wav
+    bench/fixtures/hello.json   {"text": "hello there", "speech": [[1.0, 2.4]]}
+
+bench/fixtures/ref_*.wav are committed reference fixtures made by
+`make-reference`: formant-synthesized voiced "utterances" with exact speech
+spans, and a noise-only clip whose expected transcript is empty (VAD false
+onsets, whisper hallucinations). They need no TTS, so VAD timings compare
+across machines and revisions; the Kokoro phrases add transcripts for WER.
+
+Usage:
+    python scripts/bench_mic.py make-fixtures            # synthesize phrase fixtures with Kokoro
+    python scripts/bench_mic.py make-reference           # regenerate the committed ref_* fixtures
+    python scripts/bench_mic.py run --models tiny.en,base.en --speed 1
+    python scripts/bench_mic.py run --speed 0 --json results.json   # as fast as possible
+
+Reports per WHISPER_MODEL: VAD onset/offset latency against the reference spans,
+end-of-speech -> transcript latency, whisper real-time factor, dropped blocks and WER.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+load_dotenv()
+
+from dsp import EchoReference, resample  # noqa: E402
+from fake_audio import FakeInputStream, read_wav, write_wav  # noqa: E402
+from mic import Mic  # noqa: E402
+
+FIXTURE_DIR = ROOT / "bench" / "fixtures"
+SAMPLE_RATE = 16000
+STALL_MARGIN = 30.0  # seconds past the fixture's play time before a run counts as stalled
+
+PHRASES = [
+    "What are you doing over there?",
+    "Okay, watch this jump.",
+    "Did you see that? I almost died.",
+    "Which way should I go now?",
+    "Grab the health potion before the boss fight.",
+    "I think we need more gold for the upgrade.",
+    "No, no, no, not again!",
+    "Tell me something about this level.",
+]
+
+
+class _SilentVoice:
+    """Voice stand-in: never speaking, so Mic runs as with TTS idle."""
+
+    def __init__(self):
+        self.echo_ref = EchoReference(SAMPLE_RATE)
+
+    def is_speaking(self) -> bool:
+        return False
+
+    def stop(self):
+        pass
+
+
+def _normalize(text: str) -> list[str]:
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by reference length."""
+    ref, hyp = _normalize(reference), _normalize(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def _speech_span(audio: np.ndarray, sample_rate: int, threshold: float = 0.01) -> tuple[float, float]:
+    """First and last sample above threshold, in seconds."""
+    idx = np.nonzero(np.abs(audio) > threshold)[0]
+    if len(idx) == 0:
+        return 0.0, len(audio) / sample_rate
+    return idx[0] / sample_rate, idx[-1] / sample_rate
+
+
+def make_fixtures(out_dir: Path, lead: float, tail: float, noise: float):
+    """Synthesize one fixture per phrase with Kokoro, padded with (optionally noisy) silence."""
+    from voice import Voice
+
+    voice = Voice()
+    voice._ensure_kokoro()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(0)
+
+    for i, text in enumerate(PHRASES):
+        samples, rate = voice._kokoro.create(text, voice=voice.voice, speed=1.0)
+        speech = resample(np.asarray(samples, dtype=np.float32), rate, SAMPLE_RATE)
+        start, end = _speech_span(speech, SAMPLE_RATE)
+        audio = np.concatenate([
+            np.zeros(int(lead * SAMPLE_RATE), dtype=np.float32),
+            speech,
+            np.zeros(int(tail * SAMPLE_RATE), dtype=np.float32),
+        ])
+        if noise > 0:
+            audio = audio + rng.normal(0, noise, len(audio)).astype(np.float32)
+        name = f"phrase_{i:02d}"
+        write_wav(out_dir / f"{name}.wav", audio, SAMPLE_RATE)
+        meta = {"text": text, "speech": [[round(lead + start, 3), round(lead + end, 3)]]}
+        (out_dir / f"{name}.json").write_text(json.dumps(meta, indent=2))
+        print(f"  [ok] {name}: {text}")
+
+
+# Vowel formants (F1, F2, F3) in Hz
+_VOWELS = {
+    "a": (730, 1090, 2440), "i": (270, 2290, 3010), "u": (300, 870, 2240),
+    "e": (530, 1840, 2480), "o": (570, 840, 2410),
+}
+
+
+def _voiced(duration: float, f0: float, vowels: str, rng: np.random.Generator) -> np.ndarray:
+    """Speech-like audio: a harmonic source with drifting pitch shaped by vowel formants,
+    amplitude-modulated into syllables. Deterministic for a given rng state."""
+    n = int(duration * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    pitch = f0 * (1 + 0.12 * np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, np.pi)) - 0.1 * t / duration)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    # Formants per sample, gliding between the vowels of consecutive syllables
+    per_syll = n / len(vowels)
+    centers = (np.arange(len(vowels)) + 0.5) * per_syll
+    formants = np.stack([
+        np.interp(np.arange(n), centers, [_VOWELS[v][i] for v in vowels]) for i in range(3)
+    ])
+    audio = np.zeros(n)
+    for k in range(1, int(4000 / f0) + 1):
+        freq = k * pitch
+        gain = sum(1 / (1 + ((freq - formants[i]) / (60 + 40 * i)) ** 2) for i in range(3))
+        audio += gain / k * np.sin(k * phase)
+    # Syllables: raised-cosine bumps with short dips between them
+    syll = np.sin(np.pi * ((np.arange(n) % per_syll) / per_syll)) ** 0.6
+    audio *= syll * np.minimum(1.0, np.minimum(t, duration - t) / 0.02)
+    return (0.3 * audio / np.max(np.abs(audio))).astype(np.float32)
+
+
+def make_reference(out_dir: Path):
+    """Write the committed ref_* fixtures (no TTS needed; same bytes on every machine)."""
+    rng = np.random.default_rng(29)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    def silence(seconds):
+        return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+    specs = {
+        # name: (segments of (silence before, duration, f0, vowels), tail, noise std)
+        "ref_voiced_low": ([(1.0, 1.2, 120, "aeiou")], 1.2, 0.002),
+        "ref_voiced_high_noisy": ([(0.8, 1.0, 210, "ioa")], 1.2, 0.02),
+        "ref_two_bursts": ([(0.8, 0.7, 150, "ae"), (1.0, 0.9, 140, "oui")], 1.2, 0.004),
+        "ref_noise_only": ([], 3.0, 0.01),
+    }
+    for name, (segments, tail, noise) in specs.items():
+        parts, spans, pos = [], [], 0.0
+        for gap, duration, f0, vowels in segments:
+            parts += [silence(gap), _voiced(duration, f0, vowels, rng)]
+            spans.append([round(pos + gap, 3), round(pos + gap + duration, 3)])
+            pos += gap + duration
+        parts.append(silence(tail))
+        audio = np.concatenate(parts)
+        audio = audio + rng.normal(0, noise, len(audio)).astype(np.float32)
+        write_wav(out_dir / f"{name}.wav", audio, SAMPLE_RATE)
+        meta = {"speech": spans, "synthetic": True}
+        if not spans:
+            meta["text"] = ""  # nothing to hear: any transcript is a hallucination
+        (out_dir / f"{name}.json").write_text(json.dumps(meta, indent=2) + "\n")
+        print(f"  [ok] {name}: {len(spans)} utterance(s), {len(audio) / SAMPLE_RATE:.1f}s")
+
+
+def _load_fixtures(fixture_dir: Path) -> list[tuple[str, np.ndarray, dict]]:
+    fixtures = []
+    for wav in sorted(fixture_dir.glob("*.wav")):
+        meta_path = wav.with_suffix(".json")
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        audio = read_wav(wav, SAMPLE_RATE)
+        if "speech" not in meta:
+            meta["speech"] = [list(_speech_span(audio, SAMPLE_RATE))]
+        fixtures.append((wav.stem, audio, meta))
+    return fixtures
+
+
+def _reset_utterance(mic: Mic):
+    """Forget any utterance the previous fixture left open (buffer, silence count, queued text)."""
+    mic._audio_buffer.clear()
+    mic._is_speaking = False
+    mic._silence_frames = 0
+    mic._barge_in_flush = False
+    mic.get_transcript()
+    mic._vad_model.reset_states()
+
+
+def run_fixture(mic: Mic, audio: np.ndarray, speed: float) -> dict:
+    """Play one fixture through the mic callback and collect timings."""
+    events: list[tuple[str, float, float]] = []  # (kind, stream time, wall time)
+    transcripts: list[tuple[str, float]] = []
+    stt: list[tuple[float, float]] = []  # (audio seconds, transcribe seconds)
+
+    stream = FakeInputStream(
+        audio, samplerate=SAMPLE_RATE, blocksize=512, callback=mic._audio_callback, speed=speed,
+    )
+    mic._on_vad = lambda kind: events.append((kind, stream.time, time.perf_counter()))
+    mic._on_transcript = lambda text: transcripts.append((text, time.perf_counter()))
+
+    transcribe = Mic._transcribe.__get__(mic)
+
+    def timed_transcribe(chunk: np.ndarray) -> str:
+        t0 = time.perf_counter()
+        text = transcribe(chunk)
+        stt.append((len(chunk) / SAMPLE_RATE, time.perf_counter() - t0))
+        return text
+
+    mic._transcribe = timed_transcribe
+    _reset_utterance(mic)
+
+    # At speed 0 the fixture plays as fast as the callback runs; budget real time for it
+    play_time = len(audio) / SAMPLE_RATE / (speed or 1.0)
+    stream.start()
+    stalled = not stream.finished.wait(timeout=play_time + STALL_MARGIN)
+    stream.stop()
+
+    return {
+        "stalled": stalled,
+        "events": events,
+        "transcripts": transcripts,
+        "stt": stt,
+        "dropped_blocks": stream.dropped_blocks,
+    }
+
+
+def _summary(values: list[float]) -> dict:
+    if not values:
+        return {"mean": None, "p50": None, "p90": None}
+    ordered = sorted(values)
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(ordered[len(ordered) // 2], 3),
+        "p90": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))], 3),
+    }
+
+
+def bench_model(model_name: str, fixtures: list, speed: float, vad_sensitivity: float | None) -> dict:
+    mic = Mic(_SilentVoice())
+    mic.mode = "always_on"
+    mic.whisper_model_name = model_name
+    if vad_sensitivity is not None:
+        mic.vad_sensitivity = vad_sensitivity
+
+    t0 = time.perf_counter()
+    mic.warm_up_vad()
+    vad_load = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    mic.warm_up_whisper()
+    whisper_load = time.perf_counter() - t0
+
+    onset, offset, to_transcript, wers = [], [], [], []
+    stt_audio = stt_time = 0.0
+    dropped = missed = stalled = false_onsets = 0
+    per_fixture = []
+
+    for name, audio, meta in fixtures:
+        r = run_fixture(mic, audio, speed)
+        onsets = [e for e in r["events"] if e[0] == "onset"]
+        offsets = [e for e in r["events"] if e[0] == "offset"]
+        hypothesis = " ".join(t for t, _ in r["transcripts"])
+
+        row = {"fixture": name, "hypothesis": hypothesis, "dropped_blocks": r["dropped_blocks"]}
+        if r["stalled"]:
+            row["stalled"] = True
+            stalled += 1
+            print(f"  [stalled] {name}: callback didn't finish within {STALL_MARGIN:.0f}s of the audio")
+        if not meta["speech"]:
+            # No speech in the fixture: every onset is a false one
+            row["false_onsets"] = len(onsets)
+            false_onsets += len(onsets)
+            if "text" in meta:
+                row["wer"] = round(word_error_rate(meta["text"], hypothesis), 3)
+                wers.append(row["wer"])
+            dropped += r["dropped_blocks"]
+            per_fixture.append(row)
+            continue
+        true_start = meta["speech"][0][0]
+        true_end = meta["speech"][-1][1]
+        if onsets:
+            row["onset_latency"] = round(onsets[0][1] - true_start, 3)
+            onset.append(row["onset_latency"])
+        else:
+            missed += 1
+        if offsets:
+            row["offset_latency"] = round(offsets[-1][1] - true_end, 3)
+            offset.append(row["offset_latency"])
+            if r["transcripts"]:
+                row["transcript_latency"] = round(r["transcripts"][-1][1] - offsets[-1][2], 3)
+                to_transcript.append(row["transcript_latency"])
+        if "text" in meta:
+            row["wer"] = round(word_error_rate(meta["text"], hypothesis), 3)
+            wers.append(row["wer"])
+        for seconds, elapsed in r["stt"]:
+            stt_audio += seconds
+            stt_time += elapsed
+        dropped += r["dropped_blocks"]
+        per_fixture.append(row)
+
+    return {
+        "model": model_name,
+        "vad_sensitivity": mic.vad_sensitivity,
+        "speed": speed,
+        "load_time": {"vad": round(vad_load, 2), "whisper": round(whisper_load, 2)},
+        "vad_onset_latency": _summary(onset),
+        "vad_offset_latency": _summary(offset),
+        "transcript_latency": _summary(to_transcript),
+        "rtf": round(stt_time / stt_audio, 3) if stt_audio else None,
+        "wer": round(statistics.fmean(wers), 3) if wers else None,
+        "dropped_blocks": dropped,
+        "missed_utterances": missed,
+        "stalled_fixtures": stalled,
+        "false_onsets": false_onsets,
+        "fixtures": per_fixture,
+    }
+
+
+def _print_result(r: dict):
+    def fmt(s):
+        return "-" if s["mean"] is None else f"{s['mean']:.3f} / {s['p90']:.3f}"
+
+    print(f"\n== {r['model']} (VAD {r['vad_sensitivity']}, speed {r['speed'] or 'max'}) ==")
+    print(f"  load                vad {r['load_time']['vad']}s, whisper {r['load_time']['whisper']}s")
+    print(f"  VAD onset  mean/p90 {fmt(r['vad_onset_latency'])} s")
+    print(f"  VAD offset mean/p90 {fmt(r['vad_offset_latency'])} s")
+    print(f"  EOS->text  mean/p90 {fmt(r['transcript_latency'])} s")
+    print(f"  whisper RTF         {r['rtf']}")
+    print(f"  WER                 {r['wer']}")
+    print(f"  dropped blocks      {r['dropped_blocks']}   missed utterances {r['missed_utterances']}"
+          f"   stalled fixtures {r['stalled_fixtures']}   false onsets {r['false_onsets']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    mk = sub.add_parser("make-fixtures", help="Synthesize WAV fixtures with Kokoro")
+    mk.add_argument("--out", type=Path, default=FIXTURE_DIR)
+    mk.add_argument("--lead", type=float, default=1.0, help="Silence before speech (s)")
+    mk.add_argument("--tail", type=float, default=1.5, help="Silence after speech (s)")
+    mk.add_argument("--noise", type=float, default=0.0, help="Gaussian noise std to add")
+
+    ref = sub.add_parser("make-reference", help="Regenerate the committed ref_* fixtures (no TTS)")
+    ref.add_argument("--out", type=Path, default=FIXTURE_DIR)
+
+    run = sub.add_parser("run", help="Run the benchmark")
+    run.add_argument("--fixtures", type=Path, default=FIXTURE_DIR)
+    run.add_argument("--models", default=None, help="Comma-separated WHISPER_MODEL names")
+    run.add_argument("--speed", type=float, default=1.0, help="1 = real time, 4 = 4x, 0 = max")
+    run.add_argument("--vad-sensitivity", type=float, default=None)
+    run.add_argument("--json", type=Path, default=None, help="Write results to this file")
+
+    args = parser.parse_args()
+
+    if args.cmd == "make-fixtures":
+        print(f"Writing fixtures to {args.out}")
+        make_fixtures(args.out, args.lead, args.tail, args.noise)
+        return
+    if args.cmd == "make-reference":
+        print(f"Writing reference fixtures to {args.out}")
+        make_reference(args.out)
+        return
+
+    fixtures = _load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No fixtures in {args.fixtures} — run 'make-fixtures' or add WAV files")
+        sys.exit(1)
+    models = (args.models or os.getenv("WHISPER_MODEL", "tiny.en")).split(",")
+    print(f"{len(fixtures)} fixtures, models: {', '.join(models)}")
+
+    results = [bench_model(m.strip(), fixtures, args.speed, args.vad_sensitivity) for m in models]
+    for r in results:
+        _print_result(r)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+        print(f"\nWrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
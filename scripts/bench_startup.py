@@ -0,0 +1,144 @@
+"""Startup benchmark — time to window (or, headless, to running) over repeated launches.
+
+Each run is `python main.py --profile-startup exit ...` in a fresh process; the
+profile it writes (see startup.py) gives time-to-ready, import time and
+per-initializer times. Medians are appended to bench/startup.jsonl together
+with the git revision, so regressions show up run over run.
+
+    python scripts/bench_startup.py                      # headless, 5 runs
+    python scripts/bench_startup.py --front-end webview --runs 3
+    python scripts/bench_startup.py --budget-ms 1500     # exit 1 if the median is over budget
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+RESULTS = ROOT / "bench" / "startup.jsonl"
+
+FRONT_END_ARGS = {
+    "headless": ["--headless", "--control", "none", "--sink", "null"],
+    "tray": ["--tray", "--sink", "null"],
+    "webview": ["--sink", "null"],
+}
+
+
+def run_once(front_end: str, timeout: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "profile.jsonl"
+        env = dict(os.environ, STARTUP_PROFILE_FILE=str(out))
+        cmd = [sys.executable, str(ROOT / "main.py"), "--profile-startup", "exit", *FRONT_END_ARGS[front_end]]
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, timeout=timeout)
+        wall = time.perf_counter() - start
+        if not out.exists():
+            raise RuntimeError(f"no profile written (exit {proc.returncode}):\n{proc.stdout[-2000:]}{proc.stderr[-2000:]}")
+        profile = json.loads(out.read_text(encoding="utf-8").splitlines()[-1])
+    profile["wall_s"] = wall
+    return profile
+
+
+def git_rev() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def summarize(runs: list[dict]) -> dict:
+    def med(values):
+        return round(statistics.median(values), 4)
+
+    phases: dict[str, list[float]] = {}
+    imports: dict[str, list[float]] = {}
+    for r in runs:
+        for p in r["phases"]:
+            phases.setdefault(p["phase"], []).append(p["s"])
+        for i in r["imports"]:
+            imports.setdefault(i["module"], []).append(i["total_s"])
+    return {
+        "ready_s": med([r["ready_s"] for r in runs]),
+        "ready_s_min": round(min(r["ready_s"] for r in runs), 4),
+        "import_s": med([r["import_s"] for r in runs]),
+        "wall_s": med([r["wall_s"] for r in runs]),
+        "phases": {k: med(v) for k, v in phases.items()},
+        "imports": dict(sorted(((k, med(v)) for k, v in imports.items()), key=lambda kv: -kv[1])[:10]),
+    }
+
+
+def previous(front_end: str) -> dict | None:
+    if not RESULTS.exists():
+        return None
+    last = None
+    for line in RESULTS.read_text(encoding="utf-8").splitlines():
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        if row.get("front_end") == front_end:
+            last = row
+    return last
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Glaze Bot startup time")
+    parser.add_argument("--front-end", choices=sorted(FRONT_END_ARGS), default="headless")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds per launch")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if the median time to ready exceeds this")
+    parser.add_argument("--no-save", action="store_true", help="Don't append to bench/startup.jsonl")
+    args = parser.parse_args()
+
+    runs = []
+    for i in range(args.runs):
+        r = run_once(args.front_end, args.timeout)
+        print(f"  run {i + 1}: ready {r['ready_s'] * 1000:.0f} ms, imports {r['import_s'] * 1000:.0f} ms, "
+              f"process {r['wall_s'] * 1000:.0f} ms")
+        runs.append(r)
+
+    summary = summarize(runs)
+    row = {
+        "t": round(time.time()),
+        "rev": git_rev(),
+        "front_end": args.front_end,
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        **summary,
+    }
+
+    print()
+    print(f"Median time to {args.front_end} ready: {summary['ready_s'] * 1000:.0f} ms "
+          f"(imports {summary['import_s'] * 1000:.0f} ms)")
+    for name, s in summary["phases"].items():
+        print(f"    {s * 1000:7.1f} ms  {name}")
+    print("  Heaviest imports:")
+    for name, s in summary["imports"].items():
+        print(f"    {s * 1000:7.1f} ms  {name}")
+
+    prev = previous(args.front_end)
+    if prev:
+        delta = (summary["ready_s"] - prev["ready_s"]) * 1000
+        print(f"  vs {prev.get('rev') or 'previous'}: {delta:+.0f} ms")
+
+    if not args.no_save:
+        RESULTS.parent.mkdir(parents=True, exist_ok=True)
+        with open(RESULTS, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row) + "\n")
+
+    if args.budget_ms is not None and summary["ready_s"] * 1000 > args.budget_ms:
+        print(f"Over budget: {summary['ready_s'] * 1000:.0f} ms > {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Check generate_avatars.py against the fake DashScope server (no network, no API key).
+
+Runs the generator into a scratch folder three times and fails (exit 1) unless:
+- the first run generates every character, retrying the submits the server throttles,
+  and never has more tasks running than the server allows
+- a rerun submits nothing
+- a changed prompt regenerates only that character, and an image missing from the
+  manifest is adopted without a submit (needs_update() itself writes nothing)
+
+    python scripts/check_avatars.py
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import generate_avatars as ga
+from fake_dashscope import FakeDashScope
+
+MAX_RUNNING = 2
+
+
+def _args(out: Path, port: int, only: list[str]) -> argparse.Namespace:
+    return argparse.Namespace(
+        out=str(out), only=only, concurrency=4, max_wait=30, force=False,
+        api_base=f"http://127.0.0.1:{port}/api/v1",
+    )
+
+
+def _run(args) -> tuple[int, int, int]:
+    return asyncio.run(ga.run(args, "fake-key"))
+
+
+def check(out: Path) -> list[str]:
+    # Keep the run short: quick tasks, fast polling and retries
+    ga.POLL_START = 0.05
+    ga.SUBMIT_BACKOFF = 0.2
+    server = FakeDashScope(0, delay=0.3, max_running=MAX_RUNNING)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    chars = ga.load_characters()[:6]
+    names = [c["name"] for c in chars]
+    args = _args(out, port, names)
+    problems = []
+
+    def expect(ok: bool, what: str):
+        print(f"  [{'ok' if ok else 'FAIL'}] {what}")
+        if not ok:
+            problems.append(what)
+
+    try:
+        success, skipped, failed = _run(args)
+        stats = dict(server.stats)
+        expect((success, skipped, failed) == (len(chars), 0, 0), f"first run generates all {len(chars)}")
+        expect(stats["submits"] == len(chars), "one accepted submit per character")
+        expect(stats["throttled"] > 0, "throttled submits are retried")
+        expect(stats["peak_running"] <= MAX_RUNNING, f"at most {MAX_RUNNING} tasks running")
+        expect(all((out / f"{ga.slug(n)}.png").exists() for n in names), "every image downloaded")
+
+        success, skipped, failed = _run(args)
+        expect((success, skipped) == (0, len(chars)), "rerun skips everything")
+        expect(server.stats["submits"] == stats["submits"], "rerun submits nothing")
+
+        manifest = ga.load_json(out / ga.MANIFEST_NAME, {})
+        manifest[ga.slug(names[0])]["prompt_hash"] = "stale"
+        del manifest[ga.slug(names[1])]
+        ga.atomic_write_json(out / ga.MANIFEST_NAME, manifest)
+        before = (out / ga.MANIFEST_NAME).read_bytes()
+        gen = ga.AvatarGenerator(None, "fake-key", args.api_base, out)
+        todo = [c["name"] for c in chars if gen.needs_update(c)]
+        expect(todo == names[:1], "only the changed prompt needs an update")
+        expect((out / ga.MANIFEST_NAME).read_bytes() == before, "needs_update() leaves the manifest alone")
+
+        success, skipped, failed = _run(args)
+        manifest = ga.load_json(out / ga.MANIFEST_NAME, {})
+        expect((success, skipped) == (1, len(chars) - 1), "changed prompt regenerated, the rest skipped")
+        expect(server.stats["submits"] == stats["submits"] + 1, "one new submit")
+        expect("prompt_hash" in manifest.get(ga.slug(names[1]), {}), "untracked image adopted into the manifest")
+    finally:
+        server.shutdown()
+    return problems
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        problems = check(Path(tmp))
+    if problems:
+        print(f"{len(problems)} check(s) failed")
+        sys.exit(1)
+    print("All avatar generator checks passed")
+
+
+if __name__ == "__main__":
+    main()
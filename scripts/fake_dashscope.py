@@ -0,0 +1,161 @@
+"""Local stand-in for the DashScope async image API, for running generate_avatars.py offline.
+
+Implements the three calls the generator makes: submit a task, poll it, download
+the image. Tasks take --delay seconds; --max-running makes extra submits get a
+429 like the real rate limit, --fail-rate fails a fraction of tasks. Images are
+small solid-colour PNGs derived from the prompt.
+
+    python scripts/fake_dashscope.py --port 8099 --delay 3 --max-running 4
+    python scripts/generate_avatars.py --api-base http://127.0.0.1:8099/api/v1 --out /tmp/avatars
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUBMIT_PATH = "/api/v1/services/aigc/text2image/image-synthesis"
+TASK_PATH = "/api/v1/tasks/"
+IMAGE_PATH = "/images/"
+
+
+def solid_png(rgb: tuple[int, int, int], size: int = 64) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    row = b"\x00" + bytes(rgb) * size
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * size))
+        + chunk(b"IEND", b"")
+    )
+
+
+class FakeDashScope(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, delay: float = 3.0, max_running: int = 0, fail_rate: float = 0.0):
+        self.delay = delay
+        self.max_running = max_running
+        self.fail_rate = fail_rate
+        self.tasks: dict[str, dict] = {}
+        self.lock = threading.Lock()
+        self.stats = {"submits": 0, "throttled": 0, "polls": 0, "downloads": 0, "peak_running": 0}
+        super().__init__(("127.0.0.1", port), _Handler)
+
+    def running(self) -> int:
+        now = time.monotonic()
+        return sum(1 for t in self.tasks.values() if t["done_at"] > now)
+
+    def submit(self, prompt: str) -> str | None:
+        with self.lock:
+            if self.max_running and self.running() >= self.max_running:
+                self.stats["throttled"] += 1
+                return None
+            task_id = uuid.uuid4().hex
+            self.tasks[task_id] = {
+                "done_at": time.monotonic() + self.delay * random.uniform(0.5, 1.5),
+                "failed": random.random() < self.fail_rate,
+                "color": tuple(hashlib.sha256(prompt.encode("utf-8")).digest()[:3]),
+            }
+            self.stats["submits"] += 1
+            self.stats["peak_running"] = max(self.stats["peak_running"], self.running())
+            return task_id
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeDashScope
+
+    def _json(self, code: int, body: dict, headers: dict | None = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        if self.headers.get("Authorization", "").startswith("Bearer "):
+            return True
+        self._json(401, {"code": "InvalidApiKey", "message": "missing API key"})
+        return False
+
+    def do_POST(self):
+        if self.path != SUBMIT_PATH:
+            return self._json(404, {"code": "NotFound"})
+        if not self._authorized():
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = body.get("input", {}).get("prompt", "")
+        task_id = self.server.submit(prompt)
+        if task_id is None:
+            return self._json(429, {"code": "Throttling", "message": "too many running tasks"}, {"Retry-After": "1"})
+        self._json(200, {"output": {"task_id": task_id, "task_status": "PENDING"}})
+
+    def do_GET(self):
+        if self.path.startswith(TASK_PATH):
+            if not self._authorized():
+                return
+            task_id = self.path[len(TASK_PATH):]
+            with self.server.lock:
+                self.server.stats["polls"] += 1
+                task = self.server.tasks.get(task_id)
+            if task is None:
+                return self._json(200, {"output": {"task_id": task_id, "task_status": "UNKNOWN"}})
+            if time.monotonic() < task["done_at"]:
+                return self._json(200, {"output": {"task_id": task_id, "task_status": "RUNNING"}})
+            if task["failed"]:
+                return self._json(200, {"output": {"task_id": task_id, "task_status": "FAILED", "message": "fake failure"}})
+            host, port = self.server.server_address
+            url = f"http://{host}:{port}{IMAGE_PATH}{task_id}.png"
+            return self._json(200, {"output": {"task_id": task_id, "task_status": "SUCCEEDED", "results": [{"url": url}]}})
+
+        if self.path.startswith(IMAGE_PATH):
+            task = self.server.tasks.get(self.path[len(IMAGE_PATH):].removesuffix(".png"))
+            if task is None:
+                return self._json(404, {"code": "NotFound"})
+            data = solid_png(task["color"])
+            with self.server.lock:
+                self.server.stats["downloads"] += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        if self.path == "/stats":
+            return self._json(200, self.server.stats)
+        self._json(404, {"code": "NotFound"})
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake DashScope image API")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--delay", type=float, default=3.0, help="Mean seconds a task takes")
+    parser.add_argument("--max-running", type=int, default=0, help="429 beyond this many running tasks (0 = no limit)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of tasks that fail")
+    args = parser.parse_args()
+
+    server = FakeDashScope(args.port, args.delay, args.max_running, args.fail_rate)
+    print(f"Fake DashScope on http://127.0.0.1:{args.port}/api/v1 (stats at /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -2,25 +2,51 @@
 
 Uses the same DASHSCOPE_API_KEY that powers the vision model — no extra keys needed.
 Uses the DashScope native async API with qwen-image-plus.
+
+Characters are generated concurrently (--concurrency tasks in flight) over one
+pooled HTTP client. ui/public/avatars/manifest.json records the prompt hash each
+image was made from, so a rerun only regenerates characters whose description
+changed (or whose image is missing). Afterwards process_avatars.py makes the
+small WebP variants the UI loads.
+
+    python scripts/generate_avatars.py                       # new / changed characters
+    python scripts/generate_avatars.py --only "DJ Blaze" --force
+    python scripts/fake_dashscope.py --port 8099 &           # offline stand-in
+    python scripts/generate_avatars.py --api-base http://127.0.0.1:8099/api/v1 --out /tmp/avatars
+    python scripts/check_avatars.py                          # the above, with assertions
 """
 
+import argparse
+import asyncio
+import hashlib
 import json
 import os
 import sys
 import time
 from pathlib import Path
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
 load_dotenv()
 
-CHAR_DIR = Path(__file__).parent.parent / "characters"
-OUTPUT_DIR = Path(__file__).parent.parent / "ui" / "public" / "avatars"
+from persistence import atomic_write_json, load_json  # noqa: E402
+
+CHAR_DIR = ROOT / "characters"
+OUTPUT_DIR = ROOT / "ui" / "public" / "avatars"
+MANIFEST_NAME = "manifest.json"
+
+API_BASE = os.getenv("DASHSCOPE_IMAGE_API", "https://dashscope-intl.aliyuncs.com/api/v1")
+MODEL = "qwen-image-plus"
+SIZE = "512*512"
 
-API_BASE = "https://dashscope-intl.aliyuncs.com/api/v1"
-SUBMIT_URL = f"{API_BASE}/services/aigc/text2image/image-synthesis"
-TASK_URL = f"{API_BASE}/tasks"
+POLL_START = 1.0   # first poll this long after submitting
+POLL_MAX = 8.0     # back off to at most this between polls
+POLL_FACTOR = 1.5
+SUBMIT_RETRIES = 4
+SUBMIT_BACKOFF = 2.0  # first retry delay after a 429/5xx; doubles each time
 
 
 def slug(name: str) -> str:
@@ -38,119 +64,223 @@ def build_prompt(char: dict) -> str:
     )
 
 
-def submit_task(api_key: str, prompt: str) -> str | None:
-    """Submit an image generation task. Returns task_id or None."""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "X-DashScope-Async": "enable",
-    }
-    payload = {
-        "model": "qwen-image-plus",
-        "input": {"prompt": prompt},
-        "parameters": {"n": 1, "size": "512*512"},
-    }
-    resp = requests.post(SUBMIT_URL, json=payload, headers=headers, timeout=30)
-    data = resp.json()
-
-    if "output" in data and "task_id" in data["output"]:
-        return data["output"]["task_id"]
-
-    print(f"    Submit error: {data}")
-    return None
-
-
-def poll_task(api_key: str, task_id: str, max_wait: int = 120) -> str | None:
-    """Poll for task completion. Returns image URL or None."""
-    headers = {"Authorization": f"Bearer {api_key}"}
-    url = f"{TASK_URL}/{task_id}"
-
-    for _ in range(max_wait // 2):
-        resp = requests.get(url, headers=headers, timeout=30)
-        data = resp.json()
-        status = data.get("output", {}).get("task_status", "")
-
-        if status == "SUCCEEDED":
-            results = data["output"].get("results", [])
-            if results:
-                return results[0].get("url")
+def prompt_hash(prompt: str) -> str:
+    """Identifies what an image was generated from; model and size are part of it."""
+    return hashlib.sha256(f"{MODEL}|{SIZE}|{prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+class AvatarGenerator:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        api_key: str,
+        api_base: str,
+        out_dir: Path,
+        concurrency: int = 4,
+        max_wait: float = 120,
+    ):
+        self.client = client
+        self._auth = {"Authorization": f"Bearer {api_key}"}
+        self.submit_url = f"{api_base}/services/aigc/text2image/image-synthesis"
+        self.task_url = f"{api_base}/tasks"
+        self.out_dir = out_dir
+        self.max_wait = max_wait
+        self._slots = asyncio.Semaphore(concurrency)
+        self.manifest_path = out_dir / MANIFEST_NAME
+        self.manifest: dict = load_json(self.manifest_path, {})
+
+    def _path(self, char: dict) -> Path:
+        return self.out_dir / f"{slug(char['name'])}.png"
+
+    def needs_update(self, char: dict, force: bool = False) -> bool:
+        """True if the image is missing or was made from a different prompt. Untracked images don't count."""
+        if force or not self._path(char).exists():
+            return True
+        entry = self.manifest.get(slug(char["name"]))
+        if entry is None or "prompt_hash" not in entry:
+            return False  # see untracked()
+        return entry["prompt_hash"] != prompt_hash(build_prompt(char))
+
+    def untracked(self, char: dict) -> bool:
+        """An image from before the manifest existed (no prompt hash recorded for it)."""
+        entry = self.manifest.get(slug(char["name"]))
+        return self._path(char).exists() and (entry is None or "prompt_hash" not in entry)
+
+    def adopt(self, char: dict):
+        """Record an untracked image as made from the current description."""
+        self._record(char, prompt_hash(build_prompt(char)), self._path(char), adopted=True)
+
+    def _record(self, char: dict, digest: str, path: Path, adopted: bool = False):
+        # update(), not replace: process_avatars.py keeps its "variants" in the same entry
+        self.manifest.setdefault(slug(char["name"]), {}).update({
+            "name": char["name"],
+            "file": path.name,
+            "prompt_hash": digest,
+            "model": MODEL,
+            "generated_at": None if adopted else round(time.time()),
+        })
+        # Written after every image so an interrupted run resumes where it stopped
+        atomic_write_json(self.manifest_path, self.manifest)
+
+    async def _submit(self, prompt: str) -> str | None:
+        """Submit an image generation task. Returns task_id or None."""
+        payload = {"model": MODEL, "input": {"prompt": prompt}, "parameters": {"n": 1, "size": SIZE}}
+        delay = SUBMIT_BACKOFF
+        for _ in range(SUBMIT_RETRIES):
+            resp = await self.client.post(
+                self.submit_url, json=payload, headers={**self._auth, "X-DashScope-Async": "enable"}
+            )
+            if resp.status_code == 429 or resp.status_code >= 500:
+                # Throttled or flaky: back off exponentially, never sooner than Retry-After asks
+                wait = max(delay, float(resp.headers.get("Retry-After", 0)))
+                print(f"    Submit {resp.status_code}, retrying in {wait:.1f}s")
+                await asyncio.sleep(wait)
+                delay *= 2
+                continue
+            data = resp.json()
+            if "output" in data and "task_id" in data["output"]:
+                return data["output"]["task_id"]
+            print(f"    Submit error: {data}")
             return None
-        elif status in ("FAILED", "CANCELED"):
-            msg = data.get("output", {}).get("message", "unknown")
-            print(f"    Task {status}: {msg}")
-            return None
-
-        time.sleep(2)
-
-    print(f"    Task timed out after {max_wait}s")
-    return None
-
-
-def generate_avatar(api_key: str, char: dict) -> bool:
-    """Generate an avatar for one character. Returns True on success."""
-    name = char["name"]
-    out_path = OUTPUT_DIR / f"{slug(name)}.png"
-
-    if out_path.exists():
-        print(f"  [skip] {name} — already exists")
+        print(f"    Submit failed after {SUBMIT_RETRIES} attempts")
+        return None
+
+    async def _poll(self, task_id: str) -> str | None:
+        """Poll for task completion with growing intervals. Returns image URL or None."""
+        deadline = time.monotonic() + self.max_wait
+        interval = POLL_START
+        while time.monotonic() < deadline:
+            await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+            interval = min(interval * POLL_FACTOR, POLL_MAX)
+            try:
+                resp = await self.client.get(f"{self.task_url}/{task_id}", headers=self._auth)
+            except httpx.TransportError as e:
+                print(f"    Poll error for {task_id}: {e}")
+                continue
+            if resp.status_code == 429:
+                continue
+            output = resp.json().get("output", {})
+            status = output.get("task_status", "")
+
+            if status == "SUCCEEDED":
+                results = output.get("results", [])
+                return results[0].get("url") if results else None
+            elif status in ("FAILED", "CANCELED", "UNKNOWN"):
+                print(f"    Task {status}: {output.get('message', 'unknown')}")
+                return None
+
+        print(f"    Task timed out after {self.max_wait:.0f}s")
+        return None
+
+    async def _download(self, url: str, path: Path):
+        """Stream the image to a temp file, then rename it into place."""
+        tmp = path.with_name(f".{path.name}.part")
+        try:
+            async with self.client.stream("GET", url) as resp:  # signed URL, no API key
+                resp.raise_for_status()
+                with open(tmp, "wb") as f:
+                    async for chunk in resp.aiter_bytes(64 * 1024):
+                        f.write(chunk)
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    async def generate(self, char: dict) -> bool:
+        """Generate an avatar for one character. Returns True on success."""
+        name = char["name"]
+        out_path = self.out_dir / f"{slug(name)}.png"
+        prompt = build_prompt(char)
+
+        async with self._slots:
+            start = time.perf_counter()
+            print(f"  [gen] {name}...")
+            try:
+                task_id = await self._submit(prompt)
+                if not task_id:
+                    return False
+                image_url = await self._poll(task_id)
+                if not image_url:
+                    return False
+                await self._download(image_url, out_path)
+            except (httpx.HTTPError, OSError, ValueError) as e:
+                print(f"  [fail] {name}: {e}")
+                return False
+
+        self._record(char, prompt_hash(prompt), out_path)
+        print(f"  [ok] {name} -> {out_path.name} ({time.perf_counter() - start:.1f}s)")
         return True
 
-    prompt = build_prompt(char)
-    print(f"  [gen] {name}...")
-
-    task_id = submit_task(api_key, prompt)
-    if not task_id:
-        return False
-
-    print(f"    Task {task_id}, polling...")
-    image_url = poll_task(api_key, task_id)
-    if not image_url:
-        return False
 
-    # Download and save
-    img_data = requests.get(image_url, timeout=60).content
-    out_path.write_bytes(img_data)
-    print(f"  [ok] {name} -> {out_path}")
-    return True
+def load_characters(only: list[str] | None = None) -> list[dict]:
+    chars = []
+    for f in sorted(CHAR_DIR.glob("*.json")):
+        with open(f, encoding="utf-8") as fh:
+            char = json.load(fh)
+        if not only or char["name"] in only:
+            chars.append(char)
+    return chars
+
+
+async def run(args, api_key: str) -> tuple[int, int, int]:
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    chars = load_characters(args.only)
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        limits=limits,
+        timeout=httpx.Timeout(30.0, read=60.0),
+        follow_redirects=True,
+    ) as client:
+        gen = AvatarGenerator(client, api_key, args.api_base, out_dir, args.concurrency, args.max_wait)
+        todo = [c for c in chars if gen.needs_update(c, force=args.force)]
+        skipped = len(chars) - len(todo)
+        for char in chars:
+            if char in todo:
+                continue
+            if gen.untracked(char):
+                gen.adopt(char)
+                print(f"  [skip] {char['name']} (existing image, now in the manifest)")
+            else:
+                print(f"  [skip] {char['name']}")
+
+        results = await asyncio.gather(*(gen.generate(c) for c in todo))
+    success = sum(results)
+    return success, skipped, len(todo) - success
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate character avatars with DashScope")
+    parser.add_argument("--concurrency", type=int, default=4, help="Tasks in flight at once")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the prompt is unchanged")
+    parser.add_argument("--only", nargs="*", default=None, metavar="NAME", help="Only these characters")
+    parser.add_argument("--max-wait", type=float, default=120, help="Seconds to wait for one task")
+    parser.add_argument("--api-base", default=API_BASE, help="DashScope API root (e.g. a fake_dashscope.py server)")
+    parser.add_argument("--out", default=str(OUTPUT_DIR), help="Output folder")
+    parser.add_argument("--no-variants", action="store_true", help="Skip making the UI's WebP variants")
+    args = parser.parse_args()
+
     api_key = os.getenv("DASHSCOPE_API_KEY")
     if not api_key:
         print("Error: DASHSCOPE_API_KEY not set in .env")
         sys.exit(1)
 
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-    # Load all characters
-    chars = []
-    for f in sorted(CHAR_DIR.glob("*.json")):
-        with open(f) as fh:
-            chars.append(json.load(fh))
-
-    print(f"Found {len(chars)} characters")
-    print(f"Output: {OUTPUT_DIR}")
-    print(f"Model: qwen-image-plus (DashScope)")
+    print(f"Output: {args.out}")
+    print(f"Model: {MODEL} (DashScope), concurrency {args.concurrency}")
     print()
 
-    success = 0
-    skipped = 0
-    failed = 0
-
-    for char in chars:
-        out_path = OUTPUT_DIR / f"{slug(char['name'])}.png"
-        if out_path.exists():
-            skipped += 1
-            print(f"  [skip] {char['name']}")
-            continue
-
-        if generate_avatar(api_key, char):
-            success += 1
-        else:
-            failed += 1
+    start = time.perf_counter()
+    success, skipped, failed = asyncio.run(run(args, api_key))
 
     print()
-    print(f"Done: {success} generated, {skipped} skipped, {failed} failed")
+    print(f"Done in {time.perf_counter() - start:.1f}s: {success} generated, {skipped} skipped, {failed} failed")
+    if not args.no_variants:
+        from process_avatars import process
+
+        processed, unchanged = process(Path(args.out))
+        print(f"Variants: {processed} avatars processed, {unchanged} unchanged")
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
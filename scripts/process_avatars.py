@@ -0,0 +1,113 @@
+"""Make small WebP variants of the avatar PNGs for the UI.
+
+The generator writes 512x512 PNGs (~300 KB each); the UI shows avatars at
+28-50 px. For every ui/public/avatars/<slug>.png this writes 64, 128 and 256 px
+WebPs named after a hash of their contents (<slug>-128.<hash>.webp), so a
+changed image gets a new URL and the old one can be cached forever. The file
+names go into the manifest.json generate_avatars.py keeps (under "variants"),
+and into ui/src/lib/avatars.json, which the UI bundles (lib/avatars.ts). A PNG
+whose bytes haven't changed since the last run is skipped.
+
+    python scripts/process_avatars.py              # runs after generate_avatars.py too
+"""
+
+import argparse
+import hashlib
+import io
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from persistence import atomic_write_json, load_json  # noqa: E402
+
+AVATAR_DIR = ROOT / "ui" / "public" / "avatars"
+MANIFEST_NAME = "manifest.json"
+UI_MANIFEST = ROOT / "ui" / "src" / "lib" / "avatars.json"
+SIZES = (64, 128, 256)
+WEBP_QUALITY = 82
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def make_variant(img: Image.Image, size: int) -> bytes:
+    buf = io.BytesIO()
+    img.resize((size, size), Image.LANCZOS).save(buf, "WEBP", quality=WEBP_QUALITY, method=6)
+    return buf.getvalue()
+
+
+def _square(img: Image.Image) -> Image.Image:
+    """Center-crop to a square; the UI shows avatars in circles and squares."""
+    w, h = img.size
+    side = min(w, h)
+    left, top = (w - side) // 2, (h - side) // 2
+    return img.crop((left, top, left + side, top + side))
+
+
+def process(avatar_dir: Path = AVATAR_DIR, force: bool = False) -> tuple[int, int]:
+    """Update variants and the manifest(s). Returns (processed, unchanged)."""
+    manifest_path = avatar_dir / MANIFEST_NAME
+    manifest: dict = load_json(manifest_path, {})
+    processed = unchanged = 0
+    live: set[str] = set()
+
+    for png in sorted(avatar_dir.glob("*.png")):
+        key = png.stem
+        data = png.read_bytes()
+        source_hash = _digest(data)
+        entry = manifest.setdefault(key, {"file": png.name})
+        variants = entry.get("variants", {})
+        if (
+            not force
+            and entry.get("source_hash") == source_hash
+            and all((avatar_dir / variants.get(str(s), "")).is_file() for s in SIZES)
+        ):
+            live.update(variants.values())
+            unchanged += 1
+            continue
+
+        img = _square(Image.open(io.BytesIO(data)).convert("RGB"))
+        variants = {}
+        for size in SIZES:
+            webp = make_variant(img, size)
+            name = f"{key}-{size}.{_digest(webp)}.webp"
+            path = avatar_dir / name
+            if not path.exists():
+                path.write_bytes(webp)
+            variants[str(size)] = name
+        entry.update({"file": png.name, "source_hash": source_hash, "variants": variants})
+        live.update(variants.values())
+        processed += 1
+        print(f"  [webp] {png.name} -> {', '.join(variants.values())}")
+
+    # Entries whose PNG was deleted, then variants nothing points at anymore
+    for key in [k for k, e in manifest.items() if not (avatar_dir / e.get("file", f"{k}.png")).exists()]:
+        del manifest[key]
+    for stale in avatar_dir.glob("*.webp"):
+        if stale.name not in live:
+            stale.unlink()
+
+    atomic_write_json(manifest_path, manifest)
+    if avatar_dir.resolve() == AVATAR_DIR.resolve():  # not for scratch folders
+        ui = {k: {"file": e["file"], "variants": e["variants"]} for k, e in sorted(manifest.items()) if "variants" in e}
+        atomic_write_json(UI_MANIFEST, ui)
+    return processed, unchanged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Make WebP avatar variants and update the manifest")
+    parser.add_argument("--dir", default=str(AVATAR_DIR), help="Avatar folder")
+    parser.add_argument("--force", action="store_true", help="Re-encode every avatar")
+    args = parser.parse_args()
+
+    processed, unchanged = process(Path(args.dir), force=args.force)
+    print(f"Variants: {processed} avatars processed, {unchanged} unchanged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""Multi-tenant server — many streams from one process.
+
+Each session is a full headless GlazeBot with its own capture source, party,
+chat history, settings, VAD and speech queue. The heavy parts are shared:
+one faster-whisper model and one Kokoro model serve every session through a
+small worker pool, and LLM calls from all sessions go through one thread
+pool, so a burst on one stream can't open unbounded API connections.
+
+    python server.py sessions.json --control tcp:8765 --duration 3600
+
+Sessions file (see sessions.example.json):
+
+    {
+      "stt_workers": 2, "tts_workers": 2, "llm_workers": 8,
+      "sessions": [
+        {"name": "alice", "capture": ["monitor", 1, "Monitor 1"], "party": ["DJ Blaze", "Bingo"],
+         "settings": {"min_gap": 20, "mic_mode": "off"}, "audio_sink": "file:alice.wav"}
+      ]
+    }
+
+Control lines are routed by session name (`alice toggle_pause`, or JSON with a
+"session" key); anything else addresses the server (`get_stats`, `list_sessions`).
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from control import ControlInterface
+from log import get_logger, logger
+from main import GlazeBot
+from metrics import metrics
+from tracing import tracer
+
+log = get_logger("server")
+
+
+# ── Shared models ──
+
+
+def _load_whisper(workers: int):
+    from faster_whisper import WhisperModel
+
+    # num_workers lets that many transcriptions run at once on one copy of the weights
+    return WhisperModel(
+        os.getenv("WHISPER_MODEL", "tiny.en"), device="cpu", compute_type="int8", num_workers=workers
+    )
+
+
+def _load_kokoro(workers: int):
+    import onnxruntime as ort
+    from kokoro_onnx import Kokoro
+
+    # One onnxruntime session for all workers (run() is thread-safe); split the cores
+    # between them so concurrent syntheses don't oversubscribe the CPU
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // workers)
+    session = ort.InferenceSession("kokoro-v1.0.onnx", options, providers=["CPUExecutionProvider"])
+    return Kokoro.from_session(session, "voices-v1.0.bin")
+
+
+def _transcribe(model, audio: np.ndarray, language: str):
+    segments, info = model.transcribe(audio, language=language)
+    return list(segments), info  # segments is a lazy generator; decode on the worker
+
+
+def _synthesize(model, text: str, voice: str, speed: float):
+    return model.create(text, voice=voice, speed=speed)
+
+
+class SharedModel:
+    """One model instance serving every session through a bounded worker pool."""
+
+    def __init__(self, name: str, loader, workers: int):
+        self.name = name
+        self.workers = workers
+        self._loader = loader
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.load_time: float | None = None
+
+    def _get(self):
+        with self._load_lock:
+            if self._model is None:
+                start = time.perf_counter()
+                self._model = self._loader(self.workers)
+                self.load_time = time.perf_counter() - start
+                log.info(f"{self.name} loaded in {self.load_time:.2f}s ({self.workers} workers)")
+            return self._model
+
+    def _run(self, fn, args, submitted: float):
+        queued = time.perf_counter() - submitted
+        model = self._get()
+        start = time.perf_counter()
+        try:
+            result = fn(model, *args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        return result, queued, time.perf_counter() - start
+
+    def submit(self, fn, *args) -> Future:
+        """Run fn(model, *args) on a worker. The future resolves to (result, queue_s, busy_s)."""
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+        return self._pool.submit(self._run, fn, args, time.perf_counter())
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self._model is not None,
+            "load_time": round(self.load_time, 2) if self.load_time is not None else None,
+            "workers": self.workers,
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+        }
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Usage:
+    """Per-session accounting of time spent on a shared model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.audio_s = 0.0
+        self.queue_s = 0.0
+        self.busy_s = 0.0
+
+    def add(self, audio_s: float, queue_s: float, busy_s: float):
+        with self._lock:
+            self.requests += 1
+            self.audio_s += audio_s
+            self.queue_s += queue_s
+            self.busy_s += busy_s
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "audio_s": round(self.audio_s, 2),
+            "queue_s": round(self.queue_s, 2),
+            "busy_s": round(self.busy_s, 2),
+        }
+
+
+class SessionSTT:
+    """A session's view of the shared whisper model — same transcribe() as WhisperModel."""
+
+    def __init__(self, shared: SharedModel, sample_rate: int = 16000):
+        self._shared = shared
+        self._sample_rate = sample_rate
+        self.usage = _Usage()
+
+    def transcribe(self, audio: np.ndarray, language: str = "en"):
+        (segments, info), queued, busy = self._shared.submit(_transcribe, audio, language).result()
+        self.usage.add(len(audio) / self._sample_rate, queued, busy)
+        return segments, info
+
+
+class SessionTTS:
+    """A session's view of the shared Kokoro model — same create() as Kokoro."""
+
+    def __init__(self, shared: SharedModel):
+        self._shared = shared
+        self.usage = _Usage()
+
+    def create(self, text: str, voice: str, speed: float = 1.0):
+        (samples, sample_rate), queued, busy = self._shared.submit(_synthesize, text, voice, speed).result()
+        self.usage.add(len(samples) / sample_rate, queued, busy)
+        return samples, sample_rate
+
+
+# ── Sessions ──
+
+
+class Session:
+    def __init__(self, name: str, bot: GlazeBot, stt: SessionSTT, tts: SessionTTS | None):
+        self.name = name
+        self.bot = bot
+        self.stt = stt
+        self.tts = tts
+        self.control = ControlInterface(bot.bridge)
+        self.started_at = time.time()
+        self.stopped = False
+
+    def stats(self) -> dict:
+        bot = self.bot
+        return {
+            "running": not self.stopped,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "paused": bot.app_state["paused"],
+            "capture_source": bot.app_state.get("capture_source_name", ""),
+            "party": [c["name"] for c in bot.app_state["active_characters"]],
+            "llm": {
+                "calls": bot.brain.total_calls,
+                "input_tokens": bot.brain.total_input_tokens,
+                "output_tokens": bot.brain.total_output_tokens,
+                "cost_usd": round(bot.brain.estimated_cost(), 6),
+            },
+            "stt": self.stt.usage.stats(),
+            "tts": self.tts.usage.stats() if self.tts else None,
+            "speech": bot.speech.stats(),
+            "events": bot.events.stats() if bot.events else {},
+        }
+
+
+class GlazeServer:
+    def __init__(self, config: dict):
+        """
+        Args:
+            config: Parsed sessions file — worker counts and a "sessions" list.
+        """
+        self.config = config
+        self.stt = SharedModel("stt", _load_whisper, int(config.get("stt_workers", 2)))
+        self.tts = SharedModel("tts", _load_kokoro, int(config.get("tts_workers", 2)))
+        self.llm_executor = ThreadPoolExecutor(
+            max_workers=int(config.get("llm_workers", 8)), thread_name_prefix="llm"
+        )
+        self.sessions: dict[str, Session] = {}
+        self._quit = threading.Event()
+        self._stop_lock = threading.Lock()
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+
+    def _make_session(self, spec: dict) -> Session:
+        name = spec["name"]
+        # settings.json, parties.json and characters/ belong to the desktop app
+        bot = GlazeBot(persist=False)
+        bot.llm_executor = self.llm_executor
+        # Gauges are process-wide; without a suffix each session's would replace the last one's
+        bot.metrics_suffix = "_" + re.sub(r"\W", "_", name)
+
+        stt = SessionSTT(self.stt, bot.mic.sample_rate)
+        bot.mic.model_host = False
+        bot.mic._whisper = stt
+        if "mic_device" in spec:
+            bot.mic.device = str(spec["mic_device"])
+
+        tts = None
+        if bot.voice.engine != "elevenlabs":
+            tts = SessionTTS(self.tts)
+            bot.voice.model_host = False
+            bot.voice._kokoro = tts
+        bot.voice.sink = spec.get("audio_sink") or bot.voice.sink
+        if "output_device" in spec:
+            bot.voice.device = spec["output_device"]
+
+        if spec.get("settings"):
+            bot.bridge.update_settings(spec["settings"])
+        if spec.get("capture"):
+            bot.bridge.set_capture_source(*spec["capture"])
+        if spec.get("party"):
+            party = [c for c in bot.characters if c["name"] in spec["party"]]
+            if party:
+                bot.app_state["active_characters"][:] = party
+                bot.app_state.touch("active_characters")
+            else:
+                log.warning(f"{name}: no characters match party {spec['party']}")
+        return Session(name, bot, stt, tts)
+
+    def _watch(self, session: Session):
+        """Shut a session down once it quits (quit_app), without stopping the others."""
+        session.bot._quit.wait()
+        self._stop_session(session)
+
+    def _stop_session(self, session: Session):
+        with self._stop_lock:
+            if session.stopped:
+                return
+            session.stopped = True
+            session.bot._shutdown(close_shared=False)
+        log.info(f"Session '{session.name}' stopped")
+
+    def start(self, unpause: bool = False):
+        for spec in self.config.get("sessions", []):
+            if spec["name"] in self.sessions:
+                raise ValueError(f"duplicate session name: {spec['name']}")
+            log.info(f"Starting session '{spec['name']}'")
+            session = self._make_session(spec)
+            self.sessions[session.name] = session
+            session.bot._start()
+            if unpause or spec.get("unpause"):
+                session.bot.bridge.toggle_pause()
+            threading.Thread(target=self._watch, args=(session,), daemon=True, name=f"watch-{session.name}").start()
+        # Load the shared whisper model now rather than on the first utterance
+        if any(s.bot.mic.mode != "off" for s in self.sessions.values()):
+            self.stt.submit(_transcribe, np.zeros(16000, dtype=np.float32), "en")
+        log.info(f"{len(self.sessions)} session(s) running")
+
+    def shutdown(self):
+        for session in self.sessions.values():
+            if not session.stopped:
+                session.bot._request_quit()
+                self._stop_session(session)
+        self.stt.close()
+        self.tts.close()
+        self.llm_executor.shutdown(wait=False, cancel_futures=True)
+        tracer.close()
+        metrics.close()
+        log.info("Stopped.")
+        logger.flush()
+
+    # ── Control commands ──
+
+    def list_sessions(self) -> list[str]:
+        return list(self.sessions)
+
+    def get_stats(self, session: str | None = None) -> dict:
+        """Per-session resource use, plus shared model and process totals."""
+        if session is not None:
+            return self.sessions[session].stats()
+        return {
+            "sessions": {name: s.stats() for name, s in self.sessions.items()},
+            "shared": {"stt": self.stt.stats(), "tts": self.tts.stats()},
+            "process": {
+                "cpu_s": round(time.process_time() - self._cpu_start, 2),
+                "wall_s": round(time.perf_counter() - self._wall_start, 2),
+            },
+        }
+
+    def get_trace_summary(self) -> dict:
+        return tracer.summary()
+
+    def quit_server(self) -> dict:
+        self._quit.set()
+        return {"ok": True}
+
+
+class ServerControl(ControlInterface):
+    """Routes `<session> <command>` lines to that session's bridge; the rest go to the server."""
+
+    def __init__(self, server: GlazeServer):
+        super().__init__(server, exclude={"start", "shutdown"})
+        self._server = server
+
+    def dispatch(self, line: str) -> dict:
+        stripped = line.strip()
+        if stripped.startswith("{"):
+            try:
+                msg = json.loads(stripped)
+            except json.JSONDecodeError as e:
+                return {"ok": False, "error": f"bad command: {e}"}
+            name = msg.pop("session", None) if isinstance(msg, dict) else None
+            if name is not None:
+                session = self._server.sessions.get(name)
+                if session is None:
+                    return {"ok": False, "error": f"unknown session: {name}"}
+                return session.control.dispatch(json.dumps(msg))
+            return super().dispatch(line)
+        name, _, rest = stripped.partition(" ")
+        session = self._server.sessions.get(name)
+        if session is not None and rest.strip():
+            return session.control.dispatch(rest)
+        return super().dispatch(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Glaze Bot — multi-session server")
+    parser.add_argument("sessions", help="Sessions file (JSON)")
+    parser.add_argument("--control", default="stdin", help="stdin | tcp:PORT | none")
+    parser.add_argument("--duration", type=float, default=None, help="Quit after N seconds")
+    parser.add_argument("--unpause", action="store_true", help="Start every session commenting immediately")
+    args = parser.parse_args()
+
+    with open(args.sessions, encoding="utf-8") as f:
+        config = json.load(f)
+
+    server = GlazeServer(config)
+    server.start(unpause=args.unpause)
+    ctl = ServerControl(server)
+    tcp = None
+    if args.control == "stdin":
+        ctl.serve_stdin()
+    elif args.control.startswith("tcp:"):
+        tcp = ctl.serve_tcp(int(args.control[len("tcp:"):]))
+
+    try:
+        server._quit.wait(timeout=args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if tcp:
+            tcp.shutdown()
+        logger.flush()  # keep the stats after the last log lines
+        print(json.dumps(server.get_stats(), indent=2, default=str), flush=True)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""Session record / replay — capture a live run to a zip archive and play it back headless.
+
+An archive holds:
+    session.json     settings, active party, durations
+    events.jsonl     timestamped frames, transcripts, LLM calls and spoken lines
+    frames/*.jpg     every frame that was encoded for the LLM
+    mic.wav          raw mic input (16 kHz), contiguous from session.json "mic_start"
+    tts/*.wav        audio of every line that finished playing (24 kHz)
+
+Replay feeds the frames through ScreenCapture.run (diff / encode included), the
+mic audio through Mic's callback (VAD + whisper) or injects the recorded
+transcripts, and answers Brain calls from the recording or with mock replies,
+so the whole pipeline runs without a game, microphone or API keys.
+
+    python main.py --record session.zip
+    python main.py --replay session.zip --speed 2 --report run.json
+"""
+
+import base64
+import bisect
+import io
+import itertools
+import json
+import os
+import queue
+import statistics
+import tempfile
+import threading
+import time
+import wave
+import zipfile
+from collections import defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from brain import Brain
+from capture import ScreenCapture
+from fake_audio import FakeInputStream, read_wav, write_wav
+from log import get_logger
+from voice import OUTPUT_RATE, Voice
+
+ARCHIVE_VERSION = 1
+MIC_RATE = 16000
+
+log = get_logger("session")
+
+# app_state keys saved with a recording and restored on replay
+SETTINGS_KEYS = (
+    "min_gap", "interval", "interaction_mode", "interaction_chance",
+    "ai_provider", "vision_model", "capture_scale", "capture_quality", "game_hint",
+)
+
+
+class SessionRecorder:
+    """Writes a live session to a zip archive. All taps only enqueue; a writer thread does the I/O."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._t0 = time.perf_counter()
+        self._writes: queue.SimpleQueue = queue.SimpleQueue()
+        self._events: list[dict] = []
+        self._counts = defaultdict(int)
+        self._state = None
+        self._mic_start = None
+
+        self._zip = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+        fd, self._mic_tmp = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        self._mic_wav = wave.open(self._mic_tmp, "wb")
+        self._mic_wav.setnchannels(1)
+        self._mic_wav.setsampwidth(2)
+        self._mic_wav.setframerate(MIC_RATE)
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name="session-recorder")
+        self._writer.start()
+        log.info(f"Recording to {self.path}")
+
+    def _now(self) -> float:
+        return round(time.perf_counter() - self._t0, 4)
+
+    def attach(self, bot):
+        """Install taps on a GlazeBot's capture, mic, brain and voice."""
+        self._state = bot.app_state
+        bot.capture.frame_tap = self.frame
+        bot.mic.input_tap = self.mic_audio
+        bot.brain.chat_tap = self.llm
+        bot.voice.playback_tap = self.playback
+
+    # ── Taps (called from pipeline threads) ──
+
+    def frame(self, b64: str):
+        self._writes.put(("frame", self._now(), b64))
+
+    def mic_audio(self, block: np.ndarray):
+        if self._mic_start is None:
+            self._mic_start = self._now()
+        self._writes.put(("mic", None, block.copy()))
+
+    def transcript(self, text: str):
+        self._writes.put(("transcript", self._now(), text))
+
+    def llm(self, record: dict):
+        self._writes.put(("llm", self._now(), record))
+
+    def playback(self, handle):
+        self._writes.put(("tts", self._now(), handle))
+
+    # ── Writer ──
+
+    def _write_loop(self):
+        while True:
+            item = self._writes.get()
+            if item is None:
+                break
+            kind, t, data = item
+            try:
+                self._write(kind, t, data)
+            except Exception as e:
+                log.error(f"Write failed ({kind}): {e}")
+
+    def _write(self, kind: str, t: float, data):
+        n = self._counts[kind] = self._counts[kind] + 1
+        if kind == "mic":
+            self._mic_wav.writeframes((np.clip(data, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+        elif kind == "frame":
+            name = f"frames/{n:06d}.jpg"
+            self._zip.writestr(name, base64.b64decode(data), compress_type=zipfile.ZIP_STORED)
+            self._events.append({"t": t, "type": "frame", "file": name})
+        elif kind == "transcript":
+            self._events.append({"t": t, "type": "transcript", "text": data})
+        elif kind == "llm":
+            self._events.append({"t": t, "type": "llm", **data})
+        elif kind == "tts":
+            name = f"tts/{n:06d}.wav"
+            buf = io.BytesIO()
+            write_wav(buf, data.audio(), OUTPUT_RATE)
+            self._zip.writestr(name, buf.getvalue())
+            self._events.append({
+                "t": t, "type": "tts", "text": data.text, "voice": data.voice, "file": name,
+                "started_at": round(data.started_at - self._t0, 4) if data.started_at else None,
+            })
+
+    def close(self):
+        self._writes.put(None)
+        self._writer.join(timeout=10.0)
+        self._mic_wav.close()
+        if self._mic_start is not None:
+            self._zip.write(self._mic_tmp, "mic.wav")
+        os.unlink(self._mic_tmp)
+
+        state = self._state or {}
+        meta = {
+            "version": ARCHIVE_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "duration": self._now(),
+            "settings": {k: state[k] for k in SETTINGS_KEYS if k in state},
+            "active_characters": [c["name"] for c in state.get("active_characters", [])],
+            "mic_start": self._mic_start,
+            "mic_rate": MIC_RATE,
+            "tts_rate": OUTPUT_RATE,
+            "counts": {k: v for k, v in self._counts.items() if k != "mic"},
+        }
+        self._events.sort(key=lambda e: e["t"])
+        self._zip.writestr("events.jsonl", "".join(json.dumps(e) + "\n" for e in self._events))
+        self._zip.writestr("session.json", json.dumps(meta, indent=2))
+        self._zip.close()
+        log.info(f"Saved {self.path} ({meta['duration']:.0f}s, {dict(meta['counts'])})")
+
+
+# ── Replay ──
+
+class SessionArchive:
+    """Read-only view of a recorded session."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._zip = zipfile.ZipFile(self.path)
+        self.meta = json.loads(self._zip.read("session.json"))
+        self.events = [json.loads(line) for line in self._zip.read("events.jsonl").decode().splitlines() if line]
+        self._lock = threading.Lock()
+
+    def of_type(self, kind: str) -> list[dict]:
+        return [e for e in self.events if e["type"] == kind]
+
+    def read(self, name: str) -> bytes:
+        with self._lock:  # ZipFile reads aren't thread-safe
+            return self._zip.read(name)
+
+    def has(self, name: str) -> bool:
+        return name in self._zip.namelist()
+
+    def mic_audio(self) -> np.ndarray | None:
+        if not self.has("mic.wav"):
+            return None
+        return read_wav(io.BytesIO(self.read("mic.wav")), MIC_RATE)
+
+    def tts_audio(self, event: dict) -> np.ndarray:
+        return read_wav(io.BytesIO(self.read(event["file"])), OUTPUT_RATE)
+
+
+class ReplayCapture(ScreenCapture):
+    """ScreenCapture whose "screen" is the recorded frame sequence."""
+
+    def __init__(self, archive: SessionArchive, clock):
+        super().__init__()
+        self._archive = archive
+        self._clock = clock
+        frames = archive.of_type("frame")
+        self._times = [e["t"] for e in frames]
+        self._files = [e["file"] for e in frames]
+        self._cached = (-1, None, None)
+        self.source_type = "replay"
+        self.source_name = archive.path.name
+
+    def set_source(self, source_type, source_id, source_name):
+        pass  # the recording is the only source
+
+    def grab_frame(self):
+        idx = bisect.bisect_right(self._times, self._clock()) - 1
+        if idx < 0:
+            return None, None
+        if self._cached[0] != idx:
+            img = Image.open(io.BytesIO(self._archive.read(self._files[idx]))).convert("RGB")
+            self._cached = (idx, img, np.array(img, dtype=np.float32))
+        return self._cached[1], self._cached[2]
+
+
+class ReplayBrain(Brain):
+    """Brain that answers from the recording ("recorded") or with numbered stand-in lines ("mock").
+
+    Prompt building, history and token accounting run as normal; only the API call
+    is replaced, and it takes the recorded latency (divided by speed).
+    """
+
+    def __init__(self, archive: SessionArchive, mode: str = "recorded", speed: float = 1.0):
+        super().__init__()
+        self.mode = mode
+        self.speed = speed
+        calls = archive.of_type("llm")
+        self._replies: dict[tuple, deque] = defaultdict(deque)
+        for c in calls:
+            self._replies[(c["character"], bool(c.get("react_to")))].append(c)
+        latencies = [c["latency"] for c in calls]
+        self._mock_latency = statistics.median(latencies) if latencies else 0.8
+        self._mock_seq = itertools.count(1)
+        self._call = threading.local()
+        self._lock = threading.Lock()
+
+    def chat(self, frame_b64, player_text=None, character=None, react_to=None, game_hint=""):
+        self._call.key = (character["name"] if character else None, bool(react_to))
+        return super().chat(frame_b64, player_text, character, react_to, game_hint)
+
+    def _replay_reply(self) -> tuple[str, int, int]:
+        record = None
+        if self.mode == "recorded":
+            with self._lock:
+                pending = self._replies.get(self._call.key)
+                if pending:
+                    record = pending.popleft()
+        if record is None:
+            time.sleep(self._mock_latency / self.speed)
+            return f"Replay line {next(self._mock_seq)}.", 0, 0
+        time.sleep(record["latency"] / self.speed)
+        return record["reply"], record.get("input_tokens", 0), record.get("output_tokens", 0)
+
+    def _chat_dashscope(self, system_prompt, history, user_content):
+        return self._replay_reply()
+
+    def _chat_anthropic(self, system_prompt, history, user_content, frame_b64):
+        return self._replay_reply()
+
+
+class ReplayVoice(Voice):
+    """Voice that plays the recorded audio for each line instead of synthesizing it."""
+
+    def __init__(self, archive: SessionArchive):
+        super().__init__()
+        self._archive = archive
+        self._recorded = {e["text"]: e for e in archive.of_type("tts")}
+
+    def warm_up(self):
+        pass
+
+    def _speak_recorded(self, handle):
+        event = self._recorded.get(handle.text)
+        if event is not None:
+            handle.feed(self._archive.tts_audio(event))
+        else:
+            # Line wasn't in the recording (e.g. mock LLM): silence of about the right length
+            handle.feed(np.zeros(int(OUTPUT_RATE * max(1.0, len(handle.text) / 12)), dtype=np.float32))
+
+    def _speak_kokoro(self, handle):
+        self._speak_recorded(handle)
+
+    def _speak_eleven(self, handle):
+        self._speak_recorded(handle)
+
+
+class SessionReplay:
+    def __init__(
+        self,
+        path: str | Path,
+        speed: float = 1.0,
+        llm: str = "recorded",
+        tts: str = "live",
+        stt: str | None = None,
+        sink: str | None = None,
+        tail: float = 5.0,
+    ):
+        """
+        Args:
+            path: Archive written by SessionRecorder.
+            speed: Playback rate of the recorded inputs (2 = twice as fast).
+            llm: "recorded" replies (mock once they run out) or "mock" for all calls.
+            tts: "live" synthesizes with the configured engine; "recorded" plays the recorded audio.
+            stt: "live" runs mic.wav through VAD + whisper; "recorded" injects the recorded
+                transcripts. Defaults to live if the archive has mic audio; without
+                it, live falls back to recorded.
+            sink: Audio output (see AUDIO_SINK); defaults to "null".
+            tail: Seconds (recording time) to keep running after the last recorded event.
+        """
+        self.archive = SessionArchive(path)
+        self.speed = speed
+        self.llm = llm
+        self.tts = tts
+        has_mic = self.archive.has("mic.wav")
+        if stt == "live" and not has_mic:
+            log.warning(f"{self.archive.path.name} has no mic.wav; replaying the recorded transcripts instead")
+            stt = "recorded"
+        self.stt = stt or ("live" if has_mic else "recorded")
+        self.sink = sink or "null"
+        self.duration = self.archive.meta["duration"] + tail
+        self._bot = None
+        self._t0 = None
+        self._t0_lock = threading.Lock()
+
+    def clock(self) -> float:
+        """Recording-time seconds since replay started.
+
+        The clock starts on first use — when the mic stream or capture loop starts,
+        after models have loaded — along with the transcript feed and end watcher.
+        """
+        with self._t0_lock:
+            if self._t0 is None:
+                self._t0 = time.perf_counter()
+                if self.stt == "recorded":
+                    threading.Thread(target=self._inject_transcripts, daemon=True).start()
+                threading.Thread(target=self._watch_end, daemon=True).start()
+        return (time.perf_counter() - self._t0) * self.speed
+
+    def make_capture(self) -> ReplayCapture:
+        return ReplayCapture(self.archive, self.clock)
+
+    def make_brain(self) -> ReplayBrain:
+        return ReplayBrain(self.archive, self.llm, self.speed)
+
+    def make_voice(self) -> Voice:
+        voice = ReplayVoice(self.archive) if self.tts == "recorded" else Voice()
+        voice.sink = self.sink
+        voice.sink_speed = self.speed
+        return voice
+
+    def prepare(self, bot):
+        """Apply the recorded settings and party to a GlazeBot built from make_* components."""
+        meta = self.archive.meta
+        state = bot.app_state
+        for key, value in meta.get("settings", {}).items():
+            state[key] = value
+        state["min_gap"] = state.get("min_gap", 12) / self.speed
+        bot.capture.interval = state.get("interval", bot.capture.interval) / self.speed
+        bot.speech_ttl /= self.speed
+        names = set(meta.get("active_characters", []))
+        party = [c for c in state["characters"] if c["name"] in names]
+        if party:
+            state["active_characters"][:] = party
+            state.touch("active_characters")
+
+        self._bot = bot
+        bot.wait_for_models = True
+        if self.stt == "live":
+            bot.mic.mode = "always_on"
+            # mic.wav starts at mic_start; pad so it lines up with the frames
+            lead = np.zeros(int((meta.get("mic_start") or 0.0) * MIC_RATE), dtype=np.float32)
+            audio = np.concatenate([lead, self.archive.mic_audio()])
+
+            def factory(**kwargs):
+                self.clock()
+                return FakeInputStream(audio, speed=self.speed, **kwargs)
+
+            bot.mic_stream_factory = factory
+        else:
+            bot.mic.mode = "off"
+
+    def _inject_transcripts(self):
+        for e in self.archive.of_type("transcript"):
+            delay = e["t"] - self.clock()
+            if delay > 0:
+                time.sleep(delay / self.speed)
+            self._bot.mic.deliver_transcript(e["text"])
+
+    def _watch_end(self):
+        while self._bot.running:
+            if self.clock() >= self.duration:
+                log.info("Replay finished")
+                self._bot._request_quit()
+                return
+            time.sleep(0.25)
+
+    def report(self, bot) -> dict:
+        """Throughput and latency of the replayed run, for comparing versions."""
+        from tracing import tracer
+
+        wall = (time.perf_counter() - self._t0) if self._t0 else 0.0
+        return {
+            "archive": str(self.archive.path),
+            "speed": self.speed,
+            "llm": self.llm,
+            "tts": self.tts,
+            "stt": self.stt,
+            "wall_s": round(wall, 2),
+            "recorded": self.archive.meta.get("counts", {}),
+            "llm_calls": bot.brain.total_calls,
+            "speech": bot.speech.stats(),
+            "events": bot.events.stats() if bot.events else {},
+            "tts_synthesis": bot.voice.synthesis_stats(),
+            "mic_dropped_blocks": bot.mic.dropped_blocks,
+            "latency_ms": tracer.summary(),
+        }
@@ -0,0 +1,218 @@
+"""Speech scheduler — prioritized, expiring utterance queue in front of Voice.
+
+The LLM loop hands lines to the scheduler and moves on; a worker thread feeds
+them to Voice one ahead of playback, so the next line is synthesized while the
+current one plays.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from log import get_logger
+
+log = get_logger("speech")
+
+# Lower number = spoken first
+PRIORITY_PLAYER = 0    # reply to something the player said
+PRIORITY_REACTION = 1  # character riffing on another character's line
+PRIORITY_IDLE = 2      # unprompted commentary on the screen
+
+
+class Utterance:
+    def __init__(
+        self,
+        text: str,
+        voice: str | None,
+        speaker: str,
+        priority: int,
+        seq: int,
+        ttl: float | None = None,
+        on_start=None,
+        trace=None,
+    ):
+        self.text = text
+        self.voice = voice
+        self.speaker = speaker
+        self.priority = priority
+        self.seq = seq
+        self.trace = trace
+        self.created_at = time.perf_counter()
+        self.expires_at = self.created_at + ttl if ttl else None
+        self.on_start = on_start
+        # Resolves True once played, False if dropped, expired or cut off
+        self.future: Future = Future()
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.perf_counter() > self.expires_at
+
+    def _resolve(self, played: bool):
+        if not self.future.done():
+            self.future.set_result(played)
+
+
+class SpeechScheduler:
+    def __init__(self, voice, lookahead: int = 1):
+        """
+        Args:
+            voice: Voice instance that does the synthesis and playback.
+            lookahead: Lines handed to Voice beyond the one playing (pre-synthesized).
+        """
+        self._voice = voice
+        self.lookahead = lookahead
+        self._heap: list[tuple[int, int, Utterance]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._in_flight: deque = deque()  # (utterance, handle, announced)
+        self._running = False
+        self._thread = None
+
+        self.spoken = 0
+        self.expired = 0
+        self.dropped = 0
+
+    def say(
+        self,
+        text: str,
+        voice: str | None = None,
+        speaker: str = "",
+        priority: int = PRIORITY_IDLE,
+        ttl: float | None = None,
+        on_start=None,
+        trace=None,
+    ) -> Utterance:
+        """Queue a line. Returns immediately.
+
+        Args:
+            ttl: Seconds after which the line is dropped if it hasn't started
+                (stale commentary about an old frame).
+            on_start: Called from the scheduler thread when the line starts playing.
+            trace: tracing.Trace to extend with the queue, synthesis and playback spans.
+        """
+        u = Utterance(text, voice, speaker, priority, next(self._seq), ttl, on_start, trace)
+        with self._cond:
+            heapq.heappush(self._heap, (u.priority, u.seq, u))
+            self._preempt_locked(u.priority)
+            self._cond.notify()
+        return u
+
+    def pending(self) -> int:
+        """Lines waiting to play, including ones already handed to Voice."""
+        with self._cond:
+            return len(self._heap) + len(self._in_flight)
+
+    def clear(self, min_priority: int = PRIORITY_PLAYER):
+        """Drop queued lines with priority >= min_priority that haven't started playing."""
+        with self._cond:
+            keep = []
+            for item in self._heap:
+                if item[2].priority >= min_priority:
+                    item[2]._resolve(False)
+                    self.dropped += 1
+                else:
+                    keep.append(item)
+            heapq.heapify(keep)
+            self._heap = keep
+            for u, handle, _ in list(self._in_flight):
+                if u.priority >= min_priority and handle.started_at is None:
+                    handle.cancel()
+
+    def _preempt_locked(self, priority: int):
+        """Pull lower-priority lookahead lines that haven't started back into the queue."""
+        for entry in list(self._in_flight):
+            u, handle, _ = entry
+            if u.priority > priority and handle.started_at is None:
+                handle.cancel()
+                self._in_flight.remove(entry)
+                heapq.heappush(self._heap, (u.priority, u.seq, u))
+
+    def _reap_locked(self) -> list[Utterance]:
+        """Retire finished handles; returns utterances that just started playing."""
+        started = []
+        interrupted = False
+        for entry in list(self._in_flight):
+            u, handle, announced = entry
+            if handle.done():
+                self._in_flight.remove(entry)
+                played = not handle.cancelled
+                u._resolve(played)
+                if played:
+                    self.spoken += 1
+                elif handle.cancel_reason == "barge_in":
+                    interrupted = True
+            elif handle.started_at is not None and not announced:
+                self._in_flight[self._in_flight.index(entry)] = (u, handle, True)
+                started.append(u)
+        if interrupted:
+            # Player cut a line off: anything queued behind it is moot (the lock is reentrant)
+            self.clear(PRIORITY_REACTION)
+        return started
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                started = self._reap_locked()
+                u = None
+                if self._heap and len(self._in_flight) <= self.lookahead:
+                    _, _, u = heapq.heappop(self._heap)
+                elif not started:
+                    # Finished handles wake us (see _wake); only a line starting to play has to
+                    # be polled for. With nothing queued or in flight, sleep until say().
+                    waiting_start = any(not announced for _, _, announced in self._in_flight)
+                    self._cond.wait(timeout=0.02 if waiting_start else None)
+
+            for s in started:
+                if s.on_start:
+                    try:
+                        s.on_start(s)
+                    except Exception as e:
+                        log.error(f"on_start error: {e}")
+
+            if u is None:
+                continue
+            if u.expired():
+                u._resolve(False)
+                self.expired += 1
+                continue
+            if u.trace:
+                u.trace.record("speech_queue", u.created_at)
+            handle = self._voice.speak(u.text, u.voice, block=False, trace=u.trace)
+            if handle is None:
+                u._resolve(False)
+                continue
+            with self._cond:
+                self._in_flight.append((u, handle, False))
+            handle.future.add_done_callback(self._wake)
+
+    def _wake(self, _future=None):
+        """Done callback on playback handles; runs on whichever thread finished or cancelled it."""
+        with self._cond:
+            self._cond.notify()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="speech")
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self.clear()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queued": len(self._heap),
+                "in_flight": len(self._in_flight),
+                "spoken": self.spoken,
+                "expired": self.expired,
+                "dropped": self.dropped,
+            }
@@ -0,0 +1,121 @@
+"""Startup profile — where the time before the window appears goes.
+
+    python main.py --profile-startup                 # report once the window is up
+    python scripts/bench_startup.py                  # repeated runs, tracked in bench/startup.jsonl
+
+While enabled, every first-time import is timed (inclusive and self time,
+like `python -X importtime`, but only for what main.py pulls in), and
+`profile.phase(name)` times initializers such as Brain() or the webview
+import. `profile.ready(what)` marks the window shown (or, headless, the bot
+started), prints the report and appends it as one JSON line to
+STARTUP_PROFILE_FILE if set. This module only uses the standard library so it
+can be imported before anything it measures.
+"""
+
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Earliest timestamp we can take; the interpreter's own startup comes before it
+_T0 = time.perf_counter()
+
+
+class StartupProfile:
+    def __init__(self):
+        self.enabled = False
+        self.imports: list[dict] = []
+        self.phases: list[dict] = []
+        self.ready_s: float | None = None
+        self.ready_what = ""
+        self._stack: list[float] = []  # child time accumulated per open import
+        self._orig_import = None
+        self._thread = None
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._thread = threading.get_ident()
+        self._orig_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Only the main thread's imports are on the way to the window (warm-up threads import too)
+        if level or name in sys.modules or threading.get_ident() != self._thread:
+            return self._orig_import(name, globals, locals, fromlist, level)
+        depth = len(self._stack)
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._orig_import(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += total
+            self.imports.append({"module": name, "depth": depth, "total_s": total, "self_s": total - children})
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time an initializer. Free when profiling is off."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({"phase": name, "start_s": start - _T0, "s": time.perf_counter() - start})
+
+    def ready(self, what: str = "window"):
+        """The UI is up (or, headless, the bot is running). Reports once."""
+        if not self.enabled or self.ready_s is not None:
+            return
+        self.ready_s = time.perf_counter() - _T0
+        self.ready_what = what
+        builtins.__import__ = self._orig_import  # later imports aren't startup cost
+        report = self.report()
+        print(self.format(report), flush=True)
+        path = os.getenv("STARTUP_PROFILE_FILE")
+        if path:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(report) + "\n")
+
+    def report(self, top: int = 15) -> dict:
+        roots = [i for i in self.imports if i["depth"] == 0]
+        return {
+            "t": round(time.time(), 3),
+            "ready": self.ready_what,
+            "ready_s": round(self.ready_s or 0.0, 4),
+            "import_s": round(sum(i["total_s"] for i in roots), 4),
+            "modules_imported": len(self.imports),
+            "imports": [
+                {"module": i["module"], "total_s": round(i["total_s"], 4), "self_s": round(i["self_s"], 4)}
+                for i in sorted(roots, key=lambda i: -i["total_s"])[:top]
+            ],
+            "heaviest_self": [
+                {"module": i["module"], "self_s": round(i["self_s"], 4)}
+                for i in sorted(self.imports, key=lambda i: -i["self_s"])[:top]
+            ],
+            "phases": [{k: round(v, 4) if isinstance(v, float) else v for k, v in p.items()} for p in self.phases],
+        }
+
+    @staticmethod
+    def format(report: dict) -> str:
+        lines = [
+            f"[startup] {report['ready']} ready at {report['ready_s'] * 1000:.0f} ms "
+            f"(imports {report['import_s'] * 1000:.0f} ms, {report['modules_imported']} modules)",
+            "[startup] imports (incl. what they import):",
+        ]
+        lines += [f"    {i['total_s'] * 1000:7.1f} ms  {i['module']}" for i in report["imports"]]
+        lines.append("[startup] initializers:")
+        lines += [f"    {p['s'] * 1000:7.1f} ms  {p['phase']}" for p in report["phases"]]
+        return "\n".join(lines)
+
+
+# Process-wide profile; main.py enables it for --profile-startup
+profile = StartupProfile()
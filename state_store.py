@@ -0,0 +1,91 @@
+"""Versioned app state — lets the UI (or any remote client) sync incrementally.
+
+StateStore is the app_state dict with change tracking: every assignment that
+changes a value bumps a global version and stamps the key with it, so
+`changed_since(v)` names exactly the keys a client that last synced at v is
+missing. Log lines are versioned on the same counter. Mutating a value in
+place (e.g. `state["active_characters"].append(...)`) isn't seen; call
+`touch(key)` afterwards.
+"""
+
+import threading
+from collections import deque
+
+
+def _same(a, b) -> bool:
+    if a is b:
+        return True
+    try:
+        return type(a) is type(b) and bool(a == b)
+    except Exception:
+        return False
+
+
+class StateStore(dict):
+    def __init__(self, initial: dict | None = None, log_capacity: int = 200):
+        super().__init__()
+        self.version = 0
+        self._versions: dict[str, int] = {}
+        self._logs: deque[tuple[int, dict]] = deque(maxlen=log_capacity)
+        self._lock = threading.RLock()
+        self._listeners = []
+        self.update(initial or {})
+
+    def _bump(self, key: str):
+        self.version += 1
+        self._versions[key] = self.version
+
+    def _changed(self):
+        for cb in self._listeners:
+            cb()
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            if key in self and _same(dict.__getitem__(self, key), value):
+                return
+            dict.__setitem__(self, key, value)
+            self._bump(key)
+        self._changed()
+
+    def __delitem__(self, key):
+        with self._lock:
+            dict.__delitem__(self, key)
+            self._bump(key)
+        self._changed()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def touch(self, key: str):
+        """Mark a key changed after mutating its value in place."""
+        with self._lock:
+            self._bump(key)
+        self._changed()
+
+    def log(self, entry: dict):
+        """Append a log line, versioned with the state."""
+        with self._lock:
+            self.version += 1
+            self._logs.append((self.version, entry))
+        self._changed()
+
+    def changes(self, since: int) -> tuple[int, dict, list[dict]]:
+        """(current version, changed key -> value, log lines) after `since`, read atomically."""
+        with self._lock:
+            state = {k: dict.__getitem__(self, k) for k, v in self._versions.items() if v > since and k in self}
+            logs = [entry for v, entry in self._logs if v > since]
+            return self.version, state, logs
+
+    def changed_since(self, since: int) -> list[str]:
+        with self._lock:
+            return [k for k, v in self._versions.items() if v > since]
+
+    def add_listener(self, callback):
+        """callback() runs after every change, on the thread that made it. Keep it cheap."""
+        self._listeners.append(callback)
@@ -0,0 +1,173 @@
+"""Latency tracing — spans from frame capture / transcript to first audio sample.
+
+A Trace follows one frame or transcript through the pipeline. Each stage
+(grab, diff, encode, queue_wait, llm, tts_first_audio, playback_wait, ...)
+is recorded as a span on the perf_counter clock. Spans go to an in-memory
+ring buffer and, if TRACE_FILE is set, to a file written by a background
+thread: Chrome trace format (open in chrome://tracing or Perfetto) when the
+name ends in .json, JSON lines otherwise.
+"""
+
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Trace:
+    """Timeline of one frame / transcript / forced comment."""
+
+    def __init__(self, tracer: "Tracer", trace_id: int, kind: str, start: float | None = None):
+        self.tracer = tracer
+        self.id = trace_id
+        self.kind = kind
+        self.started_at = start if start is not None else time.perf_counter()
+
+    def record(self, name: str, start: float, end: float | None = None, **attrs):
+        self.tracer.record(name, start, time.perf_counter() if end is None else end, self.id, self.kind, **attrs)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, **attrs)
+
+
+class Tracer:
+    def __init__(self, capacity: int = 4096, path: str | None = None):
+        """
+        Args:
+            capacity: Spans kept in memory for summaries.
+            path: Optional output file (.json = Chrome trace, anything else = JSONL).
+        """
+        self.path = path
+        self._spans: deque[dict] = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._epoch = time.perf_counter()
+        self._writes: queue.SimpleQueue | None = None
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._closed = False  # file output finished; spans are still kept in memory
+
+    def new_trace(self, kind: str, start: float | None = None) -> Trace:
+        return Trace(self, next(self._ids), kind, start)
+
+    def record(self, name: str, start: float, end: float, trace_id: int = 0, kind: str = "", **attrs):
+        """Add a finished span. Cheap enough for the audio callback: an append and a queue put."""
+        span = {"name": name, "trace": trace_id, "kind": kind, "start": start, "dur": end - start}
+        if attrs:
+            span["attrs"] = attrs
+        self._spans.append(span)
+        if self.path and not self._closed:
+            if self._writer is None and not self._start_writer():
+                return  # closed meanwhile
+            self._writes.put(span)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Span outside any trace (e.g. a capture tick with no change)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), **attrs)
+
+    # ── File output ──
+
+    def _start_writer(self) -> bool:
+        with self._writer_lock:
+            if self._writer is None and not self._closed:
+                self._writes = queue.SimpleQueue()
+                self._writer = threading.Thread(target=self._write_loop, daemon=True, name="tracer")
+                self._writer.start()
+            return self._writer is not None
+
+    def _write_loop(self):
+        chrome = self.path.endswith(".json")
+        with open(self.path, "w", encoding="utf-8") as f:
+            if chrome:
+                # Chrome's trace viewer accepts an unterminated array, so a crash still leaves a usable file
+                f.write("[\n")
+            while True:
+                span = self._writes.get()
+                if span is None:
+                    break
+                if chrome:
+                    f.write(json.dumps({
+                        "name": span["name"],
+                        "cat": span["kind"] or "misc",
+                        "ph": "X",
+                        "ts": round((span["start"] - self._epoch) * 1e6),
+                        "dur": round(span["dur"] * 1e6),
+                        "pid": 1,
+                        "tid": span["trace"],
+                        "args": span.get("attrs", {}),
+                    }) + ",\n")
+                else:
+                    row = {
+                        "trace": span["trace"],
+                        "kind": span["kind"],
+                        "name": span["name"],
+                        "t": round(span["start"] - self._epoch, 6),
+                        "ms": round(span["dur"] * 1000, 3),
+                    }
+                    row.update(span.get("attrs", {}))
+                    f.write(json.dumps(row) + "\n")
+                if self._writes.empty():
+                    f.flush()
+
+    def close(self):
+        """Finish the output file. Later spans are only kept in memory (nothing would drain them)."""
+        with self._writer_lock:
+            self._closed = True
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._writes.put(None)
+            writer.join(timeout=2.0)
+
+    # ── Summaries ──
+
+    def summary(self) -> dict:
+        """Per-stage count and p50 / p90 / p99 / max duration in milliseconds."""
+        by_name: dict[str, list[float]] = {}
+        for span in list(self._spans):
+            by_name.setdefault(span["name"], []).append(span["dur"] * 1000)
+        result = {}
+        for name, values in by_name.items():
+            values.sort()
+            n = len(values)
+            result[name] = {
+                "count": n,
+                "p50": round(values[n // 2], 1),
+                "p90": round(values[min(n - 1, int(n * 0.9))], 1),
+                "p99": round(values[min(n - 1, int(n * 0.99))], 1),
+                "max": round(values[-1], 1),
+            }
+        return result
+
+    def recent(self, limit: int = 100) -> list[dict]:
+        """Most recent spans, durations in ms, for display."""
+        spans = list(self._spans)[-limit:]
+        return [
+            {
+                "trace": s["trace"],
+                "kind": s["kind"],
+                "name": s["name"],
+                "t": round(s["start"] - self._epoch, 3),
+                "ms": round(s["dur"] * 1000, 1),
+            }
+            for s in spans
+        ]
+
+
+# Process-wide tracer; the pipeline stages record into it
+tracer = Tracer(
+    capacity=int(os.getenv("TRACE_BUFFER", "4096")),
+    path=os.getenv("TRACE_FILE") or None,
+)
@@ -1,185 +1,158 @@
-"""Floating control window + global hotkeys."""
+"""Lightweight tkinter control window — a low-memory alternative to the pywebview UI.
+
+    python main.py --tray          # or UI_FRONTEND=tray
+
+Drives the bot through the same UiBridge methods the web UI calls, so settings,
+parties and hotkeys behave identically. Nothing is polled: the app state
+(StateStore) announces every change, and the window asks the bridge for what
+changed since it last looked (get_changes), the same way the web UI's push
+channel does. Tk may only be touched from the thread running its mainloop, so a
+change just schedules a refresh there; a burst of changes becomes one refresh.
+"""
 
-import json
-import os
-import threading
 import tkinter as tk
-from tkinter import ttk, scrolledtext
-from pathlib import Path
+from tkinter import scrolledtext, ttk
 
-import keyboard
+MIC_MODES = ["always_on", "push_to_talk", "off"]
+INTERVALS = ["1.0s", "1.5s", "3.0s", "5.0s"]
 
 
-def load_characters() -> list[dict]:
-    """Load all character JSON files from characters/ directory."""
-    chars = []
-    char_dir = Path(__file__).parent / "characters"
-    if char_dir.exists():
-        for f in sorted(char_dir.glob("*.json")):
-            try:
-                with open(f) as fh:
-                    chars.append(json.load(fh))
-            except Exception as e:
-                print(f"[ui] Failed to load {f}: {e}")
-    return chars
+def _tk_safe(text: str) -> str:
+    """Tk before 8.6.10 can't show characters outside the BMP (most emoji)."""
+    return "".join(c if ord(c) < 0x10000 else "�" for c in text)
 
 
 class TrayApp:
-    def __init__(self, app_state: dict):
-        self.state = app_state
+    def __init__(self, bridge, batch_ms: int = 30, max_log_lines: int = 200):
+        """
+        Args:
+            bridge: The bot's UiBridge.
+            batch_ms: How long a burst of state changes gets to coalesce into one refresh.
+            max_log_lines: Older log lines are dropped from the widget.
+        """
+        self.bridge = bridge
+        self.batch_ms = batch_ms
+        self.max_log_lines = max_log_lines
+        self._version = 0
         self._root = None
-        self._char_var = None
-        self._mic_var = None
-        self._interval_var = None
-        self._cost_var = None
-        self._status_var = None
-        self._log_text = None
-        self._max_log_lines = 50
-
-    def _toggle_pause(self, *_):
-        self.state["paused"] = not self.state["paused"]
-        self._update_status()
-
-    def _set_character(self, *_):
-        name = self._char_var.get()
-        for c in self.state["characters"]:
-            if c["name"] == name:
-                self.state["character"] = c
-                if self.state.get("brain"):
-                    self.state["brain"].set_character(c["system_prompt"])
-                if self.state.get("voice"):
-                    self.state["voice"].set_voice(c["voice"])
-                self._log(f"Switched to {name}")
-                break
+        self._refresh_pending = False
+        self._closed = False
+        # Last known values; deltas leave out keys that didn't change
+        self._models_ready = True
+        self._speaking = ""
+        self.refreshes = 0
+
+    # ── Change notification ──
+
+    def _notify(self):
+        """StateStore listener; runs on whichever thread changed the state."""
+        if self._refresh_pending or self._closed or self._root is None:
+            return
+        self._refresh_pending = True
+        try:
+            self._root.after(self.batch_ms, self._refresh)
+        except (RuntimeError, tk.TclError):
+            self._refresh_pending = False  # window already gone
+
+    def _refresh(self):
+        self._refresh_pending = False
+        if self._closed:
+            return
+        msg = self.bridge.get_changes(self._version)
+        self._version = msg["version"]
+        self._apply(msg["state"])
+        for entry in msg["logs"]:
+            self._append_log(entry.get("source", ""), entry.get("text", ""))
+        self.refreshes += 1
+        # Two changes don't announce themselves: model warm-up finishing and the speaker
+        # highlight timing out (UiBridge, 3 s). Look again for those only while they're pending.
+        if not self._models_ready:
+            self._root.after(1000, self._notify)
+        if self._speaking:
+            self._root.after(3100, self._notify)
+
+    def _apply(self, state: dict):
+        if "paused" in state:
+            self._status_var.set("PAUSED" if state["paused"] else "ACTIVE")
+            self._status_label.configure(style="Paused.TLabel" if state["paused"] else "Status.TLabel")
+            self._pause_btn.configure(text="Resume" if state["paused"] else "Pause")
+        if "mic_mode" in state:
+            self._mic_var.set(state["mic_mode"])
+        if "interval" in state:
+            self._interval_var.set(f"{state['interval']}s")
+        if "cost" in state:
+            cost = state["cost"]
+            self._cost_var.set(f"${cost.get('cost', 0):.4f} | {cost.get('calls', 0)} calls")
+        if "parties" in state:
+            self._party_combo.configure(values=sorted(state["parties"]))
+        if "characters" in state:
+            self._char_list.delete(0, "end")
+            for c in state["characters"]:
+                self._char_list.insert("end", _tk_safe(c["name"]))
+            state.setdefault("active_characters", [c["name"] for c in self.bridge.state["active_characters"]])
+        if "active_characters" in state:
+            active = set(state["active_characters"])
+            self._char_list.selection_clear(0, "end")
+            for i, name in enumerate(self._char_list.get(0, "end")):
+                if name in active:
+                    self._char_list.selection_set(i)
+        if "speaking" in state:
+            self._speaking = state["speaking"]
+            self._speaking_var.set(f"Speaking: {_tk_safe(self._speaking)}" if self._speaking else "")
+        if "models" in state:
+            self._models_ready = state["models"].get("ready", True)
+            self._models_var.set("" if self._models_ready else "Loading models...")
+
+    def _append_log(self, source: str, text: str):
+        log = self._log_text
+        log.configure(state="normal")
+        log.insert("end", f"[{_tk_safe(source)}] ", ("source",))
+        log.insert("end", _tk_safe(text) + "\n")
+        lines = int(log.index("end-1c").split(".")[0])
+        if lines > self.max_log_lines:
+            log.delete("1.0", f"{lines - self.max_log_lines}.0")
+        log.see("end")
+        log.configure(state="disabled")
+
+    # ── Controls (all through the bridge) ──
 
     def _set_mic(self, *_):
-        mode = self._mic_var.get()
-        self.state["mic_mode"] = mode
-        mic = self.state.get("mic")
-        if mic:
-            mic.mode = mode
-        self._log(f"Mic: {mode}")
+        self.bridge.update_settings({"mic_mode": self._mic_var.get()})
 
     def _set_interval(self, *_):
-        val = float(self._interval_var.get().split("s")[0])
-        self.state["interval"] = val
-        capture = self.state.get("capture")
-        if capture:
-            capture.interval = val
-        self._log(f"Interval: {val}s")
-
-    def _force_comment(self):
-        cb = self.state.get("on_force_comment")
-        if cb:
-            cb()
-        self._log("Forced comment")
+        self.bridge.update_settings({"interval": float(self._interval_var.get().rstrip("s"))})
+
+    def _load_party(self, *_):
+        name = self._party_var.get()
+        if name:
+            self.bridge.load_party(name)
+
+    def _on_char_click(self, event):
+        index = self._char_list.nearest(event.y)
+        if index >= 0:
+            self.bridge.toggle_character(self._char_list.get(index))
+        # The listbox changed its own selection; put back what the bridge says is active
+        self._apply({"active_characters": [c["name"] for c in self.bridge.state["active_characters"]]})
+        return "break"
 
     def _quit(self):
-        on_quit = self.state.get("on_quit")
-        if on_quit:
-            on_quit()
-        if self._root:
-            self._root.destroy()
-
-    def _cycle_mic(self):
-        modes = ["always_on", "push_to_talk", "off"]
-        cur = self.state["mic_mode"]
-        idx = (modes.index(cur) + 1) % len(modes)
-        self.state["mic_mode"] = modes[idx]
-        mic = self.state.get("mic")
-        if mic:
-            mic.mode = modes[idx]
-        if self._mic_var and self._root:
-            self._root.after(0, lambda: self._mic_var.set(modes[idx]))
-        self._log(f"Mic: {modes[idx]}")
-
-    def _next_character(self):
-        chars = self.state["characters"]
-        if not chars:
-            return
-        cur_name = self.state["character"]["name"]
-        names = [c["name"] for c in chars]
-        idx = (names.index(cur_name) + 1) % len(chars)
-        self.state["character"] = chars[idx]
-        if self.state.get("brain"):
-            self.state["brain"].set_character(chars[idx]["system_prompt"])
-        if self.state.get("voice"):
-            self.state["voice"].set_voice(chars[idx]["voice"])
-        if self._char_var and self._root:
-            self._root.after(0, lambda: self._char_var.set(chars[idx]["name"]))
-        self._log(f"Switched to {chars[idx]['name']}")
-
-    def _update_status(self):
-        if not self._status_var:
-            return
-        if self.state["paused"]:
-            self._status_var.set("PAUSED")
-        else:
-            self._status_var.set("ACTIVE")
-
-    def _log(self, text: str):
-        """Add a line to the log. Thread-safe."""
-        if not self._log_text or not self._root:
-            return
-        # Safe for Windows console
-        safe = text.encode("ascii", "replace").decode()
-
-        def _append():
-            self._log_text.configure(state="normal")
-            self._log_text.insert("end", safe + "\n")
-            # Trim old lines
-            lines = int(self._log_text.index("end-1c").split(".")[0])
-            if lines > self._max_log_lines:
-                self._log_text.delete("1.0", f"{lines - self._max_log_lines}.0")
-            self._log_text.see("end")
-            self._log_text.configure(state="disabled")
-
-        self._root.after(0, _append)
-
-    def update_cost(self):
-        """Called periodically to refresh cost display."""
-        if not self._root:
-            return
-        brain = self.state.get("brain")
-        if brain:
-            self._cost_var.set(f"${brain.estimated_cost():.4f} | {brain.total_calls} calls")
-        self._root.after(3000, self.update_cost)
-
-    def set_last_message(self, name: str, text: str):
-        """Log a bot message."""
-        self._log(f"[{name}] {text}")
-
-    def log_player(self, text: str):
-        """Log what the player said."""
-        self._log(f"[You] {text}")
-
-    def log_system(self, text: str):
-        """Log a system message."""
-        self._log(f"[sys] {text}")
-
-    def _register_hotkeys(self):
-        ptt_key = os.getenv("PTT_KEY", "v")
-        keyboard.on_press_key("f7", lambda _: self._cycle_mic(), suppress=False)
-        keyboard.on_press_key("f8", lambda _: self._toggle_pause(), suppress=False)
-        keyboard.on_press_key("f9", lambda _: self._next_character(), suppress=False)
-        keyboard.on_press_key("f10", lambda _: self._force_comment(), suppress=False)
-        keyboard.on_press_key("f12", lambda _: self._quit(), suppress=False)
-
-        mic = self.state.get("mic")
-        if mic:
-            keyboard.on_press_key(ptt_key, lambda _: mic.set_ptt(True), suppress=False)
-            keyboard.on_release_key(ptt_key, lambda _: mic.set_ptt(False), suppress=False)
-
-    def run(self):
-        """Build and run the control window (blocking)."""
-        self._register_hotkeys()
+        self.bridge.quit_app()  # calls destroy() below through bridge._window
 
-        root = tk.Tk()
-        self._root = root
+    def destroy(self):
+        """Close the window; safe from any thread (the bridge's quit paths call it)."""
+        self._closed = True
+        if self._root is not None:
+            try:
+                self._root.after(0, self._root.destroy)
+            except (RuntimeError, tk.TclError):
+                pass
+
+    # ── Window ──
+
+    def _build(self, root: tk.Tk):
         root.title("Glaze Bot")
         root.attributes("-topmost", True)
-        root.resizable(True, True)
-        root.geometry("420x500")
+        root.geometry("420x560")
         root.protocol("WM_DELETE_WINDOW", self._quit)
 
         # Dark theme
@@ -197,89 +170,96 @@ class TrayApp:
         style.configure("TCombobox", font=("Segoe UI", 10))
         style.configure("Header.TLabel", background=bg, foreground=accent, font=("Segoe UI", 14, "bold"))
         style.configure("Status.TLabel", background=bg, foreground="#a6e3a1", font=("Segoe UI", 10, "bold"))
+        style.configure("Paused.TLabel", background=bg, foreground="#f38ba8", font=("Segoe UI", 10, "bold"))
         style.configure("Cost.TLabel", background=bg, foreground="#f9e2af", font=("Segoe UI", 9))
         style.configure("Hint.TLabel", background=bg, foreground="#585b70", font=("Segoe UI", 8))
 
         pad = {"padx": 8, "pady": 3}
 
         # Header row
-        header_frame = tk.Frame(root, bg=bg)
-        header_frame.pack(fill="x", padx=8, pady=(8, 4))
-        ttk.Label(header_frame, text="Glaze Bot", style="Header.TLabel").pack(side="left")
-        self._status_var = tk.StringVar(value="ACTIVE")
-        ttk.Label(header_frame, textvariable=self._status_var, style="Status.TLabel").pack(side="right")
-
-        # Controls frame
+        header = tk.Frame(root, bg=bg)
+        header.pack(fill="x", padx=8, pady=(8, 4))
+        ttk.Label(header, text="Glaze Bot", style="Header.TLabel").pack(side="left")
+        self._status_var = tk.StringVar(value="")
+        self._status_label = ttk.Label(header, textvariable=self._status_var, style="Status.TLabel")
+        self._status_label.pack(side="right")
+        self._models_var = tk.StringVar(value="")
+        ttk.Label(header, textvariable=self._models_var, style="Hint.TLabel").pack(side="right", padx=8)
+
+        # Controls
         ctrl = tk.Frame(root, bg=bg)
         ctrl.pack(fill="x", padx=8, pady=4)
 
-        # Character
-        ttk.Label(ctrl, text="Character:").grid(row=0, column=0, sticky="w", **pad)
-        char_names = [c["name"] for c in self.state["characters"]]
-        self._char_var = tk.StringVar(value=self.state["character"]["name"])
-        char_combo = ttk.Combobox(ctrl, textvariable=self._char_var, values=char_names, state="readonly", width=16)
-        char_combo.grid(row=0, column=1, sticky="ew", **pad)
-        char_combo.bind("<<ComboboxSelected>>", self._set_character)
+        ttk.Label(ctrl, text="Party:").grid(row=0, column=0, sticky="w", **pad)
+        self._party_var = tk.StringVar(value="")
+        self._party_combo = ttk.Combobox(ctrl, textvariable=self._party_var, state="readonly", width=16)
+        self._party_combo.grid(row=0, column=1, sticky="ew", **pad)
+        self._party_combo.bind("<<ComboboxSelected>>", self._load_party)
 
-        # Mic mode
         ttk.Label(ctrl, text="Mic:").grid(row=1, column=0, sticky="w", **pad)
-        self._mic_var = tk.StringVar(value=self.state["mic_mode"])
-        mic_combo = ttk.Combobox(ctrl, textvariable=self._mic_var, values=["always_on", "push_to_talk", "off"], state="readonly", width=16)
+        self._mic_var = tk.StringVar(value="")
+        mic_combo = ttk.Combobox(ctrl, textvariable=self._mic_var, values=MIC_MODES, state="readonly", width=16)
         mic_combo.grid(row=1, column=1, sticky="ew", **pad)
         mic_combo.bind("<<ComboboxSelected>>", self._set_mic)
 
-        # Interval
         ttk.Label(ctrl, text="Interval:").grid(row=2, column=0, sticky="w", **pad)
-        intervals = ["1.0s", "1.5s", "3.0s", "5.0s"]
-        self._interval_var = tk.StringVar(value=f"{self.state['interval']}s")
-        int_combo = ttk.Combobox(ctrl, textvariable=self._interval_var, values=intervals, state="readonly", width=16)
+        self._interval_var = tk.StringVar(value="")
+        int_combo = ttk.Combobox(ctrl, textvariable=self._interval_var, values=INTERVALS, state="readonly", width=16)
         int_combo.grid(row=2, column=1, sticky="ew", **pad)
         int_combo.bind("<<ComboboxSelected>>", self._set_interval)
 
+        ttk.Label(ctrl, text="Characters:").grid(row=3, column=0, sticky="nw", **pad)
+        self._char_list = tk.Listbox(
+            ctrl, selectmode="multiple", height=6, exportselection=False, activestyle="none",
+            bg=log_bg, fg=log_fg, selectbackground=accent, selectforeground=bg,
+            highlightthickness=0, borderwidth=1, relief="solid",
+        )
+        self._char_list.grid(row=3, column=1, sticky="ew", **pad)
+        self._char_list.bind("<Button-1>", self._on_char_click)
+
         ctrl.columnconfigure(1, weight=1)
 
         # Cost + buttons row
-        action_frame = tk.Frame(root, bg=bg)
-        action_frame.pack(fill="x", padx=8, pady=4)
+        actions = tk.Frame(root, bg=bg)
+        actions.pack(fill="x", padx=8, pady=4)
         self._cost_var = tk.StringVar(value="$0.0000 | 0 calls")
-        ttk.Label(action_frame, textvariable=self._cost_var, style="Cost.TLabel").pack(side="left")
-        ttk.Button(action_frame, text="Quit", command=self._quit).pack(side="right", padx=2)
-        ttk.Button(action_frame, text="Force", command=self._force_comment).pack(side="right", padx=2)
-        ttk.Button(action_frame, text="Pause", command=self._toggle_pause).pack(side="right", padx=2)
+        ttk.Label(actions, textvariable=self._cost_var, style="Cost.TLabel").pack(side="left")
+        self._speaking_var = tk.StringVar(value="")
+        ttk.Label(actions, textvariable=self._speaking_var, style="Hint.TLabel").pack(side="left", padx=8)
+        ttk.Button(actions, text="Quit", command=self._quit).pack(side="right", padx=2)
+        ttk.Button(actions, text="Force", command=self.bridge.force_comment).pack(side="right", padx=2)
+        self._pause_btn = ttk.Button(actions, text="Pause", command=self.bridge.toggle_pause)
+        self._pause_btn.pack(side="right", padx=2)
 
         # Log area
         log_frame = tk.Frame(root, bg=bg)
         log_frame.pack(fill="both", expand=True, padx=8, pady=(4, 4))
-
         self._log_text = scrolledtext.ScrolledText(
-            log_frame,
-            bg=log_bg,
-            fg=log_fg,
-            font=("Consolas", 9),
-            wrap="word",
-            state="disabled",
-            borderwidth=1,
-            relief="solid",
-            insertbackground=fg,
+            log_frame, bg=log_bg, fg=log_fg, font=("Consolas", 9), wrap="word",
+            state="disabled", borderwidth=1, relief="solid", insertbackground=fg,
         )
+        self._log_text.tag_configure("source", foreground=accent)
         self._log_text.pack(fill="both", expand=True)
 
-        # Hotkey hints
-        ttk.Label(root, text="F7:Mic  F8:Pause  F9:Char  F10:Force  F12:Quit  V:PTT", style="Hint.TLabel").pack(pady=(0, 6))
+        ttk.Label(root, text="F7:Mic  F8:Pause  F10:Force  F12:Quit  V:PTT", style="Hint.TLabel").pack(pady=(0, 6))
 
-        # Init log
-        self._log("Glaze Bot started")
-        self._log(f"Character: {self.state['character']['name']}")
-        self._log(f"Mic: {self.state['mic_mode']}")
+    def run(self, on_ready=None):
+        """Build and run the control window (blocking). Returns when it is closed.
 
-        # Start cost updater
-        self.update_cost()
-
-        root.mainloop()
-
-    def stop(self):
-        if self._root:
-            try:
-                self._root.destroy()
-            except Exception:
-                pass
+        Args:
+            on_ready: Called on the Tk thread once the window is up.
+        """
+        root = tk.Tk()
+        self._root = root
+        self._build(root)
+        # The bridge's quit paths (F12, quit_app) close "the window"; here that's this object
+        self.bridge._window = self
+        self.bridge.state.add_listener(self._notify)
+        self._refresh()  # version 0: everything, including the recent log
+        if on_ready:
+            root.after(0, on_ready)
+        try:
+            root.mainloop()
+        finally:
+            self._closed = True
+            self._root = None
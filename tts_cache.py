@@ -0,0 +1,157 @@
+"""Synthesized TTS audio cache — in-memory LRU with an optional compressed on-disk tier."""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from log import get_logger
+
+log = get_logger("voice")
+
+
+class AudioCache:
+    """Maps (engine, voice, text) to synthesized audio.
+
+    Audio is stored as int16 to halve memory. The memory tier evicts least
+    recently used entries once `max_bytes` is exceeded. If `disk_dir` is set,
+    entries are also written there as compressed .npz files (bounded by
+    `disk_max_bytes`, oldest first) and survive restarts.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: str | Path | None = None, disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            # Half-written entries left by a crash. Only old ones: another cache (a server
+            # session) may share the folder and be writing right now.
+            cutoff = time.time() - 3600
+            for orphan in self.disk_dir.glob("*.npz.tmp"):
+                try:
+                    if orphan.stat().st_mtime < cutoff:
+                        orphan.unlink()
+                except OSError:
+                    pass
+
+    @staticmethod
+    def key(engine: str, voice: str, text: str) -> str:
+        return hashlib.sha1(f"{engine}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, engine: str, voice: str, text: str) -> np.ndarray | None:
+        """Cached audio as float32, or None."""
+        k = self.key(engine, voice, text)
+        with self._lock:
+            pcm = self._entries.get(k)
+            if pcm is not None:
+                self._entries.move_to_end(k)
+                self.memory_hits += 1
+                return pcm.astype(np.float32) / 32767.0
+
+        pcm = self._load_disk(k)
+        with self._lock:
+            if pcm is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(k, pcm)
+        return pcm.astype(np.float32) / 32767.0
+
+    def put(self, engine: str, voice: str, text: str, audio: np.ndarray):
+        if len(audio) == 0:
+            return
+        k = self.key(engine, voice, text)
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        with self._lock:
+            self._insert(k, pcm)
+        self._save_disk(k, pcm)
+
+    def _insert(self, k: str, pcm: np.ndarray):
+        if pcm.nbytes > self.max_bytes:
+            return
+        old = self._entries.pop(k, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[k] = pcm
+        self._bytes += pcm.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def _load_disk(self, k: str) -> np.ndarray | None:
+        if not self.disk_dir:
+            return None
+        path = self.disk_dir / f"{k}.npz"
+        try:
+            with np.load(path) as data:
+                pcm = data["pcm"]
+            os.utime(path)  # refresh for oldest-first disk eviction
+            return pcm
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning(f"Dropping unreadable cache file {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _save_disk(self, k: str, pcm: np.ndarray):
+        if not self.disk_dir:
+            return
+        path = self.disk_dir / f"{k}.npz"
+        if path.exists():
+            return
+        tmp = None
+        try:
+            # Not *.npz, so _trim_disk never counts or deletes a file mid-write. Written
+            # through the handle because np.savez appends ".npz" to a path without it.
+            fd, tmp = tempfile.mkstemp(dir=self.disk_dir, prefix=f"{k}.", suffix=".npz.tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, pcm=pcm)
+            os.replace(tmp, path)
+            tmp = None
+            self._trim_disk()
+        except OSError as e:
+            log.warning(f"Cache write failed: {e}")
+        finally:
+            if tmp is not None:
+                Path(tmp).unlink(missing_ok=True)
+
+    def _trim_disk(self):
+        if self.disk_max_bytes <= 0:
+            return
+        files = sorted(self.disk_dir.glob("*.npz"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        for p in files:
+            if total <= self.disk_max_bytes:
+                break
+            total -= p.stat().st_size
+            p.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "disk": str(self.disk_dir) if self.disk_dir else None,
+            }
@@ -0,0 +1,29 @@
+/**
+ * Avatar URLs. scripts/process_avatars.py writes 64/128/256 px WebP variants of
+ * each character PNG into public/avatars with content-hashed names, and lists
+ * them in avatars.json (bundled). Characters without variants get the PNG.
+ */
+import manifest from "./avatars.json";
+
+interface AvatarEntry {
+  file: string;
+  variants: Record<string, string>;
+}
+
+const BASE = "./avatars/";
+const entries: Record<string, AvatarEntry> = manifest;
+
+export function avatarSlug(name: string): string {
+  return name.toLowerCase().replace(/\s+/g, "_");
+}
+
+/** URL for showing `name`'s avatar at `px` CSS pixels: the smallest variant that stays sharp on this screen. */
+export function avatarUrl(name: string, px: number): string {
+  const slug = avatarSlug(name);
+  const entry = entries[slug];
+  if (!entry) return `${BASE}${slug}.png`;
+  const need = px * (window.devicePixelRatio || 1);
+  const sizes = Object.keys(entry.variants).map(Number).sort((a, b) => a - b);
+  const size = sizes.find((s) => s >= need) ?? sizes[sizes.length - 1];
+  return BASE + (size ? entry.variants[String(size)] : entry.file);
+}
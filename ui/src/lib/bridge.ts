@@ -1,4 +1,4 @@
-import type { AppState, CostInfo, PollResult, PersonalityTraits, CaptureSource } from "./types";
+import type { AppState, CostInfo, PollResult, StateChanges, PersonalityTraits, CaptureSource } from "./types";
 
 function api(): any { return (window as any).pywebview?.api; }
 function live(): boolean { return !!(window as any).pywebview?.api; }
@@ -80,7 +80,20 @@ export async function pollState(): Promise<PollResult> {
   return { logs, paused: mP, active_characters: mA, speaking: sp,
     min_gap: 30, interval: 1.5, mic_mode: "always_on",
     interaction_mode: true, interaction_chance: 0.25,
-    capture_source_type: null, capture_source_name: "" };
+    capture_source_type: null, capture_source_name: "",
+    models: { ready: mN > 4, models: { kokoro: { state: mN > 4 ? "ready" : "loading", load_time: mN > 4 ? 2.1 : null } } } };
+}
+// Only what changed after `since`; the mock always answers with everything
+export async function getChanges(since: number): Promise<StateChanges> {
+  if (live()) return await api().get_changes(since);
+  const { logs, ...state } = await pollState();
+  return { version: since + 1, state, logs };
+}
+// Full snapshot, after which changes arrive through window.__glazePush; null = poll getChanges
+export async function subscribePush(): Promise<StateChanges | null> {
+  if (!live()) return null;
+  const r = await api().subscribe_push();
+  return r.ok ? r : null;
 }
 export async function getCaptureSourcess(): Promise<{ monitors: CaptureSource[]; windows: CaptureSource[] }> {
   if (live()) return await api().get_capture_sources();
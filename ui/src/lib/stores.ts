@@ -1,5 +1,5 @@
 import { writable } from "svelte/store";
-import type { Character, LogEntry, CostInfo, PersonalityTraits } from "./types";
+import type { Character, LogEntry, CostInfo, PersonalityTraits, ModelStatus, PollResult, StateChanges } from "./types";
 import * as B from "./bridge";
 
 export const characters = writable<Character[]>([]);
@@ -15,6 +15,7 @@ export const cost = writable<CostInfo>({ cost: 0, calls: 0 });
 export const ready = writable(false);
 export const speaking = writable("");
 export const savedParties = writable<Record<string, string[]>>({});
+export const modelStatus = writable<ModelStatus>({ ready: false, models: {} });
 
 // New settings stores
 export const aiProvider = writable("dashscope");
@@ -40,6 +41,7 @@ export const characterPersonality = writable<PersonalityTraits>({
 });
 
 let pt: any = null, ct: any = null;
+let version = -1;
 
 export async function initialize() {
   const s = await B.getInitialState();
@@ -61,26 +63,24 @@ export async function initialize() {
   captureSourceName.set(s.capture_source_name ?? "");
   ready.set(true);
 
+  // Push channel: the bridge sends batched changes; pushes that beat the snapshot are replayed after it
+  const early: StateChanges[] = [];
+  (window as any).__glazePush = (m: StateChanges) => {
+    if (version < 0) early.push(m);
+    else if (m.version > version) applyChanges(m);
+  };
+  const snap = await B.subscribePush().catch(() => null);
+  if (snap) {
+    applyChanges(snap);
+    for (const m of early) if (m.version > version) applyChanges(m);
+    return;
+  }
+  (window as any).__glazePush = undefined;
+
+  // No push channel (browser mock): poll for changes
+  version = 0;
   pt = setInterval(async () => {
-    try {
-      const r = await B.pollState();
-      if (r.logs.length) logs.update(e => [...e, ...r.logs].slice(-200));
-      paused.set(r.paused);
-      activeCharacters.set(r.active_characters);
-      speaking.set(r.speaking);
-      minGap.set(r.min_gap);
-      captureInterval.set(r.interval);
-      micMode.set(r.mic_mode);
-      interactionMode.set(r.interaction_mode);
-      interactionChance.set(r.interaction_chance);
-      aiProvider.set(r.ai_provider || "dashscope");
-      visionModel.set(r.vision_model || "qwen3-vl-flash");
-      captureScale.set(r.capture_scale ?? 0.5);
-      captureQuality.set(r.capture_quality ?? 70);
-      gameHint.set(r.game_hint || "");
-      captureSourceType.set(r.capture_source_type ?? null);
-      captureSourceName.set(r.capture_source_name ?? "");
-    } catch {}
+    try { applyChanges(await B.getChanges(version)); } catch {}
   }, 500);
 
   ct = setInterval(async () => {
@@ -88,6 +88,34 @@ export async function initialize() {
   }, 3000);
 }
 
+function applyChanges(m: StateChanges) {
+  version = m.version;
+  if (m.logs.length) logs.update(e => [...e, ...m.logs].slice(-200));
+  applyState(m.state);
+}
+
+function applyState(r: Partial<Omit<PollResult, "logs">>) {
+  if (r.characters !== undefined) characters.set(r.characters);
+  if (r.paused !== undefined) paused.set(r.paused);
+  if (r.active_characters !== undefined) activeCharacters.set(r.active_characters);
+  if (r.speaking !== undefined) speaking.set(r.speaking);
+  if (r.min_gap !== undefined) minGap.set(r.min_gap);
+  if (r.interval !== undefined) captureInterval.set(r.interval);
+  if (r.mic_mode !== undefined) micMode.set(r.mic_mode);
+  if (r.interaction_mode !== undefined) interactionMode.set(r.interaction_mode);
+  if (r.interaction_chance !== undefined) interactionChance.set(r.interaction_chance);
+  if (r.ai_provider !== undefined) aiProvider.set(r.ai_provider || "dashscope");
+  if (r.vision_model !== undefined) visionModel.set(r.vision_model || "qwen3-vl-flash");
+  if (r.capture_scale !== undefined) captureScale.set(r.capture_scale ?? 0.5);
+  if (r.capture_quality !== undefined) captureQuality.set(r.capture_quality ?? 70);
+  if (r.game_hint !== undefined) gameHint.set(r.game_hint || "");
+  if (r.capture_source_type !== undefined) captureSourceType.set(r.capture_source_type ?? null);
+  if (r.capture_source_name !== undefined) captureSourceName.set(r.capture_source_name ?? "");
+  if (r.models) modelStatus.set(r.models);
+  if (r.cost) cost.set(r.cost);
+  if (r.parties) savedParties.set(r.parties);
+}
+
 export async function toggleChar(n: string) {
   const r = await B.toggleCharacter(n);
   if (r.ok && r.active) activeCharacters.set(r.active);
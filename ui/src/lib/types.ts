@@ -50,6 +50,17 @@ export interface CostInfo {
   calls: number;
 }
 
+export interface ModelLoad {
+  state: "pending" | "loading" | "ready" | "error";
+  load_time: number | null;
+  error?: string;
+}
+
+export interface ModelStatus {
+  ready: boolean;
+  models: Record<string, ModelLoad>;
+}
+
 export interface PollResult {
   logs: LogEntry[];
   paused: boolean;
@@ -67,4 +78,15 @@ export interface PollResult {
   game_hint: string;
   capture_source_type: string | null;
   capture_source_name: string;
+  models?: ModelStatus;
+  cost?: CostInfo;
+  parties?: Record<string, any>;
+  characters?: Character[];
+}
+
+// UiBridge.get_changes / ui_push.py: only the keys that changed after the last version seen
+export interface StateChanges {
+  version: number;
+  state: Partial<Omit<PollResult, "logs">>;
+  logs: LogEntry[];
 }
@@ -1,16 +1,21 @@
 """Pywebview JS-Python bridge for the Svelte UI."""
 
-import json
 import os
-import threading
 import time
 from pathlib import Path
 
-import keyboard
+from log import get_logger
+from persistence import JsonDocument, load_json
+from metrics import metrics
+from state_store import StateStore
+from tracing import tracer
+from ui_push import UiPush
 
 PARTIES_FILE = Path(__file__).parent / "parties.json"
 SETTINGS_FILE = Path(__file__).parent / "settings.json"
 
+log = get_logger("ui")
+
 DEFAULT_SETTINGS = {
     "min_gap": 30,
     "interval": 1.5,
@@ -27,50 +32,69 @@ DEFAULT_SETTINGS = {
     "capture_source_name": "",
 }
 
-
-def load_characters() -> list[dict]:
-    chars = []
-    char_dir = Path(__file__).parent / "characters"
-    if char_dir.exists():
-        for f in sorted(char_dir.glob("*.json")):
-            try:
-                with open(f) as fh:
-                    chars.append(json.load(fh))
-            except Exception as e:
-                print(f"[ui] Failed to load {f}: {e}")
-    return chars
-
-
-def _load_json(path: Path, default: dict) -> dict:
-    if path.exists():
-        try:
-            with open(path) as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return default
-
-
-def _save_json(path: Path, data: dict):
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+# Keys the UI mirrors (get_changes / push), with defaults for ones the app hasn't set
+SYNCED_KEYS = {
+    "paused": True,
+    "characters": [],
+    "active_characters": [],
+    "speaking": "",
+    "min_gap": 30,
+    "interval": 1.5,
+    "mic_mode": "always_on",
+    "interaction_mode": True,
+    "interaction_chance": 0.25,
+    "ai_provider": "dashscope",
+    "vision_model": "qwen3-vl-flash",
+    "capture_scale": 0.5,
+    "capture_quality": 70,
+    "game_hint": "",
+    "capture_source_type": None,
+    "capture_source_name": "",
+    "parties": {},
+    "models": {"ready": True, "models": {}},
+    "cost": {"cost": 0, "calls": 0},
+}
 
 
 class UiBridge:
-    def __init__(self, app_state: dict):
+    def __init__(self, app_state: StateStore, persist: bool = True):
+        """
+        Args:
+            app_state: The bot's StateStore.
+            persist: False for server sessions: settings and parties start from the
+                defaults (the saved parties can still be loaded) and stay in memory.
+        """
         self.state = app_state
         self._window = None
-        self._log_buffer: list[dict] = []
-        self._log_lock = threading.Lock()
-        self._max_buffer = 200
-        self._last_speaker = ""
         self._last_speaker_time = 0.0
+        self._poll_version = 0
+        # Changes pushed to the page as they happen instead of polled
+        self._push = UiPush(self.get_changes)
+        self.state.add_listener(self._push.notify)
+        self._registry = self.state["registry"]
+        self._registry.on_change = self._on_characters_reloaded
+        # Also switched off by --profile-startup exit, so a measuring run leaves settings.json alone
+        self.persist = persist
+
+        for key, default in SYNCED_KEYS.items():
+            self.state.setdefault(key, default)
+        # Both files are read once and written behind (debounced, off this thread)
+        if persist:
+            self._settings_doc = JsonDocument(SETTINGS_FILE, {})
+            self._parties_doc = JsonDocument(PARTIES_FILE, {"parties": {}, "last_party": None})
+        else:
+            saved = load_json(PARTIES_FILE, {})
+            self._settings_doc = JsonDocument(None, {})
+            self._parties_doc = JsonDocument(None, {"parties": saved.get("parties", {}), "last_party": None})
+        self._parties_doc.data.setdefault("parties", {})  # not published yet: nothing else reads it
+        self.state["parties"] = self._parties_doc.data["parties"]
 
-        self._restore_settings()
-        self._restore_last_party()
+        if persist:
+            self._restore_settings()
+            self._restore_last_party()
 
     def _restore_settings(self):
-        saved = _load_json(SETTINGS_FILE, {})
+        saved = self._settings_doc.data
         for key in DEFAULT_SETTINGS:
             if key in saved and key in self.state:
                 self.state[key] = saved[key]
@@ -127,7 +151,7 @@ class UiBridge:
                 cap.set_source(src_type, src_id, src_name)
 
     def _restore_last_party(self):
-        data = _load_json(PARTIES_FILE, {"parties": {}, "last_party": None})
+        data = self._parties_doc.data
         last = data.get("last_party")
         if last and last in data.get("parties", {}):
             entry = data["parties"][last]
@@ -143,12 +167,15 @@ class UiBridge:
                 # Apply saved personalities
                 for c in restored:
                     if c["name"] in personalities:
-                        c["personality"] = personalities[c["name"]]
+                        self._registry.set_personality(c["name"], personalities[c["name"]], save=False)
                 self.state["active_characters"][:] = restored
-                print(f"[ui] Restored party '{last}'", flush=True)
+                self.state.touch("active_characters")
+                log.info(f"Restored party '{last}'")
 
     def _persist_settings(self):
-        _save_json(SETTINGS_FILE, {
+        if not self.persist:
+            return
+        self._settings_doc.save({
             "min_gap": self.state.get("min_gap", 12),
             "interval": self.state.get("interval", 1.5),
             "mic_mode": self.state.get("mic_mode", "always_on"),
@@ -164,12 +191,24 @@ class UiBridge:
             "capture_source_name": self.state.get("capture_source_name", ""),
         })
 
+    def _character_summaries(self) -> list[dict]:
+        return [{"name": c["name"], "description": c.get("description", ""), "voice": c.get("voice", ""),
+                 "personality": c.get("personality")}
+                for c in self.state["characters"]]
+
+    def _on_characters_reloaded(self, added: list, changed: list, removed: list):
+        """A character file was edited, added or deleted on disk."""
+        active = self.state["active_characters"]
+        active[:] = [c for c in active if self._registry.get(c["name"]) is c]
+        self.state.touch("characters")
+        self.state.touch("active_characters")
+        for name in removed:
+            self.push_log("sys", f"{name} removed (file deleted)")
+
     # ── API ──
 
     def get_initial_state(self) -> dict:
-        chars = [{"name": c["name"], "description": c.get("description", ""), "voice": c.get("voice", ""),
-                  "personality": c.get("personality")}
-                 for c in self.state["characters"]]
+        chars = self._character_summaries()
         active_names = [c["name"] for c in self.state["active_characters"]]
         return {
             "characters": chars,
@@ -180,7 +219,7 @@ class UiBridge:
             "interaction_mode": self.state.get("interaction_mode", True),
             "interaction_chance": self.state.get("interaction_chance", 0.25),
             "min_gap": self.state.get("min_gap", 12),
-            "parties": _load_json(PARTIES_FILE, {}).get("parties", {}),
+            "parties": self._parties_doc.data["parties"],
             "ai_provider": self.state.get("ai_provider", "dashscope"),
             "vision_model": self.state.get("vision_model", "qwen3-vl-flash"),
             "capture_scale": self.state.get("capture_scale", 0.5),
@@ -191,7 +230,7 @@ class UiBridge:
         }
 
     def get_character_details(self, name: str) -> dict:
-        char = next((c for c in self.state["characters"] if c["name"] == name), None)
+        char = self._registry.get(name)
         if not char:
             return {"ok": False}
         return {
@@ -202,35 +241,22 @@ class UiBridge:
         }
 
     def update_character_personality(self, name: str, personality: dict) -> dict:
-        char = next((c for c in self.state["characters"] if c["name"] == name), None)
-        if not char:
+        if not self._registry.get(name):
             return {"ok": False}
         # Validate and clamp values
         valid_keys = {"energy", "positivity", "formality", "talkativeness", "attitude", "humor"}
         cleaned = {}
         for k in valid_keys:
             cleaned[k] = max(0, min(100, int(float(personality.get(k, 50)))))
-        char["personality"] = cleaned
-        # Persist to character JSON file
-        char_dir = Path(__file__).parent / "characters"
-        slug = name.lower().replace(" ", "_").replace("the_", "")
-        for f in char_dir.glob("*.json"):
-            try:
-                with open(f) as fh:
-                    data = json.load(fh)
-                if data.get("name") == name:
-                    data["personality"] = cleaned
-                    _save_json(f, data)
-                    break
-            except Exception:
-                continue
+        # Written back to the character's file shortly after the last slider move
+        self._registry.set_personality(name, cleaned)
+        self.state.touch("characters")
         self.push_log("sys", f"Updated {name}'s personality")
         return {"ok": True, "personality": cleaned}
 
     def toggle_character(self, name: str) -> dict:
-        all_chars = self.state["characters"]
         active = self.state["active_characters"]
-        char = next((c for c in all_chars if c["name"] == name), None)
+        char = self._registry.get(name)
         if not char:
             return {"ok": False}
         if char in active:
@@ -241,6 +267,7 @@ class UiBridge:
         else:
             active.append(char)
             self.push_log("sys", f"{name} added")
+        self.state.touch("active_characters")
         return {"ok": True, "active": [c["name"] for c in active]}
 
     def save_party(self, party_name: str) -> dict:
@@ -250,16 +277,15 @@ class UiBridge:
         for c in active:
             if c.get("personality"):
                 personalities[c["name"]] = c["personality"]
-        data = _load_json(PARTIES_FILE, {"parties": {}, "last_party": None})
-        data["parties"][party_name] = {"members": names, "personalities": personalities}
-        data["last_party"] = party_name
-        _save_json(PARTIES_FILE, data)
+        with self._parties_doc.edit() as data:
+            data["parties"][party_name] = {"members": names, "personalities": personalities}
+            data["last_party"] = party_name
+        self.state["parties"] = data["parties"]
         self.push_log("sys", f"Saved party '{party_name}'")
         return {"ok": True, "parties": data["parties"]}
 
     def load_party(self, party_name: str) -> dict:
-        data = _load_json(PARTIES_FILE, {"parties": {}, "last_party": None})
-        entry = data.get("parties", {}).get(party_name)
+        entry = self._parties_doc.data.get("parties", {}).get(party_name)
         if not entry:
             return {"ok": False}
         # Backward compat: old format is a plain list
@@ -275,19 +301,20 @@ class UiBridge:
         # Apply saved personalities onto in-memory character dicts
         for c in restored:
             if c["name"] in personalities:
-                c["personality"] = personalities[c["name"]]
+                self._registry.set_personality(c["name"], personalities[c["name"]], save=False)
         self.state["active_characters"][:] = restored
-        data["last_party"] = party_name
-        _save_json(PARTIES_FILE, data)
+        self.state.touch("active_characters")
+        with self._parties_doc.edit() as data:
+            data["last_party"] = party_name
         self.push_log("sys", f"Loaded party '{party_name}'")
         return {"ok": True, "active": [c["name"] for c in restored], "personalities": personalities}
 
     def delete_party(self, party_name: str) -> dict:
-        data = _load_json(PARTIES_FILE, {"parties": {}, "last_party": None})
-        data["parties"].pop(party_name, None)
-        if data.get("last_party") == party_name:
-            data["last_party"] = None
-        _save_json(PARTIES_FILE, data)
+        with self._parties_doc.edit() as data:
+            data["parties"].pop(party_name, None)
+            if data.get("last_party") == party_name:
+                data["last_party"] = None
+        self.state["parties"] = data["parties"]
         return {"ok": True, "parties": data["parties"]}
 
     def update_settings(self, settings: dict) -> dict:
@@ -337,8 +364,20 @@ class UiBridge:
         self.push_log("sys", "Settings updated")
         return {"ok": True}
 
+    def flush(self) -> dict:
+        """Write settings.json / parties.json now instead of after the debounce."""
+        self._settings_doc.flush()
+        self._parties_doc.flush()
+        return {"ok": True}
+
+    def _set_paused(self, paused: bool):
+        self.state["paused"] = paused
+        cb = self.state.get("on_pause_changed")
+        if cb:
+            cb(paused)
+
     def toggle_pause(self) -> dict:
-        self.state["paused"] = not self.state["paused"]
+        self._set_paused(not self.state["paused"])
         return {"paused": self.state["paused"]}
 
     def force_comment(self) -> dict:
@@ -349,9 +388,11 @@ class UiBridge:
 
     def quit_app(self) -> dict:
         self._persist_settings()
+        self.flush()
         on_quit = self.state.get("on_quit")
         if on_quit:
             on_quit()
+        self._push.close()
         if self._window:
             self._window.destroy()
         return {"ok": True}
@@ -362,30 +403,96 @@ class UiBridge:
             return {"cost": round(brain.estimated_cost(), 6), "calls": brain.total_calls}
         return {"cost": 0, "calls": 0}
 
+    def get_echo_stats(self) -> dict:
+        """Echo canceller metrics (ERLE / residual echo), empty if ECHO_CANCEL is off."""
+        mic = self.state.get("mic")
+        return mic.echo_stats() if mic else {}
+
+    def get_tts_stats(self) -> dict:
+        """Per-segment TTS synthesis real-time factor."""
+        voice = self.state.get("voice")
+        return voice.synthesis_stats() if voice else {}
+
+    def get_tts_cache_stats(self) -> dict:
+        """TTS audio cache size and hit rate."""
+        voice = self.state.get("voice")
+        return voice.cache.stats() if voice else {}
+
+    def get_speech_stats(self) -> dict:
+        """Speech scheduler queue depth and spoken / expired / dropped counts."""
+        speech = self.state.get("speech")
+        return speech.stats() if speech else {}
+
+    def get_trace_summary(self) -> dict:
+        """Per-stage latency percentiles (ms) from capture / transcript to first audio sample."""
+        return tracer.summary()
+
+    def get_recent_spans(self, limit: int = 100) -> list:
+        return tracer.recent(limit)
+
+    def get_metrics(self) -> dict:
+        """Counters, gauges and histograms (count / sum / mean / p50 / p90 / p99 / buckets)."""
+        return metrics.snapshot()
+
+    def get_event_stats(self) -> dict:
+        """Orchestrator events pending, posted, coalesced and expired."""
+        events = self.state.get("events")
+        return events.stats() if events else {}
+
+    def get_model_host_stats(self) -> dict:
+        """CPU time, requests and restarts per out-of-process model, empty unless MODEL_HOST=1."""
+        hosts = {}
+        mic = self.state.get("mic")
+        if mic and mic.model_host and mic._whisper is not None:
+            hosts["stt"] = mic._whisper.stats()
+        voice = self.state.get("voice")
+        if voice and voice.model_host and voice._kokoro is not None:
+            hosts["tts"] = voice._kokoro.stats()
+        return hosts
+
+    def get_model_status(self) -> dict:
+        """Readiness and load time of each background-loaded model."""
+        warmup = self.state.get("warmup")
+        if warmup:
+            return warmup.status()
+        return {"ready": True, "models": {}}
+
+    def _refresh_derived(self):
+        """Fold in state that changes without a mutator call: speaker timeout, model warm-up, cost."""
+        if self.state["speaking"] and time.time() - self._last_speaker_time >= 3.0:
+            self.state["speaking"] = ""
+        self.state["models"] = self.get_model_status()
+        self.state["cost"] = self.get_cost()
+
+    def get_changes(self, since: int = 0) -> dict:
+        """UI state keys and log lines changed after version `since` (0 = everything).
+
+        Pass the returned version back next time to get only what changed since.
+        """
+        self._refresh_derived()
+        version, changed, logs = self.state.changes(since)
+        state = {k: v for k, v in changed.items() if k in SYNCED_KEYS}
+        if "characters" in state:
+            state["characters"] = self._character_summaries()
+        if "active_characters" in state:
+            state["active_characters"] = [c["name"] for c in state["active_characters"]]
+        return {"version": version, "state": state, "logs": logs}
+
     def poll_state(self) -> dict:
-        with self._log_lock:
-            logs = self._log_buffer[:]
-            self._log_buffer.clear()
-        active_names = [c["name"] for c in self.state.get("active_characters", [])]
-        speaker = self._last_speaker if time.time() - self._last_speaker_time < 3.0 else ""
-        return {
-            "logs": logs,
-            "paused": self.state["paused"],
-            "active_characters": active_names,
-            "speaking": speaker,
-            "min_gap": self.state.get("min_gap", 12),
-            "interval": self.state.get("interval", 1.5),
-            "mic_mode": self.state.get("mic_mode", "always_on"),
-            "interaction_mode": self.state.get("interaction_mode", True),
-            "interaction_chance": self.state.get("interaction_chance", 0.25),
-            "ai_provider": self.state.get("ai_provider", "dashscope"),
-            "vision_model": self.state.get("vision_model", "qwen3-vl-flash"),
-            "capture_scale": self.state.get("capture_scale", 0.5),
-            "capture_quality": self.state.get("capture_quality", 70),
-            "game_hint": self.state.get("game_hint", ""),
-            "capture_source_type": self.state.get("capture_source_type"),
-            "capture_source_name": self.state.get("capture_source_name", ""),
-        }
+        """Full state plus log lines since the last poll. The UI only polls when the push channel is unavailable."""
+        recent = self.get_changes(self._poll_version)
+        self._poll_version = recent["version"]
+        return {"logs": recent["logs"], **self.get_changes(0)["state"]}
+
+    def subscribe_push(self) -> dict:
+        """Called once by the page after it registers window.__glazePush; returns the initial snapshot."""
+        if self._window is None:
+            return {"ok": False}
+        return {"ok": True, **self._push.subscribe(self._window)}
+
+    def get_push_stats(self) -> dict:
+        """Push channel message counts."""
+        return self._push.stats()
 
     def get_capture_sources(self) -> dict:
         """Return available monitors and windows for the source picker."""
@@ -409,14 +516,11 @@ class UiBridge:
     # ── Internal ──
 
     def push_log(self, source: str, text: str):
-        with self._log_lock:
-            self._log_buffer.append({"source": source, "text": text})
-            if len(self._log_buffer) > self._max_buffer:
-                self._log_buffer = self._log_buffer[-self._max_buffer:]
+        self.state.log({"source": source, "text": text})
 
     def set_last_message(self, name: str, text: str):
-        self._last_speaker = name
         self._last_speaker_time = time.time()
+        self.state["speaking"] = name
         self.push_log(name, text)
 
     def log_player(self, text: str):
@@ -435,7 +539,7 @@ class UiBridge:
         self.push_log("sys", f"Mic: {modes[idx]}")
 
     def _toggle_pause_hotkey(self):
-        self.state["paused"] = not self.state["paused"]
+        self._set_paused(not self.state["paused"])
 
     def _force_comment_hotkey(self):
         cb = self.state.get("on_force_comment")
@@ -444,13 +548,17 @@ class UiBridge:
 
     def _quit_hotkey(self):
         self._persist_settings()
+        self.flush()
         on_quit = self.state.get("on_quit")
         if on_quit:
             on_quit()
+        self._push.close()
         if self._window:
             self._window.destroy()
 
     def register_hotkeys(self):
+        import keyboard
+
         ptt_key = os.getenv("PTT_KEY", "v")
         keyboard.on_press_key("f7", lambda _: self._cycle_mic(), suppress=False)
         keyboard.on_press_key("f8", lambda _: self._toggle_pause_hotkey(), suppress=False)
@@ -0,0 +1,106 @@
+"""Push channel to the web UI — replaces polling poll_state on a timer.
+
+The app state (state_store.StateStore) calls notify() whenever it changes.
+A background thread wakes up, lets a burst of changes settle for a few ms,
+asks the bridge for everything changed since the version the page last saw,
+and sends it as one message through window.evaluate_js to the page's
+`window.__glazePush` handler. When nothing changes, nothing crosses the bridge.
+
+Messages carry the state version so the page can drop pushes that raced
+ahead of its initial snapshot.
+"""
+
+import json
+import threading
+import time
+
+from log import get_logger
+
+log = get_logger("ui")
+
+
+class UiPush:
+    def __init__(self, get_changes, batch_window: float = 0.03, idle_check: float = 1.0):
+        """
+        Args:
+            get_changes: get_changes(since) -> {"version", "state", "logs"} (UiBridge.get_changes).
+            batch_window: Seconds a burst of changes gets to coalesce into one push.
+            idle_check: Re-check at least this often, for changes nothing announces
+                (a model finishing warm-up, the speaker highlight timing out).
+        """
+        self._get_changes = get_changes
+        self.batch_window = batch_window
+        self.idle_check = idle_check
+
+        self._window = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._closed = False
+
+        self.pushes = 0
+        self.logs_pushed = 0
+        self.failures = 0
+
+    def subscribe(self, window) -> dict:
+        """The page is listening: return a full snapshot and push changes from here on."""
+        with self._lock:
+            self._window = window
+            msg = self._get_changes(0)
+            self._version = msg["version"]
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="ui-push")
+            self._thread.start()
+        return msg
+
+    @property
+    def subscribed(self) -> bool:
+        return self._window is not None
+
+    def notify(self):
+        """Something the page shows has changed. Cheap; safe from any thread."""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._closed:
+            if self._wake.wait(self.idle_check):
+                time.sleep(self.batch_window)
+            self._wake.clear()
+            msg = self._collect()
+            if msg:
+                self._send(msg)
+
+    def _collect(self) -> dict | None:
+        with self._lock:
+            if self._window is None:
+                return None
+            msg = self._get_changes(self._version)
+            self._version = msg["version"]
+            if not msg["state"] and not msg["logs"]:
+                return None
+            return msg
+
+    def _send(self, msg: dict):
+        payload = json.dumps(msg, default=str)
+        try:
+            self._window.evaluate_js(f"window.__glazePush && window.__glazePush({payload})")
+            self.pushes += 1
+            self.logs_pushed += len(msg["logs"])
+        except Exception as e:
+            self.failures += 1
+            log.error(f"Push failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "subscribed": self.subscribed,
+            "version": self._version,
+            "pushes": self.pushes,
+            "logs_pushed": self.logs_pushed,
+            "failures": self.failures,
+        }
+
+    def close(self):
+        self._closed = True
+        self._window = None
+        self._wake.set()
@@ -1,12 +1,38 @@
-"""TTS wrapper — supports Kokoro (local) and ElevenLabs (cloud)."""
+"""TTS wrapper — supports Kokoro (local) and ElevenLabs (cloud).
+
+Playback goes through one long-lived output stream. Each utterance is a
+PlaybackHandle queued behind the previous one, so consecutive lines play
+back-to-back with no stream open/close gap.
+"""
 
 import io
 import os
 import re
 import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import numpy as np
-import sounddevice as sd
+
+from dsp import EchoReference, resample
+from log import get_logger
+from metrics import LATENCY_BUCKETS, RTF_BUCKETS, metrics
+from tts_cache import AudioCache
+
+log = get_logger("voice")
+_tts_rtf = metrics.histogram("tts_rtf", RTF_BUCKETS, "Kokoro synthesis time / audio duration per segment")
+_tts_first_audio = metrics.histogram("tts_first_audio_seconds", LATENCY_BUCKETS, "Line queued to first synthesized chunk")
+_playback_started = metrics.counter("playback_lines", "Lines that started playing")
+_playback_underruns = metrics.counter("playback_underruns", "Times a playing line ran out of audio mid-stream")
+
+OUTPUT_RATE = 24000  # Kokoro and ElevenLabs pcm_24000 both produce 24 kHz
+
+# Kokoro synthesis segments: split at sentences, then phrases if a sentence is long
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?\u2026])\s+')
+_PHRASE_SPLIT = re.compile(r'(?<=[,;:\u2013\u2014])\s+')
+SEGMENT_MAX_CHARS = 120
+SEGMENT_MIN_CHARS = 24  # shorter pieces are merged into the next to keep prosody natural
 
 
 def _clean_for_tts(text: str) -> str:
@@ -24,24 +50,207 @@ def _clean_for_tts(text: str) -> str:
     return text
 
 
+def _split_for_tts(text: str) -> list[str]:
+    """Split text into sentence/phrase segments that can be synthesized one at a time."""
+    pieces = []
+    for sentence in _SENTENCE_SPLIT.split(text):
+        if len(sentence) > SEGMENT_MAX_CHARS:
+            pieces.extend(_PHRASE_SPLIT.split(sentence))
+        else:
+            pieces.append(sentence)
+    segments: list[str] = []
+    for piece in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+        if segments and len(segments[-1]) < SEGMENT_MIN_CHARS:
+            segments[-1] += " " + piece
+        else:
+            segments.append(piece)
+    return segments
+
+
+class PlaybackHandle:
+    """One queued utterance. Synthesis feeds audio in; the output callback drains it.
+
+    `future` resolves when the utterance has finished playing or was cancelled,
+    so async callers can `await asyncio.wrap_future(handle.future)`.
+    """
+
+    def __init__(self, text: str, voice: str, prebuffer: float = 0.0, trace=None):
+        """
+        Args:
+            text: Cleaned text being spoken.
+            voice: Voice name / ElevenLabs voice ID.
+            prebuffer: Jitter buffer in seconds — playback (re)starts only once this
+                much audio is queued or synthesis is finished. Used for streamed audio.
+            trace: Optional tracing.Trace; synthesis and playback-start spans are added to it.
+        """
+        self.text = text
+        self.voice = voice
+        self.future: Future = Future()
+        self.cancelled = False
+        self.cancel_reason: str | None = None  # e.g. "barge_in" when the player talked over it
+        self.trace = trace
+        self.created_at = time.perf_counter()
+        self.synth_started_at: float | None = None
+        self.first_chunk_at: float | None = None  # first audio arrived from the engine
+        self.started_at: float | None = None      # first sample handed to the device
+        self.finished_at: float | None = None
+        self.underruns = 0
+
+        # Preallocate roughly enough for the line (~12 chars/s of speech); grows if needed
+        capacity = int(OUTPUT_RATE * max(2.0, len(text) / 12))
+        self._buf = np.zeros(capacity, dtype=np.float32)
+        self._written = 0
+        self._read = 0
+        self._closed = False  # no more audio will be fed
+        self._prebuffer = int(prebuffer * OUTPUT_RATE)
+        self._primed = False
+        self._lock = threading.Lock()
+
+    def feed(self, audio: np.ndarray):
+        """Append synthesized audio (float32 at OUTPUT_RATE)."""
+        with self._lock:
+            need = self._written + len(audio)
+            if need > len(self._buf):
+                grown = np.zeros(max(need, len(self._buf) * 2), dtype=np.float32)
+                grown[:self._written] = self._buf[:self._written]
+                self._buf = grown
+            self._buf[self._written:need] = audio
+            self._written = need
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.perf_counter()
+                _tts_first_audio.observe(self.first_chunk_at - self.created_at)
+                if self.trace:
+                    self.trace.record("tts_first_audio", self.synth_started_at or self.created_at, self.first_chunk_at)
+
+    def close(self):
+        """Mark synthesis finished."""
+        with self._lock:
+            self._closed = True
+
+    def _read_into(self, out: np.ndarray) -> int:
+        with self._lock:
+            available = self._written - self._read
+            if not self._primed:
+                if available < self._prebuffer and not self._closed:
+                    return 0  # still filling the jitter buffer
+                self._primed = True
+            n = min(len(out), available)
+            out[:n] = self._buf[self._read:self._read + n]
+            self._read += n
+            if n < len(out) and not self._closed:
+                # Ran dry mid-stream: refill the jitter buffer before resuming
+                self._primed = False
+                self.underruns += 1
+                _playback_underruns.inc()
+            return n
+
+    def _exhausted(self) -> bool:
+        with self._lock:
+            return self._closed and self._read >= self._written
+
+    def _finish(self):
+        if not self.future.done():
+            self.finished_at = time.perf_counter()
+            self.future.set_result(not self.cancelled)
+
+    def cancel(self, reason: str = "cancelled"):
+        if self.future.done():
+            return  # already played (or cancelled); keep the first outcome
+        self.cancelled = True
+        self.cancel_reason = reason
+        self.close()
+        self._finish()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until played or cancelled. Returns False on timeout."""
+        try:
+            self.future.result(timeout=timeout)
+            return True
+        except TimeoutError:
+            return False
+
+    def audio(self) -> np.ndarray:
+        """Copy of all audio fed so far."""
+        with self._lock:
+            return self._buf[:self._written].copy()
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio synthesized so far."""
+        return self._written / OUTPUT_RATE
+
+    @property
+    def first_audio_latency(self) -> float | None:
+        """Seconds from queueing to the first sample reaching the device."""
+        if self.started_at is None:
+            return None
+        return self.started_at - self.created_at
+
+
 class Voice:
     def __init__(self):
         self.engine = os.getenv("TTS_ENGINE", "kokoro")
         self.voice = os.getenv("TTS_VOICE", "af_heart")
+        # Audio held back before starting a streamed line, to ride out network jitter
+        self.jitter_buffer = float(os.getenv("TTS_JITTER_MS", "120")) / 1000
+        # Where audio goes: device (speakers) | null (discard) | file:path.wav
+        self.sink = os.getenv("AUDIO_SINK", "device")
+        self.device = None  # output device index for the "device" sink; None = system default
+        self.sink_speed = 1.0  # null / file sinks only: >1 drains playback faster than real time
+        # Optional callback(handle) for every line that finished playing, e.g. session recording
+        self.playback_tap = None
         self.speaking = threading.Event()
-        self._lock = threading.Lock()
+        self._lock = threading.Lock()  # serializes synthesis
+        # Copy of everything sent to the speakers, read by Mic's echo canceller
+        self.echo_ref = EchoReference(sample_rate=16000)
+
+        # Output stream + playback queue (drained by _output_callback)
+        self._stream = None
+        self._stream_lock = threading.Lock()
+        self._queue: deque[PlaybackHandle] = deque()
+        self._current: PlaybackHandle | None = None
+        self._synth_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+        # Repeated lines/segments skip synthesis (and paid ElevenLabs calls)
+        self.cache = AudioCache(
+            max_bytes=int(float(os.getenv("TTS_CACHE_MB", "64")) * 1024 * 1024),
+            disk_dir=os.getenv("TTS_CACHE_DIR") or None,
+            disk_max_bytes=int(float(os.getenv("TTS_CACHE_DISK_MB", "256")) * 1024 * 1024),
+        )
+        # Per-segment synthesis timings: (engine, audio seconds, synth seconds)
+        self._synth_times: deque[tuple[str, float, float]] = deque(maxlen=200)
 
-        # Kokoro
+        # Kokoro (may be loaded early by ModelWarmup); a ModelHost client when MODEL_HOST=1
+        self.model_host = os.getenv("MODEL_HOST", "0") == "1"
         self._kokoro = None
+        self._kokoro_lock = threading.Lock()
 
         # ElevenLabs
         self._eleven_client = None
         self._eleven_voice_id = None
 
     def _ensure_kokoro(self):
-        if self._kokoro is None:
-            from kokoro_onnx import Kokoro
-            self._kokoro = Kokoro("kokoro-v1.0.onnx", "voices-v1.0.bin")
+        with self._kokoro_lock:
+            if self._kokoro is None and self.model_host:
+                from model_host import ModelHost
+                host = ModelHost("tts", {"model_path": "kokoro-v1.0.onnx", "voices_path": "voices-v1.0.bin"})
+                host.start()
+                self._kokoro = host  # same create() signature as Kokoro
+            elif self._kokoro is None:
+                from kokoro_onnx import Kokoro
+                self._kokoro = Kokoro("kokoro-v1.0.onnx", "voices-v1.0.bin")
+
+    def warm_up(self):
+        """Load Kokoro and synthesize a throwaway phrase so the first reply runs at steady-state speed."""
+        if self.engine == "elevenlabs":
+            return
+        self._ensure_kokoro()
+        self._kokoro.create("Ready.", voice=self.voice, speed=1.0)
 
     def _ensure_eleven(self):
         if self._eleven_client is None:
@@ -54,54 +263,221 @@ class Voice:
     def set_voice(self, voice: str):
         self.voice = voice
 
-    def _speak_kokoro(self, text: str, voice: str):
+    # ── Output stream ──
+
+    def _ensure_stream(self) -> bool:
+        """Open the shared output stream on first use. Returns False if no device is available."""
+        with self._stream_lock:
+            if self._stream is not None:
+                return True
+            try:
+                if self.sink == "device":
+                    import sounddevice as sd
+                    self._stream = sd.OutputStream(
+                        samplerate=OUTPUT_RATE,
+                        channels=1,
+                        dtype="float32",
+                        latency="low",
+                        device=self.device,
+                        callback=self._output_callback,
+                    )
+                else:
+                    from fake_audio import TimedOutputStream
+                    path = self.sink[len("file:"):] if self.sink.startswith("file:") else None
+                    self._stream = TimedOutputStream(
+                        samplerate=OUTPUT_RATE, callback=self._output_callback, path=path, speed=self.sink_speed
+                    )
+                self._stream.start()
+                return True
+            except Exception as e:
+                log.error(f"Output stream failed: {e}")
+                self._stream = None
+                return False
+
+    def _output_callback(self, outdata, frames, time_info, status):
+        """Called by sounddevice for each output block. Drains queued handles back-to-back."""
+        out = outdata[:, 0]
+        filled = 0
+        while filled < frames:
+            handle = self._current
+            if handle is None:
+                if not self._queue:
+                    break
+                handle = self._current = self._queue.popleft()
+            if handle.done():  # cancelled
+                self._current = None
+                continue
+            n = handle._read_into(out[filled:])
+            if n and handle.started_at is None:
+                handle.started_at = time.perf_counter()
+                _playback_started.inc()
+                if handle.trace:
+                    handle.trace.record("playback_wait", handle.first_chunk_at or handle.created_at, handle.started_at)
+                    handle.trace.record("end_to_end", handle.trace.started_at, handle.started_at)
+            filled += n
+            if filled < frames:
+                if handle._exhausted():
+                    handle._finish()
+                    self._current = None
+                else:
+                    break  # still synthesizing: underrun, pad with silence
+        out[filled:] = 0.0
+
+        if self._current is not None or self._queue:
+            self.speaking.set()
+            self.echo_ref.write(out.copy(), OUTPUT_RATE)
+        else:
+            if filled:
+                self.echo_ref.write(out.copy(), OUTPUT_RATE)
+            self.speaking.clear()
+
+    def _enqueue(self, handle: PlaybackHandle):
+        self._queue.append(handle)
+        self.speaking.set()
+
+    def close(self):
+        """Stop playback and release the output stream."""
+        self.stop(reason="closed")
+        with self._stream_lock:
+            if self._stream is not None:
+                try:
+                    self._stream.stop()
+                    self._stream.close()
+                except Exception:
+                    pass
+                self._stream = None
+        self._synth_pool.shutdown(wait=False, cancel_futures=True)
+        if self.model_host and self._kokoro is not None:
+            self._kokoro.close()
+
+    # ── Synthesis ──
+
+    def _speak_kokoro(self, handle: PlaybackHandle):
+        """Synthesize segment by segment; segment N plays while N+1 is synthesized."""
         self._ensure_kokoro()
-        samples, sample_rate = self._kokoro.create(text, voice=voice, speed=1.0)
-        audio = np.array(samples, dtype=np.float32)
-        sd.play(audio, samplerate=sample_rate)
-        sd.wait()
+        for segment in _split_for_tts(handle.text):
+            if handle.cancelled:
+                break
+            audio = self.cache.get("kokoro", handle.voice, segment)
+            if audio is None:
+                start = time.perf_counter()
+                samples, sample_rate = self._kokoro.create(segment, voice=handle.voice, speed=1.0)
+                audio = np.array(samples, dtype=np.float32)
+                elapsed = time.perf_counter() - start
+                self._synth_times.append(("kokoro", len(audio) / sample_rate, elapsed))
+                if len(audio):
+                    _tts_rtf.observe(elapsed / (len(audio) / sample_rate))
+                audio = resample(audio, sample_rate, OUTPUT_RATE)
+                self.cache.put("kokoro", handle.voice, segment, audio)
+            handle.feed(audio)
 
-    def _speak_eleven(self, text: str, voice: str):
+    def _speak_eleven(self, handle: PlaybackHandle):
+        """Stream PCM from ElevenLabs into the handle as chunks arrive."""
+        cached = self.cache.get("elevenlabs", handle.voice, handle.text)
+        if cached is not None:
+            handle.feed(cached)
+            return
         self._ensure_eleven()
-        audio_gen = self._eleven_client.text_to_speech.convert(
-            text=text,
-            voice_id=voice,
+        tts = self._eleven_client.text_to_speech
+        stream = getattr(tts, "stream", None) or tts.convert
+        audio_gen = stream(
+            text=handle.text,
+            voice_id=handle.voice,
             model_id="eleven_turbo_v2_5",
             output_format="pcm_24000",
         )
-        # Collect all audio chunks
-        audio_bytes = b""
+        carry = b""  # chunks can split a 16-bit sample
         for chunk in audio_gen:
-            audio_bytes += chunk
+            if handle.cancelled:
+                break
+            if carry:
+                chunk = carry + chunk
+            usable = len(chunk) & ~1
+            carry = chunk[usable:]
+            if not usable:
+                continue
+            # PCM bytes -> float32 (16-bit signed int)
+            audio = np.frombuffer(chunk, dtype=np.int16, count=usable // 2).astype(np.float32) / 32768.0
+            handle.feed(resample(audio, 24000, OUTPUT_RATE))
+        if not handle.cancelled:
+            self.cache.put("elevenlabs", handle.voice, handle.text, handle.audio())
 
-        # Convert PCM bytes to numpy array (16-bit signed int -> float32)
-        audio = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
-        sd.play(audio, samplerate=24000)
-        sd.wait()
+    def _synthesize(self, handle: PlaybackHandle):
+        with self._lock:
+            start = handle.synth_started_at = time.perf_counter()
+            try:
+                if handle.cancelled:
+                    return
+                if handle.trace:
+                    handle.trace.record("tts_queue", handle.created_at, start)
+                if self.engine == "elevenlabs":
+                    self._speak_eleven(handle)
+                else:
+                    self._speak_kokoro(handle)
+            except Exception as e:
+                log.error(f"TTS error: {e}")
+            finally:
+                handle.close()
+                if handle.trace and not handle.cancelled:
+                    handle.trace.record("tts_synth", start, engine=self.engine)
+
+    def speak(
+        self, text: str, voice: str | None = None, block: bool = True, trace=None
+    ) -> PlaybackHandle | None:
+        """Generate and queue TTS audio behind anything already playing.
 
-    def speak(self, text: str, voice: str | None = None):
-        """Generate and play TTS audio. Blocks until playback finishes."""
+        With block=True (default) waits until playback finishes or stop() is
+        called. With block=False synthesis runs on the TTS worker and the handle
+        is returned immediately. Returns None if there is nothing to say.
+        """
         if not text:
-            return
+            return None
 
         text = _clean_for_tts(text)
         if not text:
-            return
+            return None
 
-        use_voice = voice or self.voice
+        prebuffer = self.jitter_buffer if self.engine == "elevenlabs" else 0.0
+        handle = PlaybackHandle(text, voice or self.voice, prebuffer=prebuffer, trace=trace)
+        if not self._ensure_stream():
+            handle.cancel()
+            return handle
+        if self.playback_tap:
+            tap = self.playback_tap
+            handle.future.add_done_callback(lambda _: None if handle.cancelled else tap(handle))
+        self._enqueue(handle)
 
-        with self._lock:
-            try:
-                self.speaking.set()
-                if self.engine == "elevenlabs":
-                    self._speak_eleven(text, use_voice)
-                else:
-                    self._speak_kokoro(text, use_voice)
-            except Exception as e:
-                err = str(e).encode("ascii", "ignore").decode()
-                print(f"[voice] TTS error: {err}", flush=True)
-            finally:
-                self.speaking.clear()
+        if block:
+            self._synthesize(handle)
+            handle.wait()
+        else:
+            self._synth_pool.submit(self._synthesize, handle)
+        return handle
+
+    def synthesis_stats(self) -> dict:
+        """Real-time factor (synth time / audio time) over recent segments; < 1 is faster than playback."""
+        rtfs = sorted(synth / audio for _, audio, synth in self._synth_times if audio > 0)
+        if not rtfs:
+            return {"segments": 0, "rtf_mean": None, "rtf_p90": None}
+        return {
+            "segments": len(rtfs),
+            "rtf_mean": round(sum(rtfs) / len(rtfs), 3),
+            "rtf_p90": round(rtfs[min(len(rtfs) - 1, int(len(rtfs) * 0.9))], 3),
+        }
+
+    def stop(self, reason: str = "barge_in"):
+        """Cut the current utterance short and drop everything queued (e.g. the player started talking).
+
+        `reason` is recorded on each cancelled handle (PlaybackHandle.cancel_reason).
+        """
+        if not self.speaking.is_set():
+            return
+        pending = list(self._queue)
+        self._queue.clear()
+        current = self._current
+        for handle in ([current] if current else []) + pending:
+            handle.cancel(reason)
+        self.echo_ref.clear()
 
     def is_speaking(self) -> bool:
         return self.speaking.is_set()
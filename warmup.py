@@ -0,0 +1,89 @@
+"""Background model warm-up — loads whisper, VAD and Kokoro concurrently at launch."""
+
+import threading
+import time
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+from log import get_logger
+
+log = get_logger("warmup")
+
+
+class ModelWarmup:
+    def __init__(self, mic, voice):
+        """
+        Args:
+            mic: Mic instance (owns Silero VAD and faster-whisper).
+            voice: Voice instance (owns Kokoro).
+        """
+        self._mic = mic
+        self._voice = voice
+        self._lock = threading.Lock()
+        self._status: dict[str, dict] = {}
+        self._executor = None
+        self._futures = []
+        self._started_at = 0.0
+        self._total_time: float | None = None
+
+    def _jobs(self) -> dict:
+        """Models needed for the current config, keyed by display name."""
+        jobs = {}
+        if self._mic.mode != "off":
+            jobs["vad"] = self._mic.warm_up_vad
+            jobs["whisper"] = self._mic.warm_up_whisper
+        if self._voice.engine != "elevenlabs":
+            jobs["kokoro"] = self._voice.warm_up
+        return jobs
+
+    def _run(self, name: str, fn):
+        start = time.perf_counter()
+        with self._lock:
+            self._status[name] = {"state": "loading", "load_time": None}
+        try:
+            fn()
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._status[name] = {"state": "ready", "load_time": round(elapsed, 2)}
+            log.info(f"{name} ready in {elapsed:.2f}s")
+        except Exception as e:
+            err = str(e)
+            with self._lock:
+                self._status[name] = {"state": "error", "load_time": None, "error": err}
+            log.error(f"{name} failed: {err}")
+        with self._lock:
+            if self._total_time is None and self._all_done_locked():
+                self._total_time = round(time.perf_counter() - self._started_at, 2)
+                log.info(f"warm-up finished in {self._total_time:.2f}s")
+
+    def start(self):
+        """Kick off all loads in the background. Returns immediately."""
+        jobs = self._jobs()
+        if not jobs:
+            return
+        self._started_at = time.perf_counter()
+        with self._lock:
+            for name in jobs:
+                self._status[name] = {"state": "pending", "load_time": None}
+        self._executor = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="warmup")
+        self._futures = [self._executor.submit(self._run, name, fn) for name, fn in jobs.items()]
+        self._executor.shutdown(wait=False)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until every load has finished or failed. Returns is_ready()."""
+        futures.wait(self._futures, timeout=timeout)
+        return self.is_ready()
+
+    def _all_done_locked(self) -> bool:
+        return all(s["state"] in ("ready", "error") for s in self._status.values())
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return self._all_done_locked()
+
+    def status(self) -> dict:
+        """Per-model state ("pending" | "loading" | "ready" | "error") and load time in seconds,
+        plus the wall time until the last one finished (None while any is still loading)."""
+        with self._lock:
+            models = {k: dict(v) for k, v in self._status.items()}
+            return {"ready": self._all_done_locked(), "models": models, "total_time": self._total_time}